@@ -0,0 +1,136 @@
+"""
+Agendador em Pipeline para Processamento em Lote
+Executa estágios encadeados por filas limitadas, cada um em sua própria thread,
+para que a GPU e a CPU trabalhem em histórias diferentes ao mesmo tempo.
+"""
+import time
+import queue
+import logging
+import threading
+
+
+# Marcador de fim de fluxo entre os estágios
+_FIM = object()
+
+
+class AgendadorPipeline:
+    """
+    Executa uma sequência de estágios sobre uma lista de itens.
+
+    Cada estágio roda em uma thread dedicada e se comunica com o próximo por
+    uma fila limitada (backpressure): quando a fila enche, o estágio anterior
+    espera em vez de acumular trabalho pronto na memória/disco.
+    """
+
+    def __init__(self, estagios, tamanho_fila=1, logger=None):
+        """
+        Inicializa o agendador.
+
+        Args:
+            estagios: Lista de tuplas (nome, funcao). Cada função recebe o item
+                      e levanta exceção em caso de falha.
+            tamanho_fila: Quantos itens podem esperar entre dois estágios
+            logger: Logger opcional para saída de logs
+        """
+        if not estagios:
+            raise ValueError("O agendador precisa de pelo menos um estágio")
+
+        self.estagios = estagios
+        self.tamanho_fila = max(1, int(tamanho_fila))
+        self.logger = logger or logging.getLogger("AgendadorPipeline")
+        self._lock_callbacks = threading.Lock()
+
+    def executar(self, itens, ao_concluir=None, ao_falhar=None):
+        """
+        Processa todos os itens pelos estágios em pipeline.
+
+        Um item que falha em um estágio não segue para os próximos.
+
+        Args:
+            itens: Iterável de itens (ex: dicionários de trabalho por história)
+            ao_concluir: Callback(item) chamado quando o item passa por todos os estágios
+            ao_falhar: Callback(item, nome_estagio, erro) chamado na primeira falha do item
+
+        Returns:
+            Dicionário com a ocupação de cada estágio e o tempo total
+        """
+        filas = [queue.Queue(maxsize=self.tamanho_fila) for _ in self.estagios[1:]]
+        metricas = {
+            nome: {'itens': 0, 'falhas': 0, 'ocupado': 0.0, 'esperando_entrada': 0.0, 'bloqueado_saida': 0.0}
+            for nome, _ in self.estagios
+        }
+
+        inicio = time.perf_counter()
+
+        def alimentar():
+            for item in itens:
+                yield item
+
+        threads = []
+        for indice, (nome, funcao) in enumerate(self.estagios):
+            entrada = alimentar() if indice == 0 else filas[indice - 1]
+            saida = filas[indice] if indice < len(filas) else None
+            thread = threading.Thread(
+                target=self._rodar_estagio,
+                args=(nome, funcao, entrada, saida, metricas[nome], ao_concluir, ao_falhar),
+                name=f"estagio-{nome}"
+            )
+            threads.append(thread)
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        tempo_total = time.perf_counter() - inicio
+
+        for nome, m in metricas.items():
+            m['utilizacao'] = (m['ocupado'] / tempo_total) if tempo_total > 0 else 0.0
+
+        return {'tempo_total': tempo_total, 'estagios': metricas}
+
+    def _rodar_estagio(self, nome, funcao, entrada, saida, metricas, ao_concluir, ao_falhar):
+        """Laço de uma thread de estágio: consome a entrada, processa e repassa."""
+        try:
+            while True:
+                # 1. Pega o próximo item (gerador no primeiro estágio, fila nos demais)
+                espera = time.perf_counter()
+                if isinstance(entrada, queue.Queue):
+                    item = entrada.get()
+                else:
+                    item = next(entrada, _FIM)
+                metricas['esperando_entrada'] += time.perf_counter() - espera
+
+                if item is _FIM:
+                    break
+
+                # 2. Processa o item
+                ocupado = time.perf_counter()
+                try:
+                    funcao(item)
+                    erro = None
+                except Exception as e:
+                    erro = e
+                metricas['ocupado'] += time.perf_counter() - ocupado
+
+                if erro is not None:
+                    metricas['falhas'] += 1
+                    self.logger.debug(f"Estágio '{nome}' falhou: {erro}")
+                    if ao_falhar:
+                        with self._lock_callbacks:
+                            ao_falhar(item, nome, erro)
+                    continue
+
+                metricas['itens'] += 1
+
+                # 3. Repassa ao próximo estágio (bloqueia se a fila estiver cheia)
+                if saida is not None:
+                    bloqueio = time.perf_counter()
+                    saida.put(item)
+                    metricas['bloqueado_saida'] += time.perf_counter() - bloqueio
+                elif ao_concluir:
+                    with self._lock_callbacks:
+                        ao_concluir(item)
+        finally:
+            # Sempre sinaliza o fim para o próximo estágio não ficar preso
+            if saida is not None:
+                saida.put(_FIM)
@@ -0,0 +1,181 @@
+"""
+Alinhamento de Texto Conhecido (legendas sem ASR)
+Quando a legenda é o próprio texto da narração (mesmo idioma), não é preciso
+rodar o Whisper para redescobri-lo: basta distribuir as palavras sobre os
+trechos com voz do áudio do TTS. Gera o mesmo formato `segments/words` da
+transcrição do Whisper, consumido por LegendaGenerator._gerar_arquivo_ass.
+"""
+import re
+import json
+import wave
+import logging
+import subprocess
+
+import numpy as np
+
+
+class AlinhadorTexto:
+    """
+    Alinhamento leve de um texto conhecido ao áudio que o narra.
+
+    Cada frase ocupa o seu intervalo no áudio (dos tempos por frase do TTS,
+    se houver; senão, a narração inteira) e as palavras são distribuídas
+    proporcionalmente ao número de caracteres ao longo do tempo com voz,
+    pulando as pausas detectadas por energia.
+    """
+
+    # Janela (s) da detecção de voz por energia
+    JANELA = 0.02
+
+    def __init__(self, limiar_relativo_db=35.0, pausa_minima=0.15, logger=None):
+        """
+        Inicializa o alinhador.
+
+        Args:
+            limiar_relativo_db: Janelas até este valor abaixo do pico (dB) contam como voz
+            pausa_minima: Silêncios menores que isto (s) não interrompem a fala
+            logger: Logger opcional para saída de logs
+        """
+        self.limiar_relativo_db = limiar_relativo_db
+        self.pausa_minima = pausa_minima
+        self.logger = logger or logging.getLogger("AlinhadorTexto")
+
+    # --- Áudio ---
+
+    def _ler_audio(self, arquivo_audio):
+        """Amostras mono float32 e a taxa (PCM em memória a 16 kHz, wav PCM 16 bits direto; outros via ffmpeg)."""
+        if isinstance(arquivo_audio, np.ndarray):
+            return arquivo_audio.astype(np.float32, copy=False), 16000
+
+        if arquivo_audio.lower().endswith('.wav'):
+            with wave.open(arquivo_audio, 'rb') as f:
+                if f.getsampwidth() == 2:
+                    dados = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+                    amostras = dados.reshape(-1, f.getnchannels()).mean(axis=1) / 32768.0
+                    return amostras.astype(np.float32), f.getframerate()
+
+        taxa = 16000
+        comando = ["ffmpeg", "-loglevel", "error", "-i", arquivo_audio, "-f", "f32le", "-ac", "1", "-ar", str(taxa), "-"]
+        resultado = subprocess.run(comando, capture_output=True)
+        if resultado.returncode != 0:
+            linhas_erro = resultado.stderr.decode('utf-8', errors='replace').strip().split('\n')[-10:]
+            raise RuntimeError(f"FFmpeg falhou ao decodificar '{arquivo_audio}':\n" + "\n".join(linhas_erro))
+        return np.frombuffer(resultado.stdout, dtype=np.float32), taxa
+
+    def trechos_com_voz(self, amostras, taxa):
+        """
+        Intervalos com voz, por energia RMS em janelas curtas.
+
+        Returns:
+            Lista de tuplas (inicio, fim) em segundos
+        """
+        tamanho = max(1, int(taxa * self.JANELA))
+        num_janelas = len(amostras) // tamanho
+        if num_janelas == 0:
+            return []
+
+        janelas = amostras[:num_janelas * tamanho].reshape(num_janelas, tamanho)
+        rms_db = 20 * np.log10(np.maximum(np.sqrt(np.mean(janelas ** 2, axis=1)), 1e-10))
+        com_voz = rms_db > rms_db.max() - self.limiar_relativo_db
+
+        # Bordas dos trechos com voz (em janelas)
+        bordas = np.diff(np.concatenate([[0], com_voz.astype(np.int8), [0]]))
+        inicios = np.flatnonzero(bordas == 1)
+        fins = np.flatnonzero(bordas == -1)
+
+        trechos = []
+        for inicio, fim in zip(inicios * self.JANELA, fins * self.JANELA):
+            if trechos and inicio - trechos[-1][1] < self.pausa_minima:
+                trechos[-1] = (trechos[-1][0], fim)
+            else:
+                trechos.append((inicio, fim))
+        return trechos
+
+    # --- Texto ---
+
+    def dividir_frases(self, texto):
+        """Divide o texto em frases (pontuação final seguida de espaço)."""
+        return [f.strip() for f in re.split(r'(?<=[.!?…])\s+', texto.strip()) if f.strip()]
+
+    def _mapa_tempo(self, trechos, inicio, fim):
+        """
+        Pontos (tempo de fala acumulado → instante) dentro de [inicio, fim].
+
+        Returns:
+            Tupla (acumulado, instantes) para np.interp
+        """
+        recortados = [(max(a, inicio), min(b, fim)) for a, b in trechos if b > inicio and a < fim]
+        if not recortados:
+            recortados = [(inicio, fim)]
+
+        acumulado, instantes, total = [], [], 0.0
+        for a, b in recortados:
+            acumulado += [total, total + (b - a)]
+            instantes += [a, b]
+            total += b - a
+        return np.array(acumulado), np.array(instantes)
+
+    def _palavras(self, frase, acumulado, instantes):
+        """Distribui as palavras da frase pelo tempo de fala, proporcional aos caracteres."""
+        palavras = frase.split()
+        pesos = np.array([len(p) for p in palavras], dtype=np.float64)
+        limites = np.concatenate([[0.0], np.cumsum(pesos)]) / pesos.sum() * acumulado[-1]
+        tempos = np.interp(limites, acumulado, instantes)
+        return [
+            {'word': f" {palavra}", 'start': float(tempos[i]), 'end': float(tempos[i + 1])}
+            for i, palavra in enumerate(palavras)
+        ]
+
+    # --- API ---
+
+    def alinhar(self, texto, arquivo_audio, arquivo_tempos=None):
+        """
+        Alinha o texto ao áudio.
+
+        Args:
+            texto: Texto narrado (ignorado se `arquivo_tempos` trouxer as frases)
+            arquivo_audio: Áudio da narração (.wav do TTS, vídeo ou PCM NumPy mono a 16 kHz)
+            arquivo_tempos: JSON opcional do TTS por frases ({frases: [{texto, inicio, fim}]})
+
+        Returns:
+            Dicionário no formato do Whisper: {text, segments: [{start, end, text, words}]}
+        """
+        amostras, taxa = self._ler_audio(arquivo_audio)
+        duracao = len(amostras) / taxa
+        trechos = self.trechos_com_voz(amostras, taxa)
+
+        if arquivo_tempos:
+            with open(arquivo_tempos, 'r', encoding='utf-8') as f:
+                frases = [(fr['texto'], fr['inicio'], fr['fim']) for fr in json.load(f)['frases']]
+            mapas = [self._mapa_tempo(trechos, inicio, fim) for _, inicio, fim in frases]
+            frases = [f for f, _, _ in frases]
+        else:
+            # Sem tempos por frase: a narração inteira é um só intervalo, dividido por caracteres
+            frases = self.dividir_frases(texto)
+            acumulado, instantes = self._mapa_tempo(trechos, 0.0, duracao)
+            pesos = np.array([len(f.replace(" ", "")) for f in frases], dtype=np.float64)
+            limites = np.concatenate([[0.0], np.cumsum(pesos)]) / pesos.sum() * acumulado[-1]
+            mapas = []
+            for i in range(len(frases)):
+                inicio, fim = np.interp([limites[i], limites[i + 1]], acumulado, instantes)
+                mapas.append(self._mapa_tempo(trechos, inicio, fim))
+
+        segments = []
+        for i, (frase, (acumulado, instantes)) in enumerate(zip(frases, mapas)):
+            if not frase.split():
+                continue
+            words = self._palavras(frase, acumulado, instantes)
+            segments.append({
+                'id': i,
+                'start': words[0]['start'],
+                'end': words[-1]['end'],
+                'text': f" {frase}",
+                'words': words
+            })
+
+        total_palavras = sum(len(s['words']) for s in segments)
+        self.logger.info(
+            f"✓ Texto alinhado sem ASR: {total_palavras} palavras em {len(segments)} frases "
+            f"({len(trechos)} trechos com voz{', tempos do TTS' if arquivo_tempos else ''})"
+        )
+        return {'text': " ".join(frases), 'segments': segments}
@@ -0,0 +1,116 @@
+"""
+Ampliador de Imagens em Blocos
+Segunda fase da geração de imagens em baixa resolução: amplia cada cena até
+o tamanho exato usado na montagem, bloco a bloco, para que a memória gasta
+não dependa do tamanho da imagem final.
+"""
+import logging
+
+import numpy as np
+from PIL import Image
+
+
+class AmpliadorImagens:
+    """
+    Amplia imagens para um tamanho exato.
+
+    Métodos:
+        lanczos - reamostragem Lanczos (CPU, rápido)
+        sd_x4   - Stable Diffusion x4 Upscaler aplicado em blocos com sobreposição,
+                  seguido de Lanczos até o tamanho exato
+    """
+
+    METODOS = ('lanczos', 'sd_x4')
+
+    def __init__(self, metodo="lanczos", tamanho_bloco=192, sobreposicao=32, passos=20, logger=None):
+        """
+        Inicializa o ampliador.
+
+        Args:
+            metodo: 'lanczos' ou 'sd_x4'
+            tamanho_bloco: Lado (px, na imagem de entrada) de cada bloco enviado ao upscaler
+            sobreposicao: Sobreposição (px, na entrada) entre blocos vizinhos, mesclada em rampa
+            passos: Passos de inferência do upscaler (sd_x4)
+            logger: Logger opcional para saída de logs
+        """
+        if metodo not in self.METODOS:
+            raise ValueError(f"Método de ampliação desconhecido: '{metodo}' (use {', '.join(self.METODOS)})")
+
+        self.metodo = metodo
+        self.tamanho_bloco = int(tamanho_bloco)
+        self.sobreposicao = min(int(sobreposicao), self.tamanho_bloco // 2)
+        self.passos = passos
+        self.logger = logger or logging.getLogger("AmpliadorImagens")
+
+    @property
+    def usa_modelo(self):
+        """Se o método precisa de um pipeline de difusão carregado."""
+        return self.metodo == 'sd_x4'
+
+    def ampliar(self, imagem, tamanho_destino, pipe=None, prompt=""):
+        """
+        Amplia uma imagem para exatamente `tamanho_destino`.
+
+        Args:
+            imagem: Imagem PIL em baixa resolução
+            tamanho_destino: Tupla (largura, altura) final
+            pipe: StableDiffusionUpscalePipeline (obrigatório no método 'sd_x4')
+            prompt: Prompt da cena (guia o upscaler de difusão)
+
+        Returns:
+            Imagem PIL no tamanho de destino
+        """
+        imagem = imagem.convert("RGB")
+        if self.metodo == 'sd_x4':
+            if pipe is None:
+                raise ValueError("O método 'sd_x4' requer o pipeline do upscaler")
+            imagem = self._ampliar_em_blocos(imagem, pipe, prompt)
+
+        if imagem.size != tuple(tamanho_destino):
+            imagem = imagem.resize(tuple(tamanho_destino), Image.LANCZOS)
+        return imagem
+
+    def _posicoes(self, total):
+        """Inícios dos blocos ao longo de um eixo (o último bloco encosta na borda)."""
+        if total <= self.tamanho_bloco:
+            return [0]
+        passo = self.tamanho_bloco - self.sobreposicao
+        posicoes = list(range(0, total - self.tamanho_bloco, passo))
+        posicoes.append(total - self.tamanho_bloco)
+        return posicoes
+
+    def _rampa(self, n, borda):
+        """Pesos 1D que sobem linearmente nas bordas (mescla das sobreposições)."""
+        if borda <= 0:
+            return np.ones(n, dtype=np.float32)
+        i = np.arange(n, dtype=np.float32)
+        return np.clip(np.minimum(i + 1, n - i) / borda, 1e-3, 1.0)
+
+    def _ampliar_em_blocos(self, imagem, pipe, prompt):
+        """Aplica o upscaler bloco a bloco e mescla os resultados com pesos em rampa."""
+        largura, altura = imagem.size
+        acumulado = None
+        pesos = None
+        fator = None
+
+        for y in self._posicoes(altura):
+            for x in self._posicoes(largura):
+                bloco = imagem.crop((x, y, min(x + self.tamanho_bloco, largura), min(y + self.tamanho_bloco, altura)))
+                saida = pipe(prompt=prompt, image=bloco, num_inference_steps=self.passos).images[0]
+
+                if acumulado is None:
+                    # O fator (4x no x4-upscaler) é lido da primeira saída
+                    fator = saida.size[0] // bloco.size[0]
+                    acumulado = np.zeros((altura * fator, largura * fator, 3), dtype=np.float32)
+                    pesos = np.zeros((altura * fator, largura * fator, 1), dtype=np.float32)
+
+                pixels = np.asarray(saida, dtype=np.float32)
+                h, w = pixels.shape[:2]
+                borda = self.sobreposicao * fator
+                mascara = np.outer(self._rampa(h, borda), self._rampa(w, borda))[..., None]
+
+                acumulado[y * fator:y * fator + h, x * fator:x * fator + w] += pixels * mascara
+                pesos[y * fator:y * fator + h, x * fator:x * fator + w] += mascara
+
+        resultado = np.clip(acumulado / pesos, 0, 255).astype(np.uint8)
+        return Image.fromarray(resultado)
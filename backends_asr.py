@@ -0,0 +1,160 @@
+"""
+Backends de Reconhecimento de Fala (ASR) do LegendaGenerator
+Cada backend carrega um modelo Whisper e transcreve para o mesmo formato do
+openai-whisper ({text, segments: [{id, start, end, text, words: [{word, start, end}]}]}),
+que é o que LegendaGenerator._gerar_arquivo_ass consome.
+"""
+
+# Memória aproximada (MB, fp32) de cada modelo Whisper, para dimensionar os trabalhadores do lote
+TAMANHO_MODELO_MB = {'tiny': 150, 'base': 290, 'small': 970, 'medium': 3100, 'large': 6200}
+
+
+def dispositivo_asr():
+    """'cuda' se houver GPU visível (torch ou CTranslate2), senão 'cpu'."""
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        pass
+    try:
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+class BackendOpenAIWhisper:
+    """openai-whisper (PyTorch, fp32 na CPU)."""
+
+    nome = 'openai-whisper'
+    # Fração da memória do modelo fp32
+    fator_memoria = 1.0
+
+    def __init__(self, modelo_whisper='small', threads=None, **_):
+        """
+        Args:
+            modelo_whisper: Nome do modelo ('tiny', 'base', 'small', 'medium', 'large')
+            threads: Threads do PyTorch na CPU (None = padrão do torch)
+        """
+        self.modelo_whisper = modelo_whisper
+        self.threads = threads
+
+    def tamanho_estimado_mb(self):
+        """Memória aproximada de uma cópia do modelo."""
+        base = self.modelo_whisper.split('-')[0].split('.')[0]
+        return TAMANHO_MODELO_MB.get(base, 1000) * self.fator_memoria
+
+    def carregar(self, dispositivo="cpu"):
+        """Carrega e retorna o modelo no dispositivo."""
+        try:
+            import whisper
+        except ImportError:
+            raise ImportError(
+                "Módulo 'whisper' não encontrado. "
+                "Instale com: pip install openai-whisper"
+            )
+        if self.threads and dispositivo == "cpu":
+            import torch
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(self.modelo_whisper, device=dispositivo)
+
+    def transcrever(self, modelo, audio, task):
+        """
+        Transcreve com timestamps por palavra.
+
+        Args:
+            modelo: Modelo retornado por carregar()
+            audio: Caminho do áudio/vídeo ou PCM NumPy float32 mono a 16 kHz
+            task: 'transcribe' ou 'translate'
+
+        Returns:
+            Dicionário no formato do Whisper
+        """
+        return modelo.transcribe(
+            audio,
+            task=task,
+            word_timestamps=True,  # Timestamps palavra por palavra
+            fp16=False  # Desativa FP16 para compatibilidade
+        )
+
+
+class BackendFasterWhisper(BackendOpenAIWhisper):
+    """faster-whisper (CTranslate2, int8 por padrão), bem mais rápido na CPU."""
+
+    nome = 'faster-whisper'
+    fator_memoria = 0.35
+
+    def __init__(self, modelo_whisper='small', threads=None, compute_type='int8', **_):
+        """
+        Args:
+            modelo_whisper: Nome do modelo ('tiny', 'base', 'small', 'medium', 'large-v3', ...)
+            threads: Threads do CTranslate2 na CPU (None = padrão)
+            compute_type: Quantização do CTranslate2 ('int8', 'int8_float16', 'float16', 'float32')
+        """
+        super().__init__(modelo_whisper, threads)
+        self.compute_type = compute_type
+
+    def carregar(self, dispositivo="cpu"):
+        """Carrega e retorna o WhisperModel do CTranslate2 no dispositivo."""
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError(
+                "Módulo 'faster_whisper' não encontrado. "
+                "Instale com: pip install faster-whisper"
+            )
+        modelo = WhisperModel(
+            self.modelo_whisper,
+            device=dispositivo,
+            compute_type=self.compute_type,
+            cpu_threads=self.threads or 0
+        )
+        # Os pesos do CTranslate2 não são tensores do torch: informa o tamanho ao GerenciadorModelos
+        modelo.tamanho_estimado_mb = self.tamanho_estimado_mb()
+        return modelo
+
+    def transcrever(self, modelo, audio, task):
+        """Transcreve e converte os Segment/Word do faster-whisper para o formato do Whisper."""
+        segmentos, info = modelo.transcribe(audio, task=task, word_timestamps=True)
+
+        segments = []
+        for segmento in segmentos:
+            segments.append({
+                'id': segmento.id,
+                'start': segmento.start,
+                'end': segmento.end,
+                'text': segmento.text,
+                'words': [
+                    {'word': w.word, 'start': w.start, 'end': w.end, 'probability': w.probability}
+                    for w in (segmento.words or [])
+                ]
+            })
+
+        return {
+            'text': "".join(s['text'] for s in segments),
+            'segments': segments,
+            'language': info.language
+        }
+
+
+BACKENDS_ASR = {
+    BackendOpenAIWhisper.nome: BackendOpenAIWhisper,
+    BackendFasterWhisper.nome: BackendFasterWhisper
+}
+
+
+def criar_backend_asr(nome='openai-whisper', modelo_whisper='small', **opcoes):
+    """
+    Cria o backend de ASR pelo nome (config: video.backend_asr).
+
+    Args:
+        nome: 'openai-whisper' ou 'faster-whisper'
+        modelo_whisper: Nome do modelo Whisper
+        **opcoes: threads, compute_type
+
+    Returns:
+        Instância do backend
+    """
+    if nome not in BACKENDS_ASR:
+        raise ValueError(f"Backend de ASR desconhecido: '{nome}' (opções: {', '.join(BACKENDS_ASR)})")
+    return BACKENDS_ASR[nome](modelo_whisper, **opcoes)
@@ -0,0 +1,292 @@
+"""
+Cache de Artefatos Endereçado por Conteúdo
+Guarda saídas das etapas (áudio, imagens, transcrições) em disco, indexadas
+pelo hash de tudo que influencia o resultado, com despejo LRU por tamanho.
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+
+class CacheArtefatos:
+    """
+    Cache em disco para artefatos do pipeline.
+
+    Cada artefato é salvo em `<pasta>/objetos/<2 primeiros chars>/<chave><extensão>`,
+    onde a chave é o SHA-256 das entradas que o produziram. O horário de
+    modificação do arquivo é atualizado a cada acerto e serve como "último uso"
+    para o despejo LRU quando o cache passa do tamanho máximo. A ocupação é
+    medida uma vez na abertura e mantida por um total corrente; a pasta só é
+    varrida de novo quando o total passa do limite.
+    """
+
+    def __init__(self, pasta="cache", tamanho_maximo_mb=10240, logger=None, somente_leitura=False):
+        """
+        Inicializa o cache.
+
+        Args:
+            pasta: Diretório raiz do cache
+            tamanho_maximo_mb: Tamanho máximo em disco antes de despejar os itens menos usados
+            logger: Logger opcional para saída de logs
+            somente_leitura: Se True, as leituras não alteram a ordem do LRU e a
+                             escrita é proibida (ex: o rascunho lendo o cache da produção)
+        """
+        self.pasta = pasta
+        self.pasta_objetos = os.path.join(pasta, "objetos")
+        self.tamanho_maximo = int(tamanho_maximo_mb * 1024 * 1024)
+        self.logger = logger or logging.getLogger("CacheArtefatos")
+        self.estatisticas = {}
+        self.somente_leitura = somente_leitura
+
+        self._lock = threading.Lock()
+        self._hashes_arquivos = {}
+
+        os.makedirs(self.pasta_objetos, exist_ok=True)
+        # Só leitura nunca despeja: não precisa medir a ocupação
+        self._tamanho_total = 0 if somente_leitura else sum(tamanho for _, tamanho, _ in self._listar_objetos())
+
+    # --- Chaves ---
+
+    def chave(self, tipo, **partes):
+        """
+        Calcula a chave de um artefato a partir das entradas que o definem.
+
+        Args:
+            tipo: Tipo do artefato (ex: 'audio', 'imagem', 'transcricao')
+            **partes: Valores serializáveis em JSON que influenciam o resultado
+
+        Returns:
+            String hexadecimal SHA-256
+        """
+        conteudo = json.dumps({'tipo': tipo, **partes}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def hash_arquivo(self, caminho):
+        """
+        Calcula o SHA-256 do conteúdo de um arquivo (memorizado por tamanho/mtime).
+
+        Args:
+            caminho: Caminho do arquivo
+
+        Returns:
+            String hexadecimal SHA-256, ou None se o arquivo não existir
+        """
+        if not caminho or not os.path.exists(caminho):
+            return None
+
+        info = os.stat(caminho)
+        identidade = (os.path.abspath(caminho), info.st_size, info.st_mtime_ns)
+
+        with self._lock:
+            if identidade in self._hashes_arquivos:
+                return self._hashes_arquivos[identidade]
+
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+        resultado = sha.hexdigest()
+
+        with self._lock:
+            self._hashes_arquivos[identidade] = resultado
+        return resultado
+
+    def caminho(self, chave, extensao):
+        """Retorna o caminho interno de um artefato no cache."""
+        return os.path.join(self.pasta_objetos, chave[:2], f"{chave}{extensao}")
+
+    # --- Arquivos ---
+
+    def obter_arquivo(self, tipo, chave, extensao, destino):
+        """
+        Copia um artefato do cache para o destino, se existir.
+
+        Args:
+            tipo: Tipo do artefato (usado nas estatísticas)
+            chave: Chave do artefato
+            extensao: Extensão do arquivo (ex: '.wav')
+            destino: Caminho onde o artefato deve ser colocado
+
+        Returns:
+            True se houve acerto no cache, False caso contrário
+        """
+        origem = self.caminho(chave, extensao)
+        if not os.path.exists(origem):
+            self._contar(tipo, 'falhas')
+            return False
+
+        pasta_destino = os.path.dirname(destino)
+        if pasta_destino:
+            os.makedirs(pasta_destino, exist_ok=True)
+
+        # Cópia (e não hardlink): o pipeline sobrescreve as saídas no lugar
+        shutil.copyfile(origem, destino)
+        self._tocar(origem)
+        self._contar(tipo, 'acertos')
+        return True
+
+    def guardar_arquivo(self, tipo, chave, extensao, origem):
+        """
+        Guarda uma cópia de um arquivo no cache.
+
+        Args:
+            tipo: Tipo do artefato (usado nos logs)
+            chave: Chave do artefato
+            extensao: Extensão do arquivo (ex: '.png')
+            origem: Arquivo a ser guardado
+        """
+        self._verificar_escrita()
+        destino = self.caminho(chave, extensao)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tamanho_anterior = self._tamanho(destino)
+
+        # Escrita atômica: copia para um temporário e renomeia
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(origem, temporario)
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+
+        self.logger.debug(f"Cache: '{tipo}' guardado ({chave[:12]})")
+        self._aplicar_limite(self._tamanho(destino) - tamanho_anterior)
+
+    def obter_caminho(self, tipo, chave, extensao):
+        """
+        Retorna o caminho interno de um artefato, se existir (sem copiar).
+
+        Útil para artefatos lidos direto do cache (ex: tensores com torch.load).
+
+        Returns:
+            Caminho do artefato no cache, ou None se não existir
+        """
+        caminho = self.caminho(chave, extensao)
+        if not os.path.exists(caminho):
+            self._contar(tipo, 'falhas')
+            return None
+
+        self._tocar(caminho)
+        self._contar(tipo, 'acertos')
+        return caminho
+
+    # --- JSON ---
+
+    def obter_json(self, tipo, chave):
+        """
+        Lê um artefato JSON do cache.
+
+        Returns:
+            Objeto desserializado, ou None se não estiver no cache
+        """
+        caminho = self.caminho(chave, '.json')
+        if not os.path.exists(caminho):
+            self._contar(tipo, 'falhas')
+            return None
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        self._tocar(caminho)
+        self._contar(tipo, 'acertos')
+        return dados
+
+    def guardar_json(self, tipo, chave, dados):
+        """Guarda um objeto serializável em JSON no cache."""
+        self._verificar_escrita()
+        destino = self.caminho(chave, '.json')
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        tamanho_anterior = self._tamanho(destino)
+
+        fd, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, default=float)
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.unlink(temporario)
+
+        self.logger.debug(f"Cache: '{tipo}' guardado ({chave[:12]})")
+        self._aplicar_limite(self._tamanho(destino) - tamanho_anterior)
+
+    # --- Manutenção ---
+
+    def _verificar_escrita(self):
+        """Impede escritas em um cache aberto como somente leitura."""
+        if self.somente_leitura:
+            raise PermissionError(f"Cache '{self.pasta}' aberto como somente leitura")
+
+    def _tocar(self, caminho):
+        """Marca o artefato como usado agora (ordem do LRU); não faz nada em somente leitura."""
+        if self.somente_leitura:
+            return
+        try:
+            os.utime(caminho, None)
+        except OSError:
+            pass
+
+    def _contar(self, tipo, campo):
+        """Atualiza os contadores de acertos/falhas por tipo."""
+        with self._lock:
+            contadores = self.estatisticas.setdefault(tipo, {'acertos': 0, 'falhas': 0})
+            contadores[campo] += 1
+
+    def _tamanho(self, caminho):
+        """Tamanho de um arquivo em bytes (0 se não existir)."""
+        try:
+            return os.path.getsize(caminho)
+        except OSError:
+            return 0
+
+    def _listar_objetos(self):
+        """Lista (mtime, tamanho, caminho) de todos os artefatos (varre a pasta)."""
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.pasta_objetos):
+            for nome in arquivos:
+                if nome.endswith('.tmp'):
+                    continue
+                caminho = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue
+                entradas.append((info.st_mtime, info.st_size, caminho))
+        return entradas
+
+    def _aplicar_limite(self, acrescimo=0):
+        """
+        Soma `acrescimo` bytes ao total corrente e, se passar do tamanho máximo,
+        despeja os artefatos menos usados até o cache caber nele.
+        """
+        with self._lock:
+            self._tamanho_total += acrescimo
+            if self._tamanho_total <= self.tamanho_maximo:
+                return
+
+            # Só aqui a pasta é varrida (o total também é ressincronizado com o disco)
+            entradas = self._listar_objetos()
+            tamanho_total = sum(tamanho for _, tamanho, _ in entradas)
+
+            entradas.sort()
+            removidos = 0
+            for _, tamanho, caminho in entradas:
+                if tamanho_total <= self.tamanho_maximo:
+                    break
+                try:
+                    os.unlink(caminho)
+                    tamanho_total -= tamanho
+                    removidos += 1
+                except OSError:
+                    continue
+
+            self._tamanho_total = tamanho_total
+            if removidos:
+                self.logger.info(
+                    f"🧹 Cache: {removidos} artefato(s) despejado(s) (LRU), "
+                    f"ocupação atual {tamanho_total / (1024 * 1024):.1f} MB"
+                )
@@ -0,0 +1,110 @@
+"""
+Cache de Embeddings de Prompt (Text Encoder do Stable Diffusion)
+Guarda a saída do CLIP para cada prompt, em memória e no cache de artefatos,
+para que o prompt negativo (igual em todas as cenas) e os prompts de cenas
+repetidas ou refeitas não sejam codificados de novo.
+"""
+import os
+import logging
+import tempfile
+import threading
+
+import torch
+
+
+class CacheEmbeddingsPrompt:
+    """
+    Embeddings do text encoder indexados por (modelo, prompt).
+
+    Os tensores ficam na CPU (memória e disco) e são movidos para o
+    dispositivo/dtype do pipeline no momento do uso.
+    """
+
+    def __init__(self, modelo_id, cache=None, logger=None):
+        """
+        Inicializa o cache de embeddings.
+
+        Args:
+            modelo_id: Id do modelo Stable Diffusion (faz parte da chave)
+            cache: Instância opcional de CacheArtefatos para persistir em disco
+            logger: Logger opcional para saída de logs
+        """
+        self.modelo_id = modelo_id
+        self.cache = cache
+        self.logger = logger or logging.getLogger("CacheEmbeddingsPrompt")
+
+        self._embeddings = {}
+        self._lock = threading.Lock()
+
+        self.estatisticas = {'memoria': 0, 'disco': 0, 'codificados': 0}
+
+    def _chave(self, prompt):
+        """Chave do embedding no cache de artefatos."""
+        return self.cache.chave('embedding_prompt', prompt=prompt, modelo=self.modelo_id)
+
+    def obter(self, pipe, prompts):
+        """
+        Retorna os embeddings de uma lista de prompts, prontos para o pipeline.
+
+        Ordem de busca: memória → cache em disco → text encoder (em um único
+        lote com todos os prompts que faltarem).
+
+        Args:
+            pipe: Pipeline do diffusers (fornece tokenizer, text encoder e dispositivo)
+            prompts: Lista de strings
+
+        Returns:
+            Tensor [len(prompts), tokens, dimensão] no dispositivo/dtype do pipeline
+        """
+        with self._lock:
+            faltando = []
+            for prompt in dict.fromkeys(prompts):
+                if prompt in self._embeddings:
+                    self.estatisticas['memoria'] += 1
+                    continue
+
+                if self.cache is not None:
+                    caminho = self.cache.obter_caminho('embedding_prompt', self._chave(prompt), '.pt')
+                    if caminho is not None:
+                        self._embeddings[prompt] = torch.load(caminho, map_location="cpu")
+                        self.estatisticas['disco'] += 1
+                        continue
+
+                faltando.append(prompt)
+
+            if faltando:
+                self._codificar(pipe, faltando)
+
+            embeddings = torch.cat([self._embeddings[p] for p in prompts])
+
+        return embeddings.to(device=pipe._execution_device, dtype=pipe.text_encoder.dtype)
+
+    def _codificar(self, pipe, prompts):
+        """Codifica os prompts no text encoder e guarda os resultados."""
+        with torch.no_grad():
+            # Sem guidance: só o embedding positivo de cada texto
+            embeddings, _ = pipe.encode_prompt(
+                prompts,
+                device=pipe._execution_device,
+                num_images_per_prompt=1,
+                do_classifier_free_guidance=False
+            )
+
+        for prompt, embedding in zip(prompts, embeddings):
+            embedding = embedding.unsqueeze(0).detach().cpu()
+            self._embeddings[prompt] = embedding
+            self.estatisticas['codificados'] += 1
+            if self.cache is not None:
+                self._persistir(prompt, embedding)
+
+        self.logger.debug(f"Text encoder: {len(prompts)} prompt(s) codificado(s)")
+
+    def _persistir(self, prompt, embedding):
+        """Salva o embedding no cache de artefatos."""
+        fd, temporario = tempfile.mkstemp(suffix='.pt')
+        os.close(fd)
+        try:
+            torch.save(embedding, temporario)
+            self.cache.guardar_arquivo('embedding_prompt', self._chave(prompt), '.pt', temporario)
+        finally:
+            os.unlink(temporario)
@@ -0,0 +1,156 @@
+"""
+Seleção de Estratégia de Memória para o Stable Diffusion
+Mede a VRAM/RAM disponíveis e escolhe como carregar os pipelines de difusão,
+para que o mesmo arquivo de histórias rode em GPUs grandes, GPUs de 6 GB e
+máquinas só com CPU sem mudar o código.
+"""
+import os
+import logging
+import importlib.util
+
+import torch
+
+
+class EstrategiaMemoria:
+    """
+    Estratégia de carregamento/execução dos pipelines de difusão.
+
+    Estratégias (da mais rápida para a mais econômica):
+        gpu_completo       - fp16, tudo na GPU
+        fatiamento         - fp16 na GPU com attention slicing e VAE slicing/tiling
+        offload_sequencial - fp16, submódulos vão para a GPU só durante o uso (requer accelerate)
+        cpu_fp32           - fp32 na CPU (sem CUDA)
+    """
+
+    ESTRATEGIAS = ('gpu_completo', 'fatiamento', 'offload_sequencial', 'cpu_fp32')
+
+    # VRAM total mínima (MB) para cada estratégia de GPU no modo 'auto'
+    VRAM_MINIMA_MB = {
+        'gpu_completo': 10 * 1024,
+        'fatiamento': 5 * 1024,
+        'offload_sequencial': 2 * 1024
+    }
+
+    def __init__(self, nome="auto", logger=None):
+        """
+        Sonda a memória disponível e define a estratégia.
+
+        Args:
+            nome: Uma das ESTRATEGIAS ou 'auto'
+            logger: Logger opcional para saída de logs
+        """
+        self.logger = logger or logging.getLogger("EstrategiaMemoria")
+        self.vram_total_mb = self._vram_total_mb()
+        self.ram_total_mb = self._ram_total_mb()
+
+        if nome == "auto":
+            nome = self._escolher_automaticamente()
+        elif nome not in self.ESTRATEGIAS:
+            raise ValueError(f"Estratégia de memória desconhecida: '{nome}' (use {', '.join(self.ESTRATEGIAS)} ou auto)")
+        elif nome != 'cpu_fp32' and not torch.cuda.is_available():
+            self.logger.warning(f"⚠️  Estratégia '{nome}' requer CUDA - usando 'cpu_fp32'")
+            nome = 'cpu_fp32'
+
+        if nome == 'offload_sequencial' and importlib.util.find_spec('accelerate') is None:
+            # Sem 'accelerate' não há offload: fatiamento é o mais econômico que resta na GPU
+            self.logger.warning("⚠️  Offload sequencial requer o pacote 'accelerate' - usando 'fatiamento'")
+            nome = 'fatiamento'
+
+        self.nome = nome
+        self.desempenho = {'imagens': 0, 'tempo': 0.0}
+
+        self.logger.info(
+            f"🧮 Estratégia de memória das imagens: {self.nome} "
+            f"(VRAM total: {self._formatar_mb(self.vram_total_mb)}, RAM total: {self._formatar_mb(self.ram_total_mb)})"
+        )
+
+    # --- Sondagem ---
+
+    def _vram_total_mb(self):
+        """VRAM total da GPU em MB (None se não houver CUDA)."""
+        if not torch.cuda.is_available():
+            return None
+        _, total = torch.cuda.mem_get_info()
+        return total / 1024**2
+
+    def _ram_total_mb(self):
+        """RAM total do sistema em MB (None se não for possível detectar)."""
+        try:
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024**2
+        except (ValueError, OSError, AttributeError):
+            return None
+
+    def _formatar_mb(self, valor):
+        """Formata um valor em MB para os logs ('n/d' se desconhecido)."""
+        return f"{valor:.0f} MB" if valor is not None else "n/d"
+
+    def _escolher_automaticamente(self):
+        """Escolhe a estratégia mais rápida que cabe na VRAM disponível."""
+        if self.vram_total_mb is None:
+            return 'cpu_fp32'
+
+        for nome in ('gpu_completo', 'fatiamento', 'offload_sequencial'):
+            if self.vram_total_mb >= self.VRAM_MINIMA_MB[nome]:
+                return nome
+        return 'cpu_fp32'
+
+    # --- Propriedades da estratégia ---
+
+    @property
+    def dtype(self):
+        """Precisão dos pesos."""
+        return torch.float32 if self.nome == 'cpu_fp32' else torch.float16
+
+    @property
+    def dispositivo_gerador(self):
+        """Dispositivo dos torch.Generator (onde o ruído inicial é sorteado)."""
+        return "cpu" if self.nome == 'cpu_fp32' else "cuda"
+
+    @property
+    def dispositivo_residencia(self):
+        """Onde os pesos ficam guardados (define o orçamento usado no GerenciadorModelos)."""
+        return "cuda" if self.nome in ('gpu_completo', 'fatiamento') else "cpu"
+
+    @property
+    def permite_lotes(self):
+        """Se vale a pena gerar várias cenas por chamada nesta estratégia."""
+        return self.nome in ('gpu_completo', 'fatiamento')
+
+    # --- Aplicação ---
+
+    def preparar(self, pipe):
+        """
+        Coloca um pipeline recém-carregado no dispositivo conforme a estratégia.
+
+        Args:
+            pipe: Pipeline do diffusers carregado com `torch_dtype=self.dtype`
+
+        Returns:
+            O mesmo pipeline, pronto para uso
+        """
+        if self.nome == 'cpu_fp32':
+            return pipe.to("cpu")
+
+        if self.nome == 'offload_sequencial':
+            pipe.enable_sequential_cpu_offload()
+            return pipe
+
+        pipe = pipe.to("cuda")
+        if self.nome == 'fatiamento':
+            pipe.enable_attention_slicing()
+            pipe.enable_vae_slicing()
+            pipe.enable_vae_tiling()
+        return pipe
+
+    # --- Desempenho ---
+
+    def registrar(self, imagens, segundos):
+        """Acumula o tempo de geração medido com esta estratégia."""
+        self.desempenho['imagens'] += imagens
+        self.desempenho['tempo'] += segundos
+
+    def imagens_por_minuto(self):
+        """Vazão medida (imagens/minuto), ou None se nada foi gerado."""
+        if not self.desempenho['imagens'] or self.desempenho['tempo'] <= 0:
+            return None
+        return self.desempenho['imagens'] * 60 / self.desempenho['tempo']
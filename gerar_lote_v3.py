@@ -5,6 +5,8 @@ Gera vídeos automaticamente a partir de histórias usando IA (TTS + Stable Diff
 import os
 import json
 import math
+import hashlib
+import argparse
 import time
 import logging
 from datetime import datetime
@@ -12,24 +14,37 @@ from pathlib import Path
 
 import torch
 from TTS.api import TTS
-from diffusers import StableDiffusionPipeline,StableDiffusionImg2ImgPipeline
+from diffusers import StableDiffusionPipeline,StableDiffusionImg2ImgPipeline,StableDiffusionUpscalePipeline
 from moviepy.editor import *
 from PIL import Image
 import random
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 # Importa o gerador de legendas separado
 from legenda_generator import LegendaGenerator
+from agendador_pipeline import AgendadorPipeline
+from cache_artefatos import CacheArtefatos
+from manifesto_lote import ManifestoLote
+from gerenciador_modelos import GerenciadorModelos
+from sintese_voz import SintetizadorXTTS
+from embeddings_prompt import CacheEmbeddingsPrompt
+from estrategia_memoria import EstrategiaMemoria
+from ampliador_imagens import AmpliadorImagens
+from motor_montagem import MotorMontagem, MontagemFFmpeg, MontagemSegmentada
+from mixador_audio import MixadorAudio
+from preparador_cenas import PreparadorCenas
 
 class VideoPipeline:
     """Pipeline principal para geração automatizada de vídeos em lote"""
     
-    def __init__(self, config_path="config.json"):
+    def __init__(self, config_path="config.json", rascunho=False):
         """
         Inicializa o pipeline carregando a configuração e configurando o logger.
         
         Args:
             config_path: Caminho para o arquivo de configuração JSON
+            rascunho: Se True, aplica o perfil 'rascunho' (prévia rápida, --draft)
         """
         self.logger = self._setup_logging()
         self._log_separator("=", "INICIALIZANDO PIPELINE")
@@ -49,12 +64,62 @@ class VideoPipeline:
         except Exception as e:
             self.logger.error(f"✗ ERRO ao ler o config.json: {e}")
             raise
+        
+        # Perfil de rascunho: sobrepõe a config e isola saídas/cache da produção
+        self.rascunho = rascunho
+        self.cache_producao = None
+        config_cache_producao = None
+        if rascunho:
+            config_cache_producao = self._aplicar_perfil_rascunho()
             
-        self.modelo_tts = None
-        self.modelo_t2i = None
+        # Todos os modelos (TTS, SD, Whisper) ficam no gerenciador de residência
+        config_residencia = self.config.get('modelos_residentes', {})
+        self.modelos = GerenciadorModelos(
+            orcamento_vram_mb=config_residencia.get('orcamento_vram_mb', 'auto'),
+            orcamento_ram_mb=config_residencia.get('orcamento_ram_mb', 'auto'),
+            logger=self.logger
+        )
+        # Quando True, as etapas não descarregam seus modelos ao terminar
+        # (usado pelo modo 'por_etapa', que libera cada modelo no fim da etapa)
+        self.manter_modelos_carregados = False
+        self.cache = self._criar_cache()
+        if config_cache_producao and config_cache_producao.get('ativo', False):
+            # Só leitura: reaproveita narrações já sintetizadas pela produção
+            # sem mexer na ordem do LRU dela
+            self.cache_producao = CacheArtefatos(
+                pasta=config_cache_producao.get('pasta', 'cache'),
+                tamanho_maximo_mb=config_cache_producao.get('tamanho_maximo_mb', 10240),
+                logger=self.logger,
+                somente_leitura=True
+            )
+        self.manifesto = None
+        # Latentes da voz clonada calculados uma vez por arquivo (memória + cache)
+        self.sintetizador_voz = SintetizadorXTTS(
+            modelo_id=self.config['models']['tts'],
+            idioma=self.config['audio']['language'],
+            cache=self.cache,
+            logger=self.logger
+        )
+        # Como carregar o Stable Diffusion nesta máquina (GPU cheia, fatiada, offload ou CPU)
+        self.estrategia_imagens = EstrategiaMemoria(
+            self.config.get('imagens', {}).get('estrategia_memoria', 'auto'),
+            logger=self.logger
+        )
+        # Fase dois (ampliação) da geração em baixa resolução, se ativa
+        self.ampliador = self._criar_ampliador()
+        # Pré-mixagem NumPy da narração com a música (música decodificada uma vez por lote)
+        self.mixador = self._criar_mixador()
+        # Embeddings do text encoder por prompt (memória + cache)
+        self.embeddings_prompt = CacheEmbeddingsPrompt(
+            modelo_id=self.config['models']['t2i'],
+            cache=self.cache,
+            logger=self.logger
+        )
         self.stats = {
             'tempo_audio': [],
             'tempo_imagens': [],
+            'tempo_fase_geracao': [],
+            'tempo_fase_ampliacao': [],
             'tempo_montagem': []
         }
 
@@ -121,6 +186,67 @@ class VideoPipeline:
         
         self.logger.debug("Configuração validada com sucesso")
     
+    def _mesclar_config(self, base, sobreposicao):
+        """Mescla recursivamente dois dicionários de configuração (a sobreposição vence)."""
+        resultado = dict(base)
+        for chave, valor in sobreposicao.items():
+            if isinstance(valor, dict) and isinstance(resultado.get(chave), dict):
+                resultado[chave] = self._mesclar_config(resultado[chave], valor)
+            else:
+                resultado[chave] = valor
+        return resultado
+    
+    def _aplicar_perfil_rascunho(self):
+        """
+        Aplica o perfil de rascunho (config: rascunho) sobre a configuração.
+        
+        Garante que a pasta de saída, o cache e o manifesto do rascunho
+        sejam sempre diferentes dos da produção.
+        
+        Returns:
+            Configuração do cache de produção (usada só para leitura do áudio)
+        """
+        config_cache_producao = dict(self.config.get('cache', {}))
+        pasta_saida_producao = self.config['output_folder']
+        
+        self.config = self._mesclar_config(self.config, self.config.get('rascunho', {}))
+        
+        if self.config['output_folder'] == pasta_saida_producao:
+            self.config['output_folder'] = f"{pasta_saida_producao}_rascunho"
+        
+        config_cache = self.config.setdefault('cache', {})
+        pasta_cache_producao = config_cache_producao.get('pasta', 'cache')
+        if config_cache.get('pasta', 'cache') == pasta_cache_producao:
+            config_cache['pasta'] = f"{pasta_cache_producao}_rascunho"
+        
+        self.config.setdefault('lote', {})['manifesto'] = os.path.join(self.config['output_folder'], "manifesto_lote.sqlite")
+        
+        w_video, h_video = self.config['video']['format']
+        self.logger.info(
+            f"📝 MODO RASCUNHO: {w_video}x{h_video}, preset '{self.config['video'].get('preset', 'medium')}', "
+            f"Whisper '{self.config['video'].get('whisper_model', 'small')}' | saída em '{self.config['output_folder']}'"
+        )
+        return config_cache_producao
+    
+    def _criar_cache(self):
+        """
+        Cria o cache de artefatos (config: cache), se estiver ativo.
+        
+        Returns:
+            Instância de CacheArtefatos ou None se o cache estiver desativado
+        """
+        config_cache = self.config.get('cache', {})
+        if not config_cache.get('ativo', False):
+            return None
+        
+        cache = CacheArtefatos(
+            pasta=config_cache.get('pasta', 'cache'),
+            tamanho_maximo_mb=config_cache.get('tamanho_maximo_mb', 10240),
+            logger=self.logger
+        )
+        self.logger.info(f"🗄️  Cache de artefatos ativo em: {cache.pasta}")
+        return cache
+    
     def _formatar_tempo(self, segundos):
         """
         Formata tempo em segundos para formato legível.
@@ -138,11 +264,51 @@ class VideoPipeline:
         else:
             return f"{segundos:.1f}s"
 
+    def _carregar_modelo_tts(self):
+        """
+        Carrega o modelo TTS no dispositivo disponível (GPU ou CPU).
+        
+        Returns:
+            Instância de TTS pronta para síntese
+        """
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.logger.info(f"🔧 Inicializando modelo TTS: {self.config['models']['tts']}")
+        self.logger.info(f"🖥️  Dispositivo: {device.upper()}")
+        
+        inicio_carregamento = time.perf_counter()
+        
+        tts = TTS(self.config['models']['tts'])
+        tts.to(device)
+
+        self._log_vram_usage(log_prefix="[TTS Carregado]")
+        
+        tempo_carregamento = time.perf_counter() - inicio_carregamento
+        self.logger.info(f"✓ Modelo TTS carregado em {self._formatar_tempo(tempo_carregamento)}")
+        return tts
+    
+    def _modelos_residentes(self):
+        """
+        Indica se as etapas devem manter seus modelos carregados ao terminar.
+        
+        Verdadeiro no modo 'por_etapa' ou quando a residência de modelos está
+        ativa (config: modelos_residentes.ativo). Nesse caso quem decide o que
+        sai da memória é o orçamento de VRAM/RAM do GerenciadorModelos.
+        """
+        return self.manter_modelos_carregados or self.config.get('modelos_residentes', {}).get('ativo', True)
+    
+    def _liberar_modelo_tts(self):
+        """Descarrega o modelo TTS residente (fim da etapa de áudio)."""
+        if self.modelos.residente('tts'):
+            self.modelos.liberar('tts')
+            self._log_vram_usage(log_prefix="[TTS descarregado]")
+            self.logger.info("✓ Modelo TTS descarregado da VRAM.")
+
     def _gerar_audio(self, texto_narracao, arquivo_saida):
         """
         ETAPA 1: Gera o áudio da narração usando o TTS com clonagem de voz.
-        NOTA: O modelo é carregado e descarregado da VRAM a cada chamada
-        para liberar memória para a Etapa 2 (Imagens).
+        NOTA: O modelo fica residente entre as histórias enquanto couber no
+        orçamento de memória. Com a residência desativada, ele é descarregado
+        a cada chamada para liberar memória para a Etapa 2 (Imagens).
         """
         inicio = time.perf_counter()
         
@@ -150,31 +316,16 @@ class VideoPipeline:
         self.logger.info("│  ETAPA 1: GERAÇÃO DE ÁUDIO (TTS)                          │")
         self.logger.info("└─────────────────────────────────────────────────────────────┘")
         
-        # --- MUDANÇA: Modelo TTS agora é uma variável local ---
-        tts = None 
-        
+        tts = None
         try:
             # Informações sobre o texto
             num_palavras = len(texto_narracao.split())
             num_caracteres = len(texto_narracao)
             self.logger.info(f"📝 Texto da narração: {num_caracteres} caracteres, {num_palavras} palavras")
             
-            # --- MUDANÇA: O modelo agora é carregado TODA VEZ ---
             device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.logger.info(f"🔧 Inicializando modelo TTS: {self.config['models']['tts']}")
-            self.logger.info(f"🖥️  Dispositivo: {device.upper()}")
-            
-            inicio_carregamento = time.perf_counter()
-            
-            # Carrega na variável local 'tts', não em 'self.modelo_tts'
-            tts = TTS(self.config['models']['tts']) 
-            tts.to(device)
-
-            # --- ADICIONE ESTA LINHA ---
-            self._log_vram_usage(log_prefix="[TTS Carregado]")
-            
-            tempo_carregamento = time.perf_counter() - inicio_carregamento
-            self.logger.info(f"✓ Modelo TTS carregado em {self._formatar_tempo(tempo_carregamento)}")
+            # Em nós só com CPU o TTS fica fixado: não é despejado durante o lote
+            tts = self.modelos.adquirir('tts', self._carregar_modelo_tts, dispositivo=device, fixar=(device == "cpu"))
             
             # Define o speaker (clonagem de voz ou padrão)
             speaker_args = {}
@@ -192,12 +343,29 @@ class VideoPipeline:
             self.logger.info("🔊 Sintetizando áudio...")
             inicio_sintese = time.perf_counter()
             
-            tts.tts_to_file( # Usa a variável local 'tts'
-                text=texto_narracao,
-                language=self.config['audio']['language'],
-                file_path=arquivo_saida,
-                **speaker_args
-            )
+            config_audio = self.config['audio']
+            if 'speaker_wav' in speaker_args and SintetizadorXTTS.suporta(tts) and config_audio.get('tts_em_frases', False):
+                # Modo por frases: trabalhadores em paralelo + .wav escrito em fluxo (normalizado pelo pico)
+                tempos = self.sintetizador_voz.sintetizar_em_frases(
+                    tts,
+                    texto_narracao,
+                    arquivo_saida,
+                    speaker_args['speaker_wav'],
+                    trabalhadores=config_audio.get('tts_trabalhadores', 2),
+                    silencio_entre_frases=config_audio.get('silencio_entre_frases'),
+                    arquivo_tempos=self._arquivo_tempos_frases(arquivo_saida)
+                )
+                self.logger.info(f"  └─ Tempos por frase: {Path(self._arquivo_tempos_frases(arquivo_saida)).name} ({len(tempos)} frases)")
+            elif 'speaker_wav' in speaker_args and SintetizadorXTTS.suporta(tts):
+                # Reaproveita os latentes do locutor em vez de recalculá-los
+                self.sintetizador_voz.sintetizar(tts, texto_narracao, arquivo_saida, speaker_args['speaker_wav'])
+            else:
+                tts.tts_to_file(
+                    text=texto_narracao,
+                    language=self.config['audio']['language'],
+                    file_path=arquivo_saida,
+                    **speaker_args
+                )
             
             tempo_sintese = time.perf_counter() - inicio_sintese
             tempo_total = time.perf_counter() - inicio
@@ -219,243 +387,830 @@ class VideoPipeline:
             return None
             
         finally:
-            # --- MUDANÇA: A PARTE MAIS IMPORTANTE ---
-            # Limpa a VRAM DEPOIS que a função termina (com sucesso ou erro)
             if tts is not None:
-                del tts
-                torch.cuda.empty_cache()
-                # --- ADICIONE ESTA LINHA ---
-                # --- ADICIONE ESTA LINHA ---
-                self._log_vram_usage(log_prefix="[Pipe Descarregado]")
-                self._log_vram_usage(log_prefix="[TTS descarregado]")
-                self.logger.info("✓ Modelo TTS descarregado da VRAM.")
+                tts = None
+                self.modelos.devolver('tts')
+            # Sem residência: limpa a VRAM DEPOIS que a função termina (com sucesso ou erro)
+            if not self._modelos_residentes():
+                self._liberar_modelo_tts()
 
-    def _gerar_imagens(self, lista_cenas, pasta_saida):
+    def _arquivo_tempos_frases(self, arquivo_audio):
+        """Caminho do JSON com os tempos de cada frase da narração (modo por frases)."""
+        return os.path.splitext(arquivo_audio)[0] + "_tempos.json"
+    
+    def _chave_cache_audio(self, texto_narracao, cache=None):
+        """Chave do cache de narração: texto, voz clonada, idioma e modelo TTS."""
+        cache = cache or self.cache
+        config_audio = self.config['audio']
+        voz_clone_path = config_audio['voice_clone_wav']
+        return cache.chave(
+            'audio',
+            texto=texto_narracao,
+            voz=cache.hash_arquivo(voz_clone_path) or "Ana Florence",
+            idioma=config_audio['language'],
+            modelo=self.config['models']['tts'],
+            em_frases=config_audio.get('tts_em_frases', False),
+            silencio=config_audio.get('silencio_entre_frases')
+        )
+    
+    def _gerar_audio_com_cache(self, texto_narracao, arquivo_saida):
         """
-        ETAPA 2: Gera imagens em modo HÍBRIDO (T2I ou I2I)
-        com GERENCIAMENTO INTELIGENTE DE VRAM para 6GB.
+        Consulta o cache de artefatos antes de chamar _gerar_audio.
+        
+        Returns:
+            Caminho do áudio ou None em caso de falha
         """
-        self.logger.info(f"Iniciando Etapa 2 (Híbrida) com {self.config['models']['t2i']}")
-        os.makedirs(pasta_saida, exist_ok=True)
+        if self.cache is None:
+            return self._gerar_audio(texto_narracao, arquivo_saida)
         
-        # --- Configurações ---
-        modelo_id = self.config['models']['t2i']
-        t2i_altura = 1024
-        t2i_largura = 768
-        i2i_strength = 0.7  # 0.6 = mais parecido com a base, 0.8 = mais diferente
-
-        # --- Lógica de Gerenciamento de VRAM ---
-        current_pipe = None
-        current_pipe_type = None # "t2i" ou "i2i"
-        # --- Fim da Lógica ---
+        chave = self._chave_cache_audio(texto_narracao)
+        arquivo_tempos = self._arquivo_tempos_frases(arquivo_saida)
+        if self.cache.obter_arquivo('audio', chave, '.wav', arquivo_saida):
+            # O JSON de tempos por frase acompanha o áudio (modo por frases)
+            self.cache.obter_arquivo('tempos_frases', chave, '.json', arquivo_tempos)
+            self.logger.info(f"🗄️  Áudio recuperado do cache: {Path(arquivo_saida).name}")
+            return arquivo_saida
+        
+        path_audio = self._gerar_audio(texto_narracao, arquivo_saida)
+        if path_audio:
+            self.cache.guardar_arquivo('audio', chave, '.wav', path_audio)
+            if self.config['audio'].get('tts_em_frases', False) and os.path.exists(arquivo_tempos):
+                self.cache.guardar_arquivo('tempos_frases', chave, '.json', arquivo_tempos)
+        return path_audio
 
+    def _config_imagens(self):
+        """
+        Parâmetros da geração de imagens (config: imagens), com os padrões originais.
+        
+        Returns:
+            Dicionário com tamanho, passos, força do I2I, guidance e prompt negativo
+        """
+        config_imagens = self.config.get('imagens', {})
+        return {
+            'largura': config_imagens.get('largura', 768),
+            'altura': config_imagens.get('altura', 1024),
+            'forca_i2i': config_imagens.get('forca_i2i', 0.7),  # 0.6 = mais parecido com a base, 0.8 = mais diferente
+            'passos_t2i': config_imagens.get('passos_t2i', 25),
+            'passos_i2i': config_imagens.get('passos_i2i', 30),
+            'guidance_scale': config_imagens.get('guidance_scale', 7.5),
+            'prompt_negativo': config_imagens.get(
+                'prompt_negativo',
+                "blurry, low quality, deformed, disfigured, text, watermark, (bad-artist:1.2), (worst quality:1.2)"
+            ),
+            'tamanho_lote': config_imagens.get('tamanho_lote', 'auto'),
+            'tamanho_lote_maximo': config_imagens.get('tamanho_lote_maximo', 4),
+            'baixa_resolucao': config_imagens.get('baixa_resolucao', {})
+        }
+    
+    def _tamanho_imagem_montagem(self):
+        """
+        Tamanho exato que a montagem usa para cada cena: a imagem ajustada à
+        altura do vídeo e ampliada 1.1x para o Ken Burns (768x1024 -> 1584x2112 em 1080x1920).
+        
+        Returns:
+            Tupla (largura, altura)
+        """
+        cfg = self._config_imagens()
+        _, h_video = self.config['video']['format']
+        altura = round(h_video * 1.1)
+        largura = round(altura * cfg['largura'] / cfg['altura'])
+        return largura, altura
+    
+    def _criar_ampliador(self):
+        """
+        Cria o ampliador da fase dois, se a geração em baixa resolução estiver ativa.
+        
+        Returns:
+            AmpliadorImagens ou None
+        """
+        config_baixa = self._config_imagens()['baixa_resolucao']
+        if not config_baixa.get('ativo', False):
+            return None
+        return AmpliadorImagens(
+            metodo=config_baixa.get('metodo_ampliacao', 'lanczos'),
+            tamanho_bloco=config_baixa.get('tamanho_bloco', 192),
+            sobreposicao=config_baixa.get('sobreposicao', 32),
+            passos=config_baixa.get('passos_ampliacao', 20),
+            logger=self.logger
+        )
+    
+    def _criar_mixador(self):
+        """
+        Cria o mixador de áudio, se a pré-mixagem estiver ativa (config: audio.pre_mixagem).
+        
+        Returns:
+            MixadorAudio ou None
+        """
+        config_mixagem = self.config['audio'].get('pre_mixagem', {})
+        if not config_mixagem.get('ativo', False):
+            return None
+        return MixadorAudio(
+            ducking=config_mixagem.get('ducking', True),
+            reducao_ducking_db=config_mixagem.get('reducao_ducking_db', 8.0),
+            limiar_voz_db=config_mixagem.get('limiar_voz_db', -40.0),
+            suavizacao_ducking=config_mixagem.get('suavizacao_ducking', 0.25),
+            loudness_alvo_db=config_mixagem.get('loudness_alvo_db', -16.0),
+            pico_maximo_db=config_mixagem.get('pico_maximo_db', -1.0),
+            taxa_amostragem=config_mixagem.get('taxa_amostragem', 44100),
+            canais=config_mixagem.get('canais', 2),
+            logger=self.logger
+        )
+    
+    def _preparar_tarefas_imagem(self, lista_cenas, pasta_saida, id_video=None):
+        """
+        Transforma as cenas de uma história em tarefas de geração de imagem.
+        
+        Args:
+            lista_cenas: Lista de cenas do JSON
+            pasta_saida: Pasta onde salvar cena_XX.png
+            id_video: Id da história (só para os logs)
+            
+        Returns:
+            Lista de dicionários de tarefa (prompt, modo, tamanho, passos, seed, caminho...)
+        """
+        cfg = self._config_imagens()
+        os.makedirs(pasta_saida, exist_ok=True)
+        tarefas = []
+        
+        # Fase um em baixa resolução (com menos passos); a fase dois amplia até o tamanho da montagem
+        config_baixa = cfg['baixa_resolucao'] if self.ampliador is not None else {}
+        largura = config_baixa.get('largura', cfg['largura'])
+        altura = config_baixa.get('altura', cfg['altura'])
+        passos_t2i = config_baixa.get('passos_t2i', cfg['passos_t2i'])
+        passos_i2i = config_baixa.get('passos_i2i', cfg['passos_i2i'])
+        tamanho_final = self._tamanho_imagem_montagem() if self.ampliador is not None else None
+        
+        for i, cena in enumerate(lista_cenas):
+            # Decide qual pipeline é necessário para esta cena
+            modo = "t2i" # Padrão
+            if "imagem_base" in cena and os.path.exists(cena["imagem_base"]):
+                modo = "i2i"
+            elif "imagem_base" in cena: # Avisa se a imagem_base não foi encontrada
+                self.logger.warning(f"Cena {i+1} (Modo T2I) - Imagem base '{cena['imagem_base']}' não encontrada. Gerando do zero.")
+            
+            tarefas.append({
+                'indice': i,
+                'id_video': id_video,
+                'prompt': cena["prompt"],
+                'modo': modo,
+                'imagem_base': cena["imagem_base"] if modo == "i2i" else None,
+                'seed': cena.get("seed"),
+                'largura': largura,
+                'altura': altura,
+                'passos': passos_i2i if modo == "i2i" else passos_t2i,
+                'tamanho_final': tamanho_final,
+                'forca': cfg['forca_i2i'] if modo == "i2i" else None,
+                'guidance_scale': cfg['guidance_scale'],
+                'prompt_negativo': cfg['prompt_negativo'],
+                'caminho': os.path.join(pasta_saida, f"cena_{i+1:02d}.png")
+            })
+        
+        return tarefas
+    
+    def _chave_cache_imagem(self, tarefa):
+        """Chave do cache de uma cena: prompt, negativo, seed, passos, tamanho, modelo e imagem_base."""
+        partes = {}
+        if tarefa['tamanho_final'] is not None:
+            partes['ampliacao'] = [self.ampliador.metodo, self.ampliador.passos, list(tarefa['tamanho_final'])]
+        return self.cache.chave(
+            'imagem',
+            **partes,
+            prompt=tarefa['prompt'],
+            prompt_negativo=tarefa['prompt_negativo'],
+            seed=tarefa['seed'],
+            passos=tarefa['passos'],
+            tamanho=[tarefa['largura'], tarefa['altura']],
+            modelo=self.config['models']['t2i'],
+            modo=tarefa['modo'],
+            forca=tarefa['forca'],
+            guidance=tarefa['guidance_scale'],
+            imagem_base=self.cache.hash_arquivo(tarefa['imagem_base']) if tarefa['imagem_base'] else None
+        )
+    
+    def _tamanho_lote_imagens(self, largura, altura):
+        """
+        Escolhe quantas cenas gerar por chamada do pipeline.
+        
+        Com tamanho_lote = 'auto', usa a VRAM livre e uma estimativa de memória
+        de ativação por imagem (proporcional aos megapixels).
+        
+        Returns:
+            Tamanho do lote (>= 1)
+        """
+        cfg = self._config_imagens()
+        maximo = max(1, int(cfg['tamanho_lote_maximo']))
+        
+        if cfg['tamanho_lote'] != 'auto':
+            return max(1, int(cfg['tamanho_lote']))
+        if not self.estrategia_imagens.permite_lotes:
+            return 1
+        
+        livre, _ = torch.cuda.mem_get_info()
+        livre_mb = livre / 1024**2
+        # Estimativa conservadora de ativações do UNet/VAE em fp16 (+ margem de 1 GB)
+        mb_por_imagem = 1500 * (largura * altura) / (1024 * 1024)
+        return max(1, min(maximo, int((livre_mb - 1024) // mb_por_imagem)))
+    
+    def _agrupar_tarefas_imagem(self, tarefas):
+        """
+        Agrupa tarefas compatíveis (mesmo modo, tamanho, passos, força e guidance).
+        
+        Returns:
+            Lista de listas de tarefas, na ordem da primeira aparição de cada grupo
+        """
+        grupos = {}
+        for tarefa in tarefas:
+            chave = (tarefa['modo'], tarefa['largura'], tarefa['altura'], tarefa['passos'], tarefa['forca'], tarefa['guidance_scale'])
+            grupos.setdefault(chave, []).append(tarefa)
+        return list(grupos.values())
+    
+    def _gerar_lote_imagens(self, pipe, lote):
+        """
+        Gera um lote de cenas compatíveis em uma única chamada do pipeline.
+        
+        Args:
+            pipe: Pipeline T2I ou I2I (conforme o modo do lote)
+            lote: Lista de tarefas do mesmo grupo
+            
+        Returns:
+            Lista de imagens PIL, na ordem das tarefas
+        """
+        base = lote[0]
+        # Embeddings do CLIP vindos do cache (o negativo é o mesmo em todas as cenas)
+        prompt_embeds = self.embeddings_prompt.obter(pipe, [t['prompt'] for t in lote])
+        negative_prompt_embeds = self.embeddings_prompt.obter(pipe, [t['prompt_negativo'] for t in lote])
+        
+        # Um gerador por imagem: determinístico quando a cena define uma seed
+        generators = [
+            torch.Generator(device=self.estrategia_imagens.dispositivo_gerador).manual_seed(t['seed'] if t['seed'] is not None else random.randint(0, 2**31 - 1))
+            for t in lote
+        ]
+        
+        if base['modo'] == "i2i":
+            imagens_base = [
+                Image.open(t['imagem_base']).convert("RGB").resize((t['largura'], t['altura']))
+                for t in lote
+            ]
+            return pipe(
+                prompt_embeds=prompt_embeds,
+                image=imagens_base,
+                strength=base['forca'],
+                guidance_scale=base['guidance_scale'],
+                negative_prompt_embeds=negative_prompt_embeds,
+                num_inference_steps=base['passos'],
+                generator=generators
+            ).images
+        
+        return pipe(
+            prompt_embeds=prompt_embeds,
+            negative_prompt_embeds=negative_prompt_embeds,
+            num_inference_steps=base['passos'],
+            guidance_scale=base['guidance_scale'],
+            height=base['altura'],
+            width=base['largura'],
+            generator=generators
+        ).images
+    
+    def _gerar_tarefas_imagem(self, tarefas):
+        """
+        Gera as imagens de uma lista de tarefas (de uma ou várias histórias).
+        
+        Consulta o cache antes de carregar o modelo, agrupa as cenas compatíveis
+        em lotes e salva cada resultado no caminho cena_XX.png da sua tarefa.
+        Se um lote estourar a VRAM, ele é repetido com metade do tamanho.
+        Com a geração em baixa resolução, as imagens passam pela fase dois
+        (ampliação) antes de serem salvas.
+        
+        Args:
+            tarefas: Lista de tarefas (ver _preparar_tarefas_imagem)
+            
+        Returns:
+            Conjunto com os caminhos gerados (ou recuperados do cache) com sucesso
+        """
+        prontos = set()
+        pendentes = []
+        
+        # 1. Consulta o cache antes de carregar qualquer modelo
+        for tarefa in tarefas:
+            tarefa['chave_cache'] = self._chave_cache_imagem(tarefa) if self.cache is not None else None
+            if tarefa['chave_cache'] and self.cache.obter_arquivo('imagem', tarefa['chave_cache'], '.png', tarefa['caminho']):
+                self.logger.info(f"🗄️  Cena {tarefa['indice']+1} recuperada do cache.")
+                prontos.add(tarefa['caminho'])
+            else:
+                pendentes.append(tarefa)
+        
+        if not pendentes:
+            return prontos
+        
+        baixas = []  # (tarefa, imagem) aguardando a ampliação
+        inicio_fase = time.perf_counter()
+        
+        # 2. Carrega os pipelines (T2I e I2I compartilham os mesmos pesos)
+        pipes = self.modelos.adquirir(
+            'sd', self._carregar_pipelines_sd, dispositivo=self.estrategia_imagens.dispositivo_residencia
+        )
+        
         try:
-            prompt_negativo = "blurry, low quality, deformed, disfigured, text, watermark, (bad-artist:1.2), (worst quality:1.2)"
-            paths_imagens = []
-
-            for i, cena in enumerate(lista_cenas):
-                prompt = cena["prompt"]
-                caminho_img_saida = os.path.join(pasta_saida, f"cena_{i+1:02d}.png")
+            for grupo in self._agrupar_tarefas_imagem(pendentes):
+                base = grupo[0]
+                pipe = pipes[base['modo']]
+                tamanho_lote = self._tamanho_lote_imagens(base['largura'], base['altura'])
+                self.logger.info(
+                    f"Gerando {len(grupo)} cena(s) (Modo {base['modo'].upper()}, "
+                    f"{base['largura']}x{base['altura']}, {base['passos']} passos) em lotes de até {tamanho_lote}"
+                )
                 
-                # 1. Decide qual pipeline é necessário para esta cena
-                needed_pipe_type = "t2i" # Padrão
-                if "imagem_base" in cena and os.path.exists(cena["imagem_base"]):
-                    needed_pipe_type = "i2i"
-
-                # 2. Verifica se precisamos "trocar" o modelo na VRAM
-                if current_pipe_type != needed_pipe_type:
-                    self.logger.info(f"Trocando pipeline na VRAM para: {needed_pipe_type.upper()}")
-                    
-                    # Se um modelo já existe (ex: o T2I), remove ele da VRAM
-                    if current_pipe is not None:
-                        del current_pipe
+                inicio_lote = 0
+                while inicio_lote < len(grupo):
+                    lote = grupo[inicio_lote:inicio_lote + tamanho_lote]
+                    try:
+                        inicio_geracao = time.perf_counter()
+                        imagens = self._gerar_lote_imagens(pipe, lote)
+                        self.estrategia_imagens.registrar(len(lote), time.perf_counter() - inicio_geracao)
+                    except torch.cuda.OutOfMemoryError:
+                        if tamanho_lote == 1:
+                            raise
                         torch.cuda.empty_cache()
-                        self.logger.info("VRAM liberada.")
+                        tamanho_lote = max(1, tamanho_lote // 2)
+                        self.logger.warning(f"⚠️  VRAM insuficiente para o lote - tentando lotes de {tamanho_lote}")
+                        continue
                     
-                    # Carrega o NOVO modelo necessário
-                    if needed_pipe_type == "t2i":
-                        current_pipe = StableDiffusionPipeline.from_pretrained(
-                            modelo_id, torch_dtype=torch.float16
-                        ).to("cuda")
-                    else: # needed_pipe_type == "i2i"
-                        current_pipe = StableDiffusionImg2ImgPipeline.from_pretrained(
-                            modelo_id, torch_dtype=torch.float16
-                        ).to("cuda")
+                    # 3. Salva cada imagem no caminho da sua tarefa
+                    for tarefa, imagem in zip(lote, imagens):
+                        if tarefa['tamanho_final'] is not None:
+                            baixas.append((tarefa, imagem))
+                            continue
+                        imagem.save(tarefa['caminho'])
+                        prontos.add(tarefa['caminho'])
+                        if tarefa['chave_cache']:
+                            self.cache.guardar_arquivo('imagem', tarefa['chave_cache'], '.png', tarefa['caminho'])
                     
-                    current_pipe_type = needed_pipe_type
-
-                    self._log_vram_usage(log_prefix=f"[{current_pipe_type.upper()} Carregado]")
-                    self.logger.info(f"Modelo {current_pipe_type.upper()} carregado na VRAM.")
-                # --- Fim da Lógica de Troca ---
-
-                # 3. Gera a imagem com o pipeline que está na VRAM
-                if current_pipe_type == "i2i":
-                    # --- MODO I2I ---
-                    self.logger.info(f"Gerando cena {i+1} (Modo I2I) com base em: {cena['imagem_base']}")
-                    imagem_base = Image.open(cena["imagem_base"]).convert("RGB").resize((t2i_largura, t2i_altura))
-                    
-                    imagem = current_pipe(
-                        prompt,
-                        image=imagem_base,
-                        strength=i2i_strength,
-                        guidance_scale=7.5,
-                        negative_prompt=prompt_negativo,
-                        num_inference_steps=30
-                    ).images[0]
-                
-                else: 
-                    # --- MODO T2I ---
-                    if "imagem_base" in cena: # Avisa se a imagem_base não foi encontrada
-                        self.logger.warning(f"Cena {i+1} (Modo T2I) - Imagem base '{cena['imagem_base']}' não encontrada. Gerando do zero.")
-                    else:
-                        self.logger.info(f"Gerando cena {i+1} (Modo T2I) do zero.")
-
-                    imagem = current_pipe(
-                        prompt,
-                        negative_prompt=prompt_negativo,
-                        num_inference_steps=25,
-                        guidance_scale=7.5,
-                        height=t2i_altura,
-                        width=t2i_largura
-                    ).images[0]
-
-                # Salva a imagem gerada
-                imagem.save(caminho_img_saida)
-                paths_imagens.append(caminho_img_saida)
-
+                    inicio_lote += len(lote)
+        finally:
+            # Sem residência, libera a VRAM da GPU no final de tudo
+            pipes = pipe = None
+            self.modelos.devolver('sd')
+            if not self._modelos_residentes():
+                self._liberar_pipeline_imagens()
+        
+        self.stats['tempo_fase_geracao'].append(time.perf_counter() - inicio_fase)
+        
+        if baixas:
+            prontos.update(self._ampliar_imagens(baixas))
+        
+        return prontos
+    
+    def _ampliar_imagens(self, baixas):
+        """
+        Fase dois: amplia as imagens de baixa resolução até o tamanho da montagem.
+        
+        Args:
+            baixas: Lista de tuplas (tarefa, imagem PIL em baixa resolução)
+            
+        Returns:
+            Conjunto com os caminhos salvos
+        """
+        inicio = time.perf_counter()
+        prontos = set()
+        pipe = None
+        
+        try:
+            if self.ampliador.usa_modelo:
+                pipe = self.modelos.adquirir(
+                    'ampliador', self._carregar_pipeline_ampliacao,
+                    dispositivo=self.estrategia_imagens.dispositivo_residencia
+                )
+            
+            for tarefa, imagem in baixas:
+                imagem = self.ampliador.ampliar(imagem, tarefa['tamanho_final'], pipe=pipe, prompt=tarefa['prompt'])
+                imagem.save(tarefa['caminho'])
+                prontos.add(tarefa['caminho'])
+                if tarefa['chave_cache']:
+                    self.cache.guardar_arquivo('imagem', tarefa['chave_cache'], '.png', tarefa['caminho'])
+        finally:
+            if pipe is not None:
+                pipe = None
+                self.modelos.devolver('ampliador')
+            if self.ampliador.usa_modelo and not self._modelos_residentes():
+                self.modelos.liberar('ampliador')
+        
+        tempo = time.perf_counter() - inicio
+        self.stats['tempo_fase_ampliacao'].append(tempo)
+        self.logger.info(
+            f"🔍 {len(baixas)} cena(s) ampliada(s) para {tarefa['tamanho_final'][0]}x{tarefa['tamanho_final'][1]} "
+            f"({self.ampliador.metodo}) em {self._formatar_tempo(tempo)}"
+        )
+        return prontos
+    
+    def _gerar_imagens(self, lista_cenas, pasta_saida):
+        """
+        ETAPA 2: Gera imagens em modo HÍBRIDO (T2I ou I2I)
+        com GERENCIAMENTO INTELIGENTE DE VRAM para 6GB.
+        As cenas compatíveis são geradas em lote (config: imagens.tamanho_lote).
+        """
+        self.logger.info(f"Iniciando Etapa 2 (Híbrida) com {self.config['models']['t2i']}")
+        inicio = time.perf_counter()
+        
+        try:
+            tarefas = self._preparar_tarefas_imagem(lista_cenas, pasta_saida)
+            prontos = self._gerar_tarefas_imagem(tarefas)
+            
+            paths_imagens = [t['caminho'] for t in tarefas]
+            if len(prontos) != len(paths_imagens):
+                raise RuntimeError(f"{len(paths_imagens) - len(prontos)} cena(s) não foram geradas")
+            
+            self.stats['tempo_imagens'].append(time.perf_counter() - inicio)
             self.logger.info(f"Imagens salvas em: {pasta_saida}")
             return paths_imagens
 
         except Exception as e:
             self.logger.error(f"ERRO ao gerar imagens: {e}", exc_info=True)
             return None
+    
+    def _pregerar_imagens_lote(self, trabalhos):
+        """
+        Gera de uma vez as imagens de várias histórias (modo 'por_etapa'),
+        para que os lotes de difusão possam misturar cenas de histórias diferentes.
         
-        finally:
-            # Libera a VRAM da GPU no final de tudo
-            if current_pipe is not None:
-                del current_pipe
-                torch.cuda.empty_cache()
-                self._log_vram_usage(log_prefix="[Pipe Final Descarregado]")
-                self.logger.info("VRAM final liberada (pós-loop).")
+        As histórias cujas cenas ficaram todas prontas recebem
+        'paths_imagens_pregeradas'; as demais serão tentadas de novo,
+        individualmente, em _etapa_imagens.
+        
+        Args:
+            trabalhos: Dicionários de trabalho com a etapa de imagens pendente
+        """
+        tarefas_por_video = {}
+        todas = []
+        for trabalho in trabalhos:
+            tarefas = self._preparar_tarefas_imagem(
+                trabalho['historia']["cenas"], trabalho['pasta_imagens'], trabalho['id_video']
+            )
+            tarefas_por_video[trabalho['id_video']] = tarefas
+            todas.extend(tarefas)
+        
+        if not todas:
+            return
+        
+        self.logger.info(f"🖼️  Gerando {len(todas)} cena(s) de {len(trabalhos)} história(s) em lotes compartilhados")
+        inicio = time.perf_counter()
+        try:
+            prontos = self._gerar_tarefas_imagem(todas)
+        except Exception as e:
+            self.logger.error(f"ERRO na geração conjunta de imagens (cada história será tentada de novo): {e}", exc_info=True)
+            return
+        
+        for trabalho in trabalhos:
+            caminhos = [t['caminho'] for t in tarefas_por_video[trabalho['id_video']]]
+            if all(c in prontos for c in caminhos):
+                trabalho['paths_imagens_pregeradas'] = caminhos
+        
+        self.logger.info(f"✓ Geração conjunta concluída em {self._formatar_tempo(time.perf_counter() - inicio)}")
+    
+    def _carregar_pipelines_sd(self):
+        """
+        Carrega o Stable Diffusion uma única vez e monta os dois pipelines
+        (T2I e I2I) sobre o MESMO conjunto de componentes (UNet, VAE, text encoder).
+        
+        Returns:
+            Dicionário {'t2i': StableDiffusionPipeline, 'i2i': StableDiffusionImg2ImgPipeline}
+        """
+        modelo_id = self.config['models']['t2i']
+        inicio = time.perf_counter()
+        
+        pipe_t2i = StableDiffusionPipeline.from_pretrained(
+            modelo_id, torch_dtype=self.estrategia_imagens.dtype
+        )
+        # GPU inteira, fatiamento, offload sequencial ou CPU, conforme a estratégia
+        pipe_t2i = self.estrategia_imagens.preparar(pipe_t2i)
+        # O I2I reaproveita os módulos já carregados: nenhum peso é duplicado
+        pipe_i2i = StableDiffusionImg2ImgPipeline(**pipe_t2i.components)
+        
+        self._log_vram_usage(log_prefix="[SD Carregado]")
+        self.logger.info(f"Modelos T2I + I2I (pesos compartilhados, estratégia '{self.estrategia_imagens.nome}') carregados em {self._formatar_tempo(time.perf_counter() - inicio)}.")
+        return {'t2i': pipe_t2i, 'i2i': pipe_i2i}
+    
+    def _carregar_pipeline_ampliacao(self):
+        """
+        Carrega o Stable Diffusion x4 Upscaler (fase dois da baixa resolução).
+        
+        Returns:
+            StableDiffusionUpscalePipeline pronto conforme a estratégia de memória
+        """
+        config_baixa = self._config_imagens()['baixa_resolucao']
+        modelo_id = config_baixa.get('modelo_ampliacao', "stabilityai/stable-diffusion-x4-upscaler")
+        inicio = time.perf_counter()
+        
+        pipe = StableDiffusionUpscalePipeline.from_pretrained(modelo_id, torch_dtype=self.estrategia_imagens.dtype)
+        pipe = self.estrategia_imagens.preparar(pipe)
+        
+        self.logger.info(f"Upscaler '{modelo_id}' carregado em {self._formatar_tempo(time.perf_counter() - inicio)}.")
+        return pipe
+    
+    def _liberar_pipeline_imagens(self):
+        """Descarrega os pipelines de difusão residentes (fim da etapa de imagens)."""
+        self.modelos.liberar('ampliador')
+        if self.modelos.residente('sd'):
+            self.modelos.liberar('sd')
+            self._log_vram_usage(log_prefix="[Pipe Final Descarregado]")
+            self.logger.info("VRAM final liberada (pós-loop).")
 
-    def _montar_video(self, paths_imagens, path_audio, arquivo_saida):
+    def _montar_video(self, paths_imagens, path_audio, arquivo_saida, arquivo_legendas=None):
         """
         ETAPA 3: Monta o vídeo base (SEM LEGENDAS).
         - Música de fundo
         - Ken Burns Dinâmico (Zoom/Pan Aleatório)
         - Transições Crossfade
+        
+        O motor é escolhido em config: video.backend_montagem
+        ('moviepy', 'numpy', 'ffmpeg' ou 'segmentos').
+        
+        Com `arquivo_legendas` (.ass), as legendas são queimadas na mesma
+        codificação e `arquivo_saida` já é o vídeo final.
         """
         self.logger.info("┌─────────────────────────────────────────────────────────────┐")
         self.logger.info("│  ETAPA 3: MONTAGEM DO VÍDEO BASE (SEM LEGENDAS)           │")
         self.logger.info("└─────────────────────────────────────────────────────────────┘")
         inicio = time.perf_counter()
         
+        # None = caminho MoviePy original
+        backends = {
+            'moviepy': None,
+            'numpy': MotorMontagem,
+            'ffmpeg': MontagemFFmpeg,
+            'segmentos': MontagemSegmentada
+        }
+        backend = self.config['video'].get('backend_montagem', 'moviepy')
+        if backend not in backends:
+            self.logger.error(f"✗ ERRO: backend de montagem desconhecido '{backend}'. Use: {', '.join(backends)}")
+            return False
+        
+        musica_path = self.config['audio']['music_file']
+        if not os.path.exists(musica_path):
+            self.logger.warning(f"⚠️  Música de fundo '{musica_path}' não encontrada.")
+            musica_path = None
+        
+        arquivo_mixado = None
         try:
-            # 1. CARREGAR ÁUDIOS
-            self.logger.info(f"Carregando áudio de: {Path(path_audio).name}")
-            audio_clip = AudioFileClip(path_audio)
-            duracao_total = audio_clip.duration
-            
-            musica_path = self.config['audio']['music_file']
-            if os.path.exists(musica_path):
-                musica_vol = self.config['audio']['music_volume']
-                musica_fundo = AudioFileClip(musica_path).volumex(musica_vol)
-                
-                if musica_fundo.duration < duracao_total:
-                    musica_fundo = musica_fundo.fx(vfx.loop, duration=duracao_total)
-                else:
-                    musica_fundo = musica_fundo.subclip(0, duracao_total)
-                
-                audio_clip = CompositeAudioClip([audio_clip, musica_fundo])
-                self.logger.info(f"Música de fundo '{musica_path}' adicionada.")
+            if self.mixador is not None:
+                # A faixa final já sai pronta; o encoder só a multiplexa
+                arquivo_mixado = self._pre_mixar_audio(path_audio, musica_path, arquivo_saida)
+                path_audio, musica_path = arquivo_mixado, None
+            
+            if backends[backend] is None:
+                self._montar_video_moviepy(paths_imagens, path_audio, arquivo_saida, musica_path, arquivo_legendas)
             else:
-                self.logger.warning(f"⚠️  Música de fundo '{musica_path}' não encontrada.")
+                self._montar_video_motor(backends[backend], paths_imagens, path_audio, arquivo_saida, musica_path, arquivo_legendas)
+            
+            tempo_total = time.perf_counter() - inicio
+            self.stats['tempo_montagem'].append(tempo_total)
+            self.logger.info(f"✓ Montagem do vídeo base concluída em {self._formatar_tempo(tempo_total)} ({backend})")
+            return True
 
-            # 2. PREPARAR CENAS
-            num_cenas = len(paths_imagens)
-            duracao_por_cena = duracao_total / num_cenas
+        except Exception as e:
+            tempo_total = time.perf_counter() - inicio
+            self.logger.error(f"✗ ERRO ao montar vídeo base após {self._formatar_tempo(tempo_total)}: {e}", exc_info=True)
+            return False
+        
+        finally:
+            if arquivo_mixado and os.path.exists(arquivo_mixado):
+                os.unlink(arquivo_mixado)
+    
+    def _pre_mixar_audio(self, path_audio, musica_path, arquivo_saida):
+        """
+        Mistura narração e música em um .wav temporário ao lado do vídeo.
+        
+        Returns:
+            Caminho do .wav mixado (removido ao fim da montagem)
+        """
+        inicio = time.perf_counter()
+        arquivo_mixado = os.path.splitext(arquivo_saida)[0] + "_mixagem.wav"
+        self.mixador.mixar(
+            path_audio,
+            arquivo_mixado,
+            musica_path=musica_path,
+            musica_volume=self.config['audio']['music_volume']
+        )
+        self.logger.info(
+            f"🎚️  Áudio pré-mixado em {time.perf_counter() - inicio:.2f}s "
+            f"({self.mixador.taxa_amostragem} Hz, {self.mixador.canais} canal(is)): {Path(arquivo_mixado).name}"
+        )
+        return arquivo_mixado
+    
+    def _montar_video_motor(self, classe_motor, paths_imagens, path_audio, arquivo_saida, musica_path=None,
+                            arquivo_legendas=None):
+        """
+        Montagem sem MoviePy, por um dos motores de motor_montagem.py:
+        MotorMontagem (quadros NumPy enviados ao ffmpeg), MontagemFFmpeg
+        (filtergraph único, nenhum quadro passa pelo Python) ou
+        MontagemSegmentada (trechos em processos paralelos + concat).
+        
+        Args:
+            classe_motor: MotorMontagem, MontagemFFmpeg ou MontagemSegmentada
+            paths_imagens: Lista de caminhos das cenas
+            path_audio: Narração (.wav) ou faixa já pré-mixada
+            arquivo_saida: Caminho do vídeo base
+            musica_path: Música de fundo (None = sem música ou já mixada)
+            arquivo_legendas: Legendas .ass opcionais, queimadas na mesma codificação
+        """
+        w_video, h_video = self.config['video']['format']
+        parametros = {}
+        if classe_motor is MontagemSegmentada:
+            parametros['trabalhadores'] = self.config['video'].get('trabalhadores_montagem')
+        
+        # Cenas no tamanho exato do movimento (.npy por memory-map) - só nos motores com quadros NumPy
+        extras = {}
+        if self.config['video'].get('cenas_preparadas', False) and classe_motor in (MotorMontagem, MontagemSegmentada):
+            extras['efeitos'] = [random.randint(0, 3) for _ in paths_imagens]
+            preparador = PreparadorCenas(w_video, h_video, cache=self.cache, logger=self.logger)
+            extras['preparadas'] = preparador.preparar_todas(paths_imagens, extras['efeitos'])
+        motor = classe_motor(
+            largura=w_video,
+            altura=h_video,
+            fps=self.config['video']['fps'],
+            duracao_transicao=self.config['video']['transition_duration'],
+            logger=self.logger,
+            **parametros
+        )
+        
+        self.logger.info(f"🎬 Renderizando vídeo base ({classe_motor.__name__})...")
+        desempenho = motor.renderizar(
+            paths_imagens,
+            path_audio,
+            arquivo_saida,
+            musica_path=musica_path,
+            musica_volume=self.config['audio']['music_volume'],
+            preset=self.config['video'].get('preset', 'medium'),
+            crf=self.config['video'].get('crf', 23),
+            threads=self.config['video']['threads'],
+            arquivo_legendas=arquivo_legendas,
+            **extras
+        )
+        self.logger.info(f"  └─ {desempenho['quadros']} quadros a {desempenho['quadros_por_segundo']:.1f} quadros/s")
+    
+    def _montar_video_moviepy(self, paths_imagens, path_audio, arquivo_saida, musica_path=None, arquivo_legendas=None):
+        """Montagem original com MoviePy (ImageClip + Ken Burns + CompositeVideoClip)."""
+        # 1. CARREGAR ÁUDIOS
+        self.logger.info(f"Carregando áudio de: {Path(path_audio).name}")
+        audio_clip = AudioFileClip(path_audio)
+        duracao_total = audio_clip.duration
+        
+        if musica_path:
+            musica_vol = self.config['audio']['music_volume']
+            musica_fundo = AudioFileClip(musica_path).volumex(musica_vol)
             
-            self.logger.info(f"Duração total do áudio: {duracao_total:.2f}s | Cenas: {num_cenas} | Duração/Cena: {duracao_por_cena:.2f}s")
+            if musica_fundo.duration < duracao_total:
+                musica_fundo = musica_fundo.fx(vfx.loop, duration=duracao_total)
+            else:
+                musica_fundo = musica_fundo.subclip(0, duracao_total)
+            
+            audio_clip = CompositeAudioClip([audio_clip, musica_fundo])
+            self.logger.info(f"Música de fundo '{musica_path}' adicionada.")
 
-            clips_finais = []
-            w_video, h_video = self.config['video']['format']
+        # 2. PREPARAR CENAS
+        num_cenas = len(paths_imagens)
+        duracao_por_cena = duracao_total / num_cenas
+        
+        self.logger.info(f"Duração total do áudio: {duracao_total:.2f}s | Cenas: {num_cenas} | Duração/Cena: {duracao_por_cena:.2f}s")
 
-            for i, path_img in enumerate(paths_imagens):
-                self.logger.debug(f"Processando cena {i+1}/{num_cenas}")
-                
-                clip_imagem = ImageClip(path_img).set_duration(duracao_por_cena)
+        clips_finais = []
+        w_video, h_video = self.config['video']['format']
+
+        for i, path_img in enumerate(paths_imagens):
+            self.logger.debug(f"Processando cena {i+1}/{num_cenas}")
+            
+            clip_imagem = ImageClip(path_img).set_duration(duracao_por_cena)
+            if tuple(clip_imagem.size) == self._tamanho_imagem_montagem():
+                # A etapa 2 já entregou a cena no tamanho final (ampliação em blocos)
+                clip_zoomed = clip_imagem
+            else:
                 clip_resized = clip_imagem.resize(height=h_video)
                 clip_zoomed = clip_resized.resize(1.1)
-                
-                clip_animado = self._apply_ken_burns(clip_zoomed, duracao_por_cena, w_video, h_video)
-                clip_cortado = vfx.crop(clip_animado, width=w_video, height=h_video, x_center=clip_animado.w/2, y_center=clip_animado.h/2)
-
-                # 3. COMBINA IMAGEM (NÃO HÁ MAIS LEGENDAS AQUI)
-                cena_final = CompositeVideoClip([clip_cortado])
-                
-                # 4. Adiciona transição (Crossfade)
-                trans_duration = self.config['video']['transition_duration']
-                if i > 0:
-                    cena_final = cena_final.set_start((i * duracao_por_cena) - trans_duration).crossfadein(trans_duration)
-                
-                clips_finais.append(cena_final)
-
-            # 5. Monta o vídeo final
-            video_final = CompositeVideoClip(clips_finais, size=(w_video, h_video)).set_audio(audio_clip)
-            video_final.duration = duracao_total
             
-            self.logger.info("🎬 Renderizando vídeo base (sem legendas)...")
+            clip_animado = self._apply_ken_burns(clip_zoomed, duracao_por_cena, w_video, h_video)
+            clip_cortado = vfx.crop(clip_animado, width=w_video, height=h_video, x_center=clip_animado.w/2, y_center=clip_animado.h/2)
+
+            # 3. COMBINA IMAGEM (NÃO HÁ MAIS LEGENDAS AQUI)
+            cena_final = CompositeVideoClip([clip_cortado])
             
-            video_final.write_videofile(
-                arquivo_saida,
-                codec="libx264",
-                audio_codec="aac",
-                fps=self.config['video']['fps'],
-                threads=self.config['video']['threads'],
-                logger='bar'
-            )
+            # 4. Adiciona transição (Crossfade)
+            trans_duration = self.config['video']['transition_duration']
+            if i > 0:
+                cena_final = cena_final.set_start((i * duracao_por_cena) - trans_duration).crossfadein(trans_duration)
             
-            tempo_total = time.perf_counter() - inicio
-            self.logger.info(f"✓ Montagem do vídeo base concluída!")
-            # ... (seus logs de stats, etc) ...
-            return True
+            clips_finais.append(cena_final)
 
-        except Exception as e:
-            tempo_total = time.perf_counter() - inicio
-            self.logger.error(f"✗ ERRO ao montar vídeo base após {self._formatar_tempo(tempo_total)}: {e}", exc_info=True)
-            return False
+        # 5. Monta o vídeo final
+        video_final = CompositeVideoClip(clips_finais, size=(w_video, h_video)).set_audio(audio_clip)
+        video_final.duration = duracao_total
         
-
-    def _etapa_4_legendas_whisper_ffmpeg(self, arquivo_video_base, arquivo_saida_final, legendar_em_ingles=True):
+        self.logger.info("🎬 Renderizando vídeo base (sem legendas)...")
+        
+        ffmpeg_params = ["-crf", str(self.config['video'].get('crf', 23))]
+        if arquivo_legendas:
+            ffmpeg_params += ["-vf", f"ass={arquivo_legendas}"]
+        
+        video_final.write_videofile(
+            arquivo_saida,
+            codec="libx264",
+            audio_codec="aac",
+            fps=self.config['video']['fps'],
+            threads=self.config['video']['threads'],
+            preset=self.config['video'].get('preset', 'medium'),
+            ffmpeg_params=ffmpeg_params,
+            logger='bar'
+        )
+    
+    def _criar_gerador_legendas(self):
+        """
+        Cria o LegendaGenerator com o logger do pipeline
+        (o Whisper fica no gerenciador de modelos, compartilhado entre vídeos).
+        """
+        return LegendaGenerator(
+            modelo_whisper=self.config['video'].get('whisper_model', 'small'),
+            logger=self.logger,
+            cache=self.cache,
+            gerenciador_modelos=self.modelos,
+            backend_asr=self.config['video'].get('backend_asr', 'openai-whisper'),
+            compute_type=self.config['video'].get('compute_type_asr', 'int8')
+        )
+    
+    def _estilo_legendas(self):
+        """Parâmetros de estilo das legendas lidos do config.json (seção 'legendas')."""
+        config_legendas = self.config.get('legendas', {})
+        return {
+            'max_palavras_por_linha': config_legendas.get('max_palavras_por_linha', 3),
+            'font': config_legendas.get('font', 'Impact'),
+            'font_size': config_legendas.get('font_size', 70),
+            'font_color': config_legendas.get('font_color', '#FFFFFF'),
+            'stroke_width': config_legendas.get('stroke_width', 4),
+            'stroke_color': config_legendas.get('stroke_color', '#000000'),
+            'shadow_strength': config_legendas.get('shadow_strength', 2),
+            'highlight_current_word': config_legendas.get('highlight_current_word', False),
+            'word_highlight_color': config_legendas.get('word_highlight_color', '#FFFF00'),
+            'padding': config_legendas.get('padding', 80)
+        }
+    
+    def _texto_conhecido(self, trabalho):
+        """
+        Parâmetros do modo texto conhecido (config: legendas.modo = 'texto'):
+        o texto exatamente narrado e os tempos por frase do TTS, se houver.
+        
+        Returns:
+            Dicionário {texto_conhecido, arquivo_tempos} ou {} no modo 'whisper'
+        """
+        if self.config.get('legendas', {}).get('modo', 'whisper') != 'texto':
+            return {}
+        
+        texto = trabalho['historia']["historia_completa"]
+        if self.rascunho:
+            # O rascunho pode ter narrado só o começo do texto (ver _gerar_audio_rascunho)
+            chave_producao = self._chave_cache_audio(texto, cache=self.cache_producao) if self.cache_producao else None
+            if not (chave_producao and self.cache_producao.obter_caminho('audio', chave_producao, '.wav')):
+                texto = self._encurtar_narracao(texto, self.config['audio'].get('max_caracteres_narracao'))
+        
+        # Tempos por frase só valem se foram gravados junto com este áudio
+        arquivo_tempos = self._arquivo_tempos_frases(trabalho['path_audio'])
+        if not os.path.exists(arquivo_tempos) or os.path.getmtime(arquivo_tempos) < os.path.getmtime(trabalho['path_audio']):
+            arquivo_tempos = None
+        
+        return {'texto_conhecido': texto, 'arquivo_tempos': arquivo_tempos}
+    
+    def _legendas_na_montagem(self):
+        """
+        Se as legendas são queimadas na própria montagem (config: video.legendas_na_montagem).
+        
+        Nesse modo o vídeo é codificado uma única vez: a narração é transcrita
+        antes da montagem e o vídeo base intermediário não é gravado.
+        """
+        return self.config['video'].get('legendas_na_montagem', False)
+    
+    def _etapa_4_legendas_whisper_ffmpeg(self, arquivo_video_base, arquivo_saida_final, legendar_em_ingles=True,
+                                         texto_conhecido=None, arquivo_tempos=None, arquivo_audio=None, transcricao=None):
         """
         ETAPA 4: Usa a classe LegendaGenerator para adicionar legendas estilo TikTok.
         Código refatorado para melhor organização e reutilização.
         Lê configurações de estilo do config.json.
+        
+        Com `texto_conhecido` (e sem tradução) as palavras vêm do alinhamento
+        do texto da narração, sem carregar o Whisper. Com `arquivo_audio`, a
+        transcrição lê o .wav da narração em vez de decodificar o vídeo base;
+        `transcricao` reaproveita uma transcrição feita durante a montagem.
         """
         try:
-            # Obtém configurações do config.json
-            modelo_whisper = self.config['video'].get('whisper_model', 'small')
-            config_legendas = self.config.get('legendas', {})
-            
-            # Cria instância do gerador com o logger do pipeline
-            gerador = LegendaGenerator(modelo_whisper=modelo_whisper, logger=self.logger)
-            
             # Gera as legendas com configurações customizadas
-            sucesso = gerador.gerar_legendas(
+            sucesso = self._criar_gerador_legendas().gerar_legendas(
                 arquivo_video_entrada=arquivo_video_base,
                 arquivo_video_saida=arquivo_saida_final,
                 traduzir_para_ingles=legendar_em_ingles,
-                max_palavras_por_linha=config_legendas.get('max_palavras_por_linha', 3),
-                font=config_legendas.get('font', 'Impact'),
-                font_size=config_legendas.get('font_size', 70),
-                font_color=config_legendas.get('font_color', '#FFFFFF'),
-                stroke_width=config_legendas.get('stroke_width', 4),
-                stroke_color=config_legendas.get('stroke_color', '#000000'),
-                shadow_strength=config_legendas.get('shadow_strength', 2),
-                highlight_current_word=config_legendas.get('highlight_current_word', False),
-                word_highlight_color=config_legendas.get('word_highlight_color', '#FFFF00'),
-                padding=config_legendas.get('padding', 80),
-                manter_arquivo_ass=False
+                manter_arquivo_ass=False,
+                descarregar_modelo=not self._modelos_residentes(),
+                preset=self.config['video'].get('preset', 'medium'),
+                crf=self.config['video'].get('crf', 23),
+                texto_conhecido=texto_conhecido,
+                arquivo_tempos=arquivo_tempos,
+                arquivo_audio=arquivo_audio,
+                transcricao=transcricao,
+                **self._estilo_legendas()
             )
             
             return sucesso
@@ -539,11 +1294,451 @@ class VideoPipeline:
             self.logger.error(f"✗ ERRO ao gerar legendas após {self._formatar_tempo(tempo_total)}: {e}", exc_info=True)
             return False
 
-    def run_batch(self):
+    def _preparar_trabalho(self, historia, indice, total):
+        """
+        Monta o dicionário de trabalho de uma história (caminhos e dados de entrada).
+        
+        Args:
+            historia: Dicionário da história vindo do JSON
+            indice: Posição da história no lote (base 0)
+            total: Total de histórias no arquivo JSON (para os logs)
+            
+        Returns:
+            Dicionário com os caminhos de saída e o estado de cada etapa
+        """
+        id_video = historia.get("id_video", f"video_{indice+1:03d}")
+        pasta_base = self.config['output_folder']
+        
+        return {
+            'indice': indice,
+            'total': total,
+            'id_video': id_video,
+            'historia': historia,
+            'inicio': time.perf_counter(),
+            'arquivo_audio': os.path.join(pasta_base, f"{id_video}_audio.wav"),
+            'pasta_imagens': os.path.join(pasta_base, f"imagens_{id_video}"),
+            # Nomes de arquivo para o pipeline de 2 passos
+            'arquivo_video_base': os.path.join(pasta_base, f"{id_video}_base_sem_legenda.mp4"),
+            'arquivo_video_final': os.path.join(pasta_base, f"{id_video}_video_final.mp4"),
+            # Pega a opção de tradução do JSON (padrão é True)
+            'legendar_em_ingles': historia.get("legendar_em_ingles", True),
+            'path_audio': None,
+            'paths_imagens': None
+        }
+    
+    def _encurtar_narracao(self, texto, max_caracteres):
+        """Corta a narração no fim da última frase que cabe em max_caracteres."""
+        if not max_caracteres or len(texto) <= max_caracteres:
+            return texto
+        trecho = texto[:max_caracteres]
+        fim_frase = max(trecho.rfind(p) for p in ".!?")
+        if fim_frase > 0:
+            return trecho[:fim_frase + 1]
+        return trecho.rsplit(" ", 1)[0]
+    
+    def _gerar_audio_rascunho(self, texto_narracao, arquivo_saida):
+        """
+        Áudio do modo rascunho: usa a narração completa se a produção já a
+        sintetizou (cache de produção, só leitura); senão sintetiza uma versão
+        curta (config: audio.max_caracteres_narracao) no cache do rascunho.
+        
+        Returns:
+            Caminho do áudio ou None em caso de falha
+        """
+        if self.cache_producao is not None:
+            chave = self._chave_cache_audio(texto_narracao, cache=self.cache_producao)
+            if self.cache_producao.obter_arquivo('audio', chave, '.wav', arquivo_saida):
+                self.cache_producao.obter_arquivo('tempos_frases', chave, '.json', self._arquivo_tempos_frases(arquivo_saida))
+                self.logger.info(f"🗄️  Rascunho: narração completa reaproveitada da produção: {Path(arquivo_saida).name}")
+                return arquivo_saida
+        
+        texto_curto = self._encurtar_narracao(texto_narracao, self.config['audio'].get('max_caracteres_narracao'))
+        if len(texto_curto) < len(texto_narracao):
+            self.logger.info(f"📝 Rascunho: narração encurtada para {len(texto_curto)} de {len(texto_narracao)} caracteres")
+        return self._gerar_audio_com_cache(texto_curto, arquivo_saida)
+    
+    def _etapa_audio(self, trabalho):
+        """ETAPA 1 do lote: gera o áudio da narração da história."""
+        gerar_audio = self._gerar_audio_rascunho if self.rascunho else self._gerar_audio_com_cache
+        path_audio = gerar_audio(trabalho['historia']["historia_completa"], trabalho['arquivo_audio'])
+        if not path_audio:
+            raise Exception("Falha na Etapa 1: Geração de Áudio.")
+        trabalho['path_audio'] = path_audio
+    
+    def _etapa_imagens(self, trabalho):
+        """ETAPA 2 do lote: gera as imagens das cenas da história."""
+        # No modo 'por_etapa' as imagens podem ter sido geradas junto com outras histórias
+        paths_imagens = trabalho.pop('paths_imagens_pregeradas', None)
+        if paths_imagens is None:
+            paths_imagens = self._gerar_imagens(trabalho['historia']["cenas"], trabalho['pasta_imagens'])
+        if not paths_imagens:
+            raise Exception("Falha na Etapa 2: Geração de Imagens.")
+        trabalho['paths_imagens'] = paths_imagens
+    
+    def _etapa_montagem(self, trabalho):
+        """ETAPA 3 do lote: monta o vídeo base (sem legendas) ou, em codificação única, o vídeo final."""
+        if self._legendas_na_montagem():
+            self._montagem_com_legendas(trabalho)
+            return
+        
+        if not self.config.get('legendas', {}).get('transcrever_durante_montagem', False):
+            sucesso_montagem = self._montar_video(trabalho['paths_imagens'], trabalho['path_audio'], trabalho['arquivo_video_base'])
+        else:
+            # A transcrição só depende do .wav da narração: roda enquanto o vídeo base é codificado
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                futuro = executor.submit(self._transcrever_narracao, trabalho)
+                sucesso_montagem = self._montar_video(trabalho['paths_imagens'], trabalho['path_audio'], trabalho['arquivo_video_base'])
+                try:
+                    trabalho['transcricao'] = futuro.result()
+                except Exception as e:
+                    # A etapa de legendas transcreve de novo
+                    self.logger.warning(f"⚠️  Transcrição durante a montagem falhou: {e}")
+        
+        if not sucesso_montagem:
+            raise Exception("Falha na Etapa 3: Montagem do Vídeo Base.")
+    
+    def _transcrever_narracao(self, trabalho):
+        """Transcreve (ou alinha) a narração a partir do .wav, sem depender do vídeo base."""
+        return self._criar_gerador_legendas().transcrever(
+            trabalho['path_audio'],
+            traduzir_para_ingles=trabalho['legendar_em_ingles'],
+            descarregar_modelo=not self._modelos_residentes(),
+            **self._texto_conhecido(trabalho)
+        )
+    
+    def _montagem_com_legendas(self, trabalho):
+        """
+        Codificação única: transcreve a narração (.wav), gera o .ass e o queima
+        durante a montagem, gravando direto o vídeo final.
+        """
+        self.logger.info("📝 Legendas na montagem: transcrevendo a narração antes de renderizar")
+        arquivo_ass = self._criar_gerador_legendas().gerar_arquivo_legendas(
+            trabalho['path_audio'],
+            traduzir_para_ingles=trabalho['legendar_em_ingles'],
+            descarregar_modelo=not self._modelos_residentes(),
+            **self._texto_conhecido(trabalho),
+            **self._estilo_legendas()
+        )
+        try:
+            sucesso_montagem = self._montar_video(
+                trabalho['paths_imagens'],
+                trabalho['path_audio'],
+                trabalho['arquivo_video_final'],
+                arquivo_legendas=arquivo_ass
+            )
+        finally:
+            os.unlink(arquivo_ass)
+        
+        if not sucesso_montagem:
+            raise Exception("Falha na Etapa 3: Montagem do Vídeo com Legendas.")
+    
+    def _etapa_legendas(self, trabalho):
+        """ETAPA 4 do lote: legendas (Whisper + FFmpeg - solução nativa mais estável)."""
+        if self._legendas_na_montagem():
+            # O vídeo final já saiu da montagem com as legendas
+            self.logger.info(f"⏭️  Legendas já queimadas na montagem: {Path(trabalho['arquivo_video_final']).name}")
+            return
+        
+        sucesso_legenda = self._etapa_4_legendas_whisper_ffmpeg(
+            trabalho['arquivo_video_base'],
+            trabalho['arquivo_video_final'],
+            trabalho['legendar_em_ingles'],
+            arquivo_audio=trabalho['path_audio'],
+            transcricao=trabalho.pop('transcricao', None),
+            **self._texto_conhecido(trabalho)
+        )
+        if not sucesso_legenda:
+            raise Exception("Falha na Etapa 4: Geração de Legendas.")
+    
+    def _hash_entrada_etapa(self, trabalho, etapa):
+        """
+        Calcula o hash das entradas de uma etapa (registrado no manifesto).
+        
+        Cada etapa inclui o hash da etapa anterior, então editar o texto de uma
+        história invalida o áudio e tudo o que depende dele.
+        
+        Args:
+            trabalho: Dicionário de trabalho da história
+            etapa: Nome da etapa ('audio', 'imagens', 'montagem', 'legendas')
+            
+        Returns:
+            String hexadecimal SHA-256
+        """
+        historia = trabalho['historia']
+        voz = self.config['audio']['voice_clone_wav']
+        entradas = {
+            'audio': lambda: {
+                'texto': historia["historia_completa"],
+                'modelo': self.config['models']['tts'],
+                'idioma': self.config['audio']['language'],
+                'voz': self.config['audio']['voice_clone_wav'],
+                'voz_mtime': os.path.getmtime(voz) if os.path.exists(voz) else None,
+                # Síntese por frases muda as pausas e a duração da narração
+                'tts_em_frases': self.config['audio'].get('tts_em_frases', False),
+                'silencio_entre_frases': self.config['audio'].get('silencio_entre_frases', 0.4)
+            },
+            'imagens': lambda: {
+                'cenas': historia["cenas"],
+                'modelo': self.config['models']['t2i'],
+                'imagens': self.config.get('imagens', {}),
+                # 'auto' resolve por máquina: a precisão e o dispositivo das seeds mudam os pixels
+                'precisao': str(self.estrategia_imagens.dtype),
+                'dispositivo_gerador': self.estrategia_imagens.dispositivo_gerador,
+                # Com baixa resolução, a fase dois amplia até o tamanho da montagem (depende do vídeo)
+                'baixa_resolucao': {
+                    'metodo': self.ampliador.metodo,
+                    'modelo': self._config_imagens()['baixa_resolucao'].get(
+                        'modelo_ampliacao', "stabilityai/stable-diffusion-x4-upscaler"
+                    ),
+                    'tamanho_final': self._tamanho_imagem_montagem()
+                } if self.ampliador is not None else None
+            },
+            'montagem': lambda: {
+                'audio': self._hash_entrada_etapa(trabalho, 'audio'),
+                'imagens': self._hash_entrada_etapa(trabalho, 'imagens'),
+                'video': self.config['video'],
+                'musica': [self.config['audio']['music_file'], self.config['audio']['music_volume']],
+                'mixagem': self.config['audio'].get('pre_mixagem', {}),
+                # Em codificação única as legendas fazem parte da montagem
+                'legendas': [trabalho['legendar_em_ingles'], self.config.get('legendas', {})] if self._legendas_na_montagem() else None
+            },
+            'legendas': lambda: {
+                'montagem': self._hash_entrada_etapa(trabalho, 'montagem'),
+                'legendar_em_ingles': trabalho['legendar_em_ingles'],
+                'legendas': self.config.get('legendas', {})
+            }
+        }
+        conteudo = json.dumps({'etapa': etapa, **entradas[etapa]()}, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+    
+    def _executar_etapa(self, trabalho, etapa):
+        """
+        Executa uma etapa de uma história, consultando e atualizando o manifesto.
+        
+        Se o manifesto indicar que a etapa já foi concluída com as mesmas
+        entradas (e as saídas ainda existem), ela é pulada e as saídas
+        registradas são restauradas no dicionário de trabalho.
+        
+        Args:
+            trabalho: Dicionário de trabalho da história
+            etapa: Nome da etapa ('audio', 'imagens', 'montagem', 'legendas')
+        """
+        # Em codificação única a montagem já grava o vídeo final
+        saida_montagem = 'arquivo_video_final' if self._legendas_na_montagem() else 'arquivo_video_base'
+        funcoes = {
+            'audio': (self._etapa_audio, ['path_audio']),
+            'imagens': (self._etapa_imagens, ['paths_imagens']),
+            'montagem': (self._etapa_montagem, [saida_montagem]),
+            'legendas': (self._etapa_legendas, ['arquivo_video_final'])
+        }
+        funcao, campos_saida = funcoes[etapa]
+        
+        if self.manifesto is None:
+            funcao(trabalho)
+            return
+        
+        id_video = trabalho['id_video']
+        hash_entrada = self._hash_entrada_etapa(trabalho, etapa)
+        
+        saidas = self.manifesto.saidas_concluidas(id_video, etapa, hash_entrada)
+        if saidas is not None:
+            trabalho.update(saidas)
+            self.logger.info(f"⏭️  Etapa '{etapa}' de '{id_video}' já concluída (manifesto) - pulando")
+            return
+        
+        self.manifesto.iniciar(id_video, etapa, hash_entrada)
+        try:
+            funcao(trabalho)
+        except Exception as e:
+            self.manifesto.falhar(id_video, etapa, e)
+            raise
+        self.manifesto.concluir(id_video, etapa, {campo: trabalho[campo] for campo in campos_saida})
+    
+    def _etapa_concluida(self, trabalho, etapa):
+        """Indica se o manifesto já registra a etapa como concluída com as mesmas entradas."""
+        if self.manifesto is None:
+            return False
+        hash_entrada = self._hash_entrada_etapa(trabalho, etapa)
+        return self.manifesto.saidas_concluidas(trabalho['id_video'], etapa, hash_entrada) is not None
+    
+    def _processar_historia(self, trabalho):
+        """Executa todas as etapas de uma história, em sequência."""
+        for etapa in ('audio', 'imagens', 'montagem', 'legendas'):
+            self._executar_etapa(trabalho, etapa)
+    
+    def _registrar_falha(self, trabalho, erro, resultados):
+        """
+        Registra e loga a falha de um vídeo do lote.
+        
+        Args:
+            trabalho: Dicionário de trabalho da história
+            erro: Exceção que interrompeu o vídeo
+            resultados: Dicionário acumulador do lote
+        """
+        tempo_video = time.perf_counter() - trabalho['inicio']
+        indice = trabalho['indice'] + 1
+        total_videos = trabalho['total']
+        
+        resultados['erros'].append({
+            'id': trabalho['id_video'],
+            'indice': indice,
+            'erro': str(erro)
+        })
+        resultados['erro'] += 1
+        
+        self._log_separator("=")
+        self.logger.error(f"❌ VÍDEO {indice}/{total_videos} FALHOU!")
+        self.logger.error(f"  ├─ ID: {trabalho['id_video']}")
+        self.logger.error(f"  ├─ Tempo até falha: {self._formatar_tempo(tempo_video)}")
+        self.logger.error(f"  └─ Erro: {erro}")
+        self._log_separator("=")
+    
+    def _executar_sequencial(self, trabalhos, resultados):
+        """Modo 'sequencial': cada história passa por todas as etapas antes da próxima."""
+        for trabalho in trabalhos:
+            trabalho['inicio'] = time.perf_counter()
+            self._log_separator("=", f"VÍDEO {trabalho['indice']+1}/{trabalho['total']}: {trabalho['id_video']}")
+            
+            try:
+                self._processar_historia(trabalho)
+                resultados['sucesso'] += 1
+            except Exception as e:
+                # Error handling por vídeo - continua para o próximo vídeo
+                self._registrar_falha(trabalho, e, resultados)
+    
+    def _executar_pipeline(self, trabalhos, resultados):
+        """
+        Modo 'pipeline': áudio + imagens (GPU) da história N+1 rodam enquanto
+        a montagem + legendas (CPU/FFmpeg) da história N estão em andamento.
+        As etapas se comunicam por filas limitadas (config: lote.tamanho_fila).
+        """
+        tamanho_fila = self.config.get('lote', {}).get('tamanho_fila', 1)
+        
+        def estagio_gpu(trabalho):
+            trabalho['inicio'] = time.perf_counter()
+            self._log_separator("-", f"[GPU] VÍDEO {trabalho['indice']+1}/{trabalho['total']}: {trabalho['id_video']}")
+            self._executar_etapa(trabalho, 'audio')
+            self._executar_etapa(trabalho, 'imagens')
+        
+        def estagio_cpu(trabalho):
+            self._log_separator("-", f"[CPU] VÍDEO {trabalho['indice']+1}/{trabalho['total']}: {trabalho['id_video']}")
+            self._executar_etapa(trabalho, 'montagem')
+            self._executar_etapa(trabalho, 'legendas')
+        
+        def ao_concluir(trabalho):
+            resultados['sucesso'] += 1
+        
+        def ao_falhar(trabalho, estagio, erro):
+            self._registrar_falha(trabalho, erro, resultados)
+        
+        agendador = AgendadorPipeline(
+            estagios=[("gpu", estagio_gpu), ("cpu", estagio_cpu)],
+            tamanho_fila=tamanho_fila,
+            logger=self.logger
+        )
+        self.logger.info(f"🔀 Modo pipeline: estágios GPU → CPU com fila de {agendador.tamanho_fila} história(s)")
+        
+        relatorio = agendador.executar(trabalhos, ao_concluir=ao_concluir, ao_falhar=ao_falhar)
+        resultados['ocupacao_estagios'] = relatorio['estagios']
+    
+    def _executar_por_etapa(self, trabalhos, resultados):
+        """
+        Modo 'por_etapa' (stage-major): roda o TTS de todas as histórias, depois
+        todas as imagens, depois todas as montagens e por fim todas as legendas.
+        Os artefatos intermediários ficam em disco entre as etapas e cada modelo
+        (XTTS, Stable Diffusion, Whisper) é carregado uma única vez por lote.
+        """
+        etapas = [
+            ("ÁUDIO (TTS)", 'audio', self._liberar_modelo_tts),
+            ("IMAGENS (SD)", 'imagens', self._liberar_pipeline_imagens),
+            ("MONTAGEM", 'montagem', None),
+            ("LEGENDAS (Whisper + FFmpeg)", 'legendas', self._liberar_gerador_legendas)
+        ]
+        
+        for trabalho in trabalhos:
+            trabalho['inicio'] = time.perf_counter()
+        
+        pendentes = list(trabalhos)
+        self.manter_modelos_carregados = True
+        
+        try:
+            for titulo, etapa, liberar in etapas:
+                self._log_separator("=", f"ETAPA EM LOTE: {titulo} ({len(pendentes)} vídeos)")
+                ainda_pendentes = []
+                
+                try:
+                    if etapa == 'imagens':
+                        # Lotes de difusão podem misturar cenas de histórias diferentes
+                        self._pregerar_imagens_lote([t for t in pendentes if not self._etapa_concluida(t, etapa)])
+                    
+                    for trabalho in pendentes:
+                        self.logger.info(f"▶ {titulo} | VÍDEO {trabalho['indice']+1}/{trabalho['total']}: {trabalho['id_video']}")
+                        try:
+                            self._executar_etapa(trabalho, etapa)
+                            ainda_pendentes.append(trabalho)
+                        except Exception as e:
+                            # A falha remove só este vídeo das próximas etapas
+                            self._registrar_falha(trabalho, e, resultados)
+                finally:
+                    # Libera o modelo da etapa antes de carregar o da próxima
+                    if liberar:
+                        liberar()
+                
+                pendentes = ainda_pendentes
+        finally:
+            self.manter_modelos_carregados = False
+        
+        resultados['sucesso'] += len(pendentes)
+    
+    def _liberar_gerador_legendas(self):
+        """Descarrega o Whisper residente (fim da etapa de legendas)."""
+        modelo_whisper = self.config['video'].get('whisper_model', 'small')
+        backend_asr = self.config['video'].get('backend_asr', 'openai-whisper')
+        self.modelos.liberar(
+            LegendaGenerator.chave_modelo(modelo_whisper, LegendaGenerator.dispositivo(), backend_asr)
+        )
+    
+    def _abrir_manifesto(self):
+        """
+        Abre o manifesto SQLite do lote (config: lote.usar_manifesto / lote.manifesto).
+        
+        Returns:
+            Instância de ManifestoLote ou None se o manifesto estiver desativado
+        """
+        config_lote = self.config.get('lote', {})
+        if not config_lote.get('usar_manifesto', True):
+            return None
+        
+        caminho = config_lote.get('manifesto') or os.path.join(self.config['output_folder'], "manifesto_lote.sqlite")
+        manifesto = ManifestoLote(caminho, logger=self.logger)
+        self.logger.info(f"🗒️  Manifesto do lote: {caminho}")
+        return manifesto
+    
+    def run_batch(self, modo=None, somente_ids=None, apenas_falhas=False):
         """
         Executa o pipeline em lote para todas as histórias no arquivo JSON.
-        Processa cada vídeo sequencialmente e exibe estatísticas detalhadas.
+        Exibe estatísticas detalhadas ao final.
+        
+        Etapas já concluídas (segundo o manifesto) são puladas, então um lote
+        interrompido continua exatamente de onde parou.
+        
+        Args:
+            modo: 'sequencial' (padrão), 'pipeline' ou 'por_etapa'.
+                  Se None, usa config: lote.modo
+            somente_ids: Lista opcional de id_video a processar (--only)
+            apenas_falhas: Se True, processa só os vídeos com etapa falha
+                           ou interrompida no manifesto (--retry-failed)
         """
+        modo = modo or self.config.get('lote', {}).get('modo', 'sequencial')
+        executores = {
+            'sequencial': self._executar_sequencial,
+            'pipeline': self._executar_pipeline,
+            'por_etapa': self._executar_por_etapa
+        }
+        if modo not in executores:
+            self.logger.error(f"✗ ERRO CRÍTICO: Modo de lote desconhecido '{modo}'. Use: {', '.join(executores)}")
+            return
+        
         self._log_separator("=", "INICIANDO PROCESSAMENTO EM LOTE")
         
         # Carrega arquivo de histórias
@@ -558,88 +1753,54 @@ class VideoPipeline:
             self.logger.error(f"✗ ERRO CRÍTICO: Não foi possível ler {self.config['json_file']}. {e}")
             return
 
-        total_videos = len(todas_as_historias)
+        self.manifesto = self._abrir_manifesto()
+        
+        trabalhos = [
+            self._preparar_trabalho(historia, i, len(todas_as_historias))
+            for i, historia in enumerate(todas_as_historias)
+        ]
+        
+        # Filtros de execução (--only / --retry-failed)
+        if somente_ids:
+            desconhecidos = set(somente_ids) - {t['id_video'] for t in trabalhos}
+            for id_video in sorted(desconhecidos):
+                self.logger.warning(f"⚠️  id_video '{id_video}' não existe em {self.config['json_file']}")
+            trabalhos = [t for t in trabalhos if t['id_video'] in somente_ids]
+        
+        if apenas_falhas:
+            if self.manifesto is None:
+                self.logger.error("✗ ERRO CRÍTICO: --retry-failed exige o manifesto (lote.usar_manifesto)")
+                return
+            com_falha = self.manifesto.videos_pendentes_de_falha()
+            trabalhos = [t for t in trabalhos if t['id_video'] in com_falha]
+        
+        total_videos = len(trabalhos)
         self.logger.info(f"📊 Total de vídeos para processar: {total_videos}")
         self.logger.info(f"📁 Pasta de saída: {self.config['output_folder']}")
+        self.logger.info(f"⚙️  Modo de execução: {modo}")
+        
+        if total_videos == 0:
+            self.logger.info("✓ Nenhum vídeo para processar.")
+            self._log_separator("=", "PIPELINE FINALIZADO")
+            return {'total': 0, 'sucesso': 0, 'erro': 0, 'tempo_total': 0.0, 'erros': [], 'modo': modo, 'ocupacao_estagios': None}
         
         # Inicia processamento
         start_time_total = time.perf_counter()
-        videos_sucesso = 0
-        videos_erro = 0
-        lista_erros = []
-
-        for i, historia in enumerate(todas_as_historias):
-            start_time_video = time.perf_counter()
-            id_video = historia.get("id_video", f"video_{i+1:03d}")
-            
-            self._log_separator("=", f"VÍDEO {i+1}/{total_videos}: {id_video}")
-            
-            try:
-                # Define os caminhos
-                pasta_base = self.config['output_folder']
-                arquivo_audio = os.path.join(pasta_base, f"{id_video}_audio.wav")
-                pasta_imagens = os.path.join(pasta_base, f"imagens_{id_video}")
-                
-                # Nomes de arquivo para o pipeline de 2 passos
-                arquivo_video_base = os.path.join(pasta_base, f"{id_video}_base_sem_legenda.mp4")
-                arquivo_video_final = os.path.join(pasta_base, f"{id_video}_video_final.mp4")
-                
-                # Pega a opção de tradução do JSON (padrão é True)
-                legendar_em_ingles = historia.get("legendar_em_ingles", True)
-
-                # Extrai dados do JSON (NÃO PRECISA MAIS DE "legendas")
-                narracao = historia["historia_completa"]
-                cenas = historia["cenas"]
-                
-                # --- EXECUTANDO O PIPELINE ---
-                
-                # ETAPA 1: ÁUDIO
-                path_audio = self._gerar_audio(narracao, arquivo_audio)
-                if not path_audio:
-                    raise Exception("Falha na Etapa 1: Geração de Áudio.")
-                
-                # ETAPA 2: IMAGENS
-                paths_imagens = self._gerar_imagens(cenas, pasta_imagens)
-                if not paths_imagens:
-                    raise Exception("Falha na Etapa 2: Geração de Imagens.")
-                
-                # ETAPA 3: MONTAGEM (Sem Legendas)
-                sucesso_montagem = self._montar_video(paths_imagens, path_audio, arquivo_video_base)
-                if not sucesso_montagem:
-                    raise Exception("Falha na Etapa 3: Montagem do Vídeo Base.")
-                    
-                # ETAPA 4: LEGENDAS (Whisper + FFmpeg - solução nativa mais estável)
-                sucesso_legenda = self._etapa_4_legendas_whisper_ffmpeg(arquivo_video_base, arquivo_video_final, legendar_em_ingles)
-                if not sucesso_legenda:
-                    raise Exception("Falha na Etapa 4: Geração de Legendas.")
-
-                # Conclusão do vídeo
-                # ... (seu código de log de sucesso) ...
-                videos_sucesso += 1
-
-            except Exception as e:
-                # ... (seu código de log de erro) ...
-                # Error handling por vídeo
-                end_time_video = time.perf_counter()
-                tempo_video = end_time_video - start_time_video
-                
-                erro_info = {
-                    'id': id_video,
-                    'indice': i + 1,
-                    'erro': str(e)
-                }
-                lista_erros.append(erro_info)
-                
-                self._log_separator("=")
-                self.logger.error(f"❌ VÍDEO {i+1}/{total_videos} FALHOU!")
-                self.logger.error(f"  ├─ ID: {id_video}")
-                self.logger.error(f"  ├─ Tempo até falha: {self._formatar_tempo(tempo_video)}")
-                self.logger.error(f"  └─ Erro: {e}")
-                self._log_separator("=")
-                
-                videos_erro += 1
-                # Continua para o próximo vídeo
-                continue 
+        resultados = {'sucesso': 0, 'erro': 0, 'erros': []}
+        resumo_manifesto = None
+        
+        try:
+            executores[modo](trabalhos, resultados)
+        finally:
+            self.sintetizador_voz.encerrar()
+            if self.manifesto is not None:
+                resumo_manifesto = self.manifesto.resumo()
+                self.manifesto.fechar()
+                self.manifesto = None
+        
+        videos_sucesso = resultados['sucesso']
+        videos_erro = resultados['erro']
+        lista_erros = sorted(resultados['erros'], key=lambda erro: erro['indice'])
 
         # === RESUMO FINAL ===
         end_time_total = time.perf_counter()
@@ -666,6 +1827,11 @@ class VideoPipeline:
                 media_imagens = sum(self.stats['tempo_imagens']) / len(self.stats['tempo_imagens'])
                 self.logger.info(f"  ├─ Imagens (SD): {self._formatar_tempo(media_imagens)}")
             
+            if self.stats['tempo_fase_ampliacao']:
+                # Baixa resolução: tempo total de cada fase no lote
+                self.logger.info(f"  │   ├─ Fase 1 (geração): {self._formatar_tempo(sum(self.stats['tempo_fase_geracao']))}")
+                self.logger.info(f"  │   └─ Fase 2 (ampliação): {self._formatar_tempo(sum(self.stats['tempo_fase_ampliacao']))}")
+            
             if self.stats['tempo_montagem']:
                 media_montagem = sum(self.stats['tempo_montagem']) / len(self.stats['tempo_montagem'])
                 self.logger.info(f"  └─ Montagem: {self._formatar_tempo(media_montagem)}")
@@ -674,6 +1840,54 @@ class VideoPipeline:
             self.logger.info(f"")
             self.logger.info(f"📈 Tempo médio por vídeo (sucesso): {self._formatar_tempo(tempo_medio_total)}")
         
+        if 'ocupacao_estagios' in resultados:
+            self.logger.info(f"")
+            self.logger.info(f"🔀 Ocupação dos estágios (pipeline):")
+            for nome, m in resultados['ocupacao_estagios'].items():
+                self.logger.info(
+                    f"  ├─ {nome.upper()}: {m['utilizacao']*100:.1f}% ocupado | "
+                    f"ocupado {self._formatar_tempo(m['ocupado'])} | "
+                    f"esperando entrada {self._formatar_tempo(m['esperando_entrada'])} | "
+                    f"bloqueado na saída {self._formatar_tempo(m['bloqueado_saida'])}"
+                )
+        
+        if self.modelos.estatisticas['carregamentos']:
+            est = self.modelos.estatisticas
+            self.logger.info(f"")
+            self.logger.info(f"🧠 Residência de modelos:")
+            self.logger.info(f"  ├─ Carregamentos: {est['carregamentos']} ({self._formatar_tempo(est['tempo_carregamento'])})")
+            self.logger.info(f"  ├─ Reutilizações: {est['reutilizacoes']} (economizou {self._formatar_tempo(est['tempo_economizado'])})")
+            self.logger.info(f"  └─ Despejos por orçamento: {est['despejos']}")
+        
+        vazao_imagens = self.estrategia_imagens.imagens_por_minuto()
+        if vazao_imagens is not None:
+            self.logger.info(f"")
+            self.logger.info(
+                f"🧮 Estratégia de memória '{self.estrategia_imagens.nome}': "
+                f"{self.estrategia_imagens.desempenho['imagens']} imagem(ns) em "
+                f"{self._formatar_tempo(self.estrategia_imagens.desempenho['tempo'])} ({vazao_imagens:.1f} imagens/min)"
+            )
+        
+        est_embeddings = self.embeddings_prompt.estatisticas
+        if est_embeddings['codificados'] or est_embeddings['memoria'] or est_embeddings['disco']:
+            self.logger.info(f"")
+            self.logger.info(
+                f"🔤 Embeddings de prompt: {est_embeddings['codificados']} codificado(s), "
+                f"{est_embeddings['memoria']} reutilizado(s) da memória, {est_embeddings['disco']} do disco"
+            )
+        
+        if resumo_manifesto:
+            self.logger.info(f"")
+            self.logger.info(f"🗒️  Manifesto (etapas por estado): " + ", ".join(
+                f"{estado}: {quantidade}" for estado, quantidade in sorted(resumo_manifesto.items())
+            ))
+        
+        if self.cache is not None and self.cache.estatisticas:
+            self.logger.info(f"")
+            self.logger.info(f"🗄️  Cache de artefatos:")
+            for tipo, contadores in self.cache.estatisticas.items():
+                self.logger.info(f"  ├─ {tipo}: {contadores['acertos']} acerto(s), {contadores['falhas']} falta(s)")
+        
         if videos_erro > 0:
             self.logger.info(f"")
             self.logger.warning(f"⚠️  Vídeos com erro:")
@@ -691,7 +1905,13 @@ class VideoPipeline:
             'sucesso': videos_sucesso,
             'erro': videos_erro,
             'tempo_total': tempo_total,
-            'erros': lista_erros
+            'erros': lista_erros,
+            'modo': modo,
+            'ocupacao_estagios': resultados.get('ocupacao_estagios'),
+            'estrategia_imagens': {
+                'nome': self.estrategia_imagens.nome,
+                'imagens_por_minuto': vazao_imagens
+            }
         }
     
     def _apply_ken_burns(self, clip, clip_duration, w_video, h_video):
@@ -779,13 +1999,25 @@ class VideoPipeline:
 
 if __name__ == "__main__":
     """Ponto de entrada principal do script"""
+    parser = argparse.ArgumentParser(description="Pipeline de geração de vídeos em lote")
+    parser.add_argument("--config", default="config.json", help="Arquivo de configuração JSON")
+    parser.add_argument("--modo", choices=["sequencial", "pipeline", "por_etapa"], help="Modo de execução do lote (padrão: lote.modo)")
+    parser.add_argument("--retry-failed", action="store_true", help="Reprocessa só os vídeos com etapas falhas/interrompidas no manifesto")
+    parser.add_argument("--only", action="append", metavar="ID_VIDEO", help="Processa apenas este id_video (pode repetir)")
+    parser.add_argument("--draft", action="store_true", help="Prévia rápida (perfil 'rascunho': baixa resolução, poucos passos, Whisper tiny) em pasta separada")
+    args = parser.parse_args()
+    
     try:
         print("\n" + "="*80)
         print("  🎬 PIPELINE DE GERAÇÃO AUTOMÁTICA DE VÍDEOS 🎬")
         print("="*80 + "\n")
         
-        pipeline = VideoPipeline(config_path="config.json")
-        resultados = pipeline.run_batch()
+        pipeline = VideoPipeline(config_path=args.config, rascunho=args.draft)
+        resultados = pipeline.run_batch(
+            modo=args.modo,
+            somente_ids=args.only,
+            apenas_falhas=args.retry_failed
+        )
         
         # Código de saída baseado nos resultados
         if resultados:
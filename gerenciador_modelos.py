@@ -0,0 +1,326 @@
+"""
+Gerenciador de Residência de Modelos
+Mantém os modelos (TTS, Stable Diffusion, Whisper) carregados entre as
+histórias enquanto couberem no orçamento de VRAM/RAM, despejando o
+modelo usado há mais tempo (LRU) quando não couberem.
+"""
+import os
+import gc
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import torch
+
+
+class GerenciadorModelos:
+    """
+    Registro de modelos residentes por dispositivo, com orçamento de memória.
+
+    Cada modelo é identificado por um nome (ex: 'tts', 'sd', 'whisper:small:cuda')
+    e carregado sob demanda por uma função `carregador`. Modelos em 'cuda'
+    contam contra o orçamento de VRAM; modelos em 'cpu', contra o de RAM.
+
+    Quem usa um modelo o segura com adquirir()/devolver() (ou `with usando(...)`):
+    um modelo em uso por alguma thread, ou fixado, nunca é despejado pelo
+    orçamento, e uma liberação explícita dele só acontece na última devolução.
+    O carregamento roda fora do lock; threads que pedem o mesmo modelo esperam.
+    """
+
+    def __init__(self, orcamento_vram_mb="auto", orcamento_ram_mb="auto", logger=None):
+        """
+        Inicializa o gerenciador.
+
+        Args:
+            orcamento_vram_mb: Limite (MB) para modelos na GPU, ou 'auto' (60% da VRAM total)
+            orcamento_ram_mb: Limite (MB) para modelos na CPU, ou 'auto' (50% da RAM total)
+            logger: Logger opcional para saída de logs
+        """
+        self.logger = logger or logging.getLogger("GerenciadorModelos")
+        self.orcamentos = {
+            'cuda': self._resolver_orcamento(orcamento_vram_mb, self._vram_total_mb(), 0.6),
+            'cpu': self._resolver_orcamento(orcamento_ram_mb, self._ram_total_mb(), 0.5)
+        }
+
+        # nome -> {'modelo', 'dispositivo', 'tamanho_mb', 'tempo_carregamento',
+        #          'em_uso', 'fixado', 'liberar_ao_devolver'}
+        self._residentes = OrderedDict()
+        self._tamanhos_conhecidos = {}
+        self._lock = threading.RLock()
+        # nome -> threading.Event dos carregamentos em andamento
+        self._carregando = {}
+
+        self.estatisticas = {
+            'carregamentos': 0,
+            'reutilizacoes': 0,
+            'despejos': 0,
+            'tempo_carregamento': 0.0,
+            'tempo_economizado': 0.0
+        }
+
+    # --- Orçamento ---
+
+    def _resolver_orcamento(self, valor, total_mb, fracao_auto):
+        """Converte o valor configurado em MB (None = sem limite)."""
+        if valor == "auto":
+            return total_mb * fracao_auto if total_mb else None
+        return float(valor) if valor is not None else None
+
+    def _vram_total_mb(self):
+        """VRAM total da GPU em MB (None se não houver CUDA)."""
+        if not torch.cuda.is_available():
+            return None
+        _, total = torch.cuda.mem_get_info()
+        return total / 1024**2
+
+    def _ram_total_mb(self):
+        """RAM total do sistema em MB (None se não for possível detectar)."""
+        try:
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024**2
+        except (ValueError, OSError, AttributeError):
+            return None
+
+    def _uso_mb(self, dispositivo):
+        """Soma dos tamanhos dos modelos residentes em um dispositivo."""
+        return sum(
+            r['tamanho_mb'] for r in self._residentes.values()
+            if r['dispositivo'] == dispositivo
+        )
+
+    def _estimar_tamanho_mb(self, modelo):
+        """
+        Estima a memória ocupada por um modelo somando parâmetros e buffers.
+
+        Funciona para nn.Module (TTS, Whisper), para pipelines do diffusers
+        (que expõem seus módulos em `.components`) e para dicionários desses
+        objetos (ex: pipelines T2I/I2I que compartilham pesos). Modelos fora
+        do PyTorch (ex: CTranslate2) informam `tamanho_estimado_mb`.
+        """
+        objetos = list(modelo.values()) if isinstance(modelo, dict) else [modelo]
+
+        modulos = []
+        total = 0
+        for objeto in objetos:
+            if isinstance(objeto, torch.nn.Module):
+                modulos.append(objeto)
+            elif hasattr(objeto, 'components'):
+                modulos.extend(c for c in objeto.components.values() if isinstance(c, torch.nn.Module))
+            elif hasattr(objeto, 'tamanho_estimado_mb'):
+                total += objeto.tamanho_estimado_mb * 1024**2
+
+        vistos = set()
+        for modulo in modulos:
+            for tensor in list(modulo.parameters()) + list(modulo.buffers()):
+                # Componentes compartilhados entre pipelines contam uma vez só
+                if tensor.data_ptr() in vistos:
+                    continue
+                vistos.add(tensor.data_ptr())
+                total += tensor.numel() * tensor.element_size()
+        return total / 1024**2
+
+    # --- API ---
+
+    def obter(self, nome, carregador, dispositivo="cuda"):
+        """
+        Retorna o modelo residente ou o carrega, respeitando o orçamento.
+
+        Não segura o modelo: ele pode ser despejado quando outro precisar de
+        espaço. Para usá-lo com garantia, prefira adquirir()/devolver().
+
+        Args:
+            nome: Identificador do modelo
+            carregador: Função sem argumentos que carrega e retorna o modelo
+            dispositivo: 'cuda' ou 'cpu' (define qual orçamento é usado)
+
+        Returns:
+            O modelo carregado
+        """
+        return self._obter(nome, carregador, dispositivo, segurar=False, fixar=False)
+
+    def adquirir(self, nome, carregador, dispositivo="cuda", fixar=False):
+        """
+        Como obter(), mas marca o modelo como em uso até devolver(nome).
+
+        Args:
+            nome: Identificador do modelo
+            carregador: Função sem argumentos que carrega e retorna o modelo
+            dispositivo: 'cuda' ou 'cpu' (define qual orçamento é usado)
+            fixar: Se True, o modelo fica fixado (nunca despejado pelo orçamento)
+
+        Returns:
+            O modelo carregado
+        """
+        return self._obter(nome, carregador, dispositivo, segurar=True, fixar=fixar)
+
+    def devolver(self, nome):
+        """
+        Encerra um uso iniciado por adquirir(); executa a liberação explícita
+        pedida enquanto o modelo estava em uso, se houver.
+
+        Args:
+            nome: Identificador do modelo
+        """
+        with self._lock:
+            residente = self._residentes.get(nome)
+            if residente is None or residente['em_uso'] == 0:
+                return
+            residente['em_uso'] -= 1
+            if residente['em_uso'] == 0 and residente['liberar_ao_devolver']:
+                self.liberar(nome)
+
+    @contextmanager
+    def usando(self, nome, carregador, dispositivo="cuda", fixar=False):
+        """Context manager de adquirir()/devolver()."""
+        modelo = self.adquirir(nome, carregador, dispositivo, fixar)
+        try:
+            yield modelo
+        finally:
+            self.devolver(nome)
+
+    def fixar(self, nome, fixado=True):
+        """
+        Fixa (ou solta) um modelo residente: fixado, ele não é despejado pelo orçamento.
+
+        Args:
+            nome: Identificador do modelo
+            fixado: False para voltar a permitir o despejo
+        """
+        with self._lock:
+            if nome in self._residentes:
+                self._residentes[nome]['fixado'] = fixado
+
+    def _obter(self, nome, carregador, dispositivo, segurar, fixar):
+        """Implementação de obter()/adquirir(): o carregador roda fora do lock."""
+        while True:
+            with self._lock:
+                if nome in self._residentes:
+                    residente = self._residentes[nome]
+                    self._residentes.move_to_end(nome)
+                    self._segurar(residente, segurar, fixar)
+                    self.estatisticas['reutilizacoes'] += 1
+                    self.estatisticas['tempo_economizado'] += residente['tempo_carregamento']
+                    self.logger.info(
+                        f"♻️  Modelo '{nome}' já residente em {dispositivo.upper()} "
+                        f"(economizou {residente['tempo_carregamento']:.1f}s de carregamento)"
+                    )
+                    return residente['modelo']
+
+                carregando = self._carregando.get(nome)
+                if carregando is None:
+                    carregando = self._carregando[nome] = threading.Event()
+                    # Abre espaço antes de carregar, se já sabemos o tamanho do modelo
+                    tamanho_previsto = self._tamanhos_conhecidos.get(nome)
+                    if tamanho_previsto is not None:
+                        self._liberar_espaco(dispositivo, tamanho_previsto, motivo=f"carregar '{nome}'")
+                    break
+            # Outra thread já está carregando este modelo: espera e tenta de novo
+            carregando.wait()
+
+        try:
+            inicio = time.perf_counter()
+            modelo = carregador()
+            tempo_carregamento = time.perf_counter() - inicio
+            tamanho_mb = self._estimar_tamanho_mb(modelo)
+        except BaseException:
+            with self._lock:
+                del self._carregando[nome]
+            carregando.set()
+            raise
+
+        with self._lock:
+            self._tamanhos_conhecidos[nome] = tamanho_mb
+            self.estatisticas['carregamentos'] += 1
+            self.estatisticas['tempo_carregamento'] += tempo_carregamento
+
+            residente = self._residentes[nome] = {
+                'modelo': modelo,
+                'dispositivo': dispositivo,
+                'tamanho_mb': tamanho_mb,
+                'tempo_carregamento': tempo_carregamento,
+                'em_uso': 0,
+                'fixado': False,
+                'liberar_ao_devolver': False
+            }
+            self._segurar(residente, segurar, fixar)
+            del self._carregando[nome]
+            carregando.set()
+
+            orcamento = self.orcamentos.get(dispositivo)
+            self.logger.info(
+                f"📥 Modelo '{nome}' carregado em {dispositivo.upper()}: ~{tamanho_mb:.0f} MB "
+                f"em {tempo_carregamento:.1f}s | residentes {self._uso_mb(dispositivo):.0f} MB"
+                + (f" / orçamento {orcamento:.0f} MB" if orcamento else "")
+                + (" (fixado)" if residente['fixado'] else "")
+            )
+
+            # Se o modelo novo estourou o orçamento, despeja os outros (LRU)
+            self._liberar_espaco(dispositivo, 0, motivo=f"acomodar '{nome}'", proteger=nome)
+            return modelo
+
+    def _segurar(self, residente, segurar, fixar):
+        """Conta um uso e/ou fixa o modelo (chamado com o lock)."""
+        if segurar:
+            residente['em_uso'] += 1
+            residente['liberar_ao_devolver'] = False
+        if fixar:
+            residente['fixado'] = True
+
+    def liberar(self, nome):
+        """
+        Descarrega explicitamente um modelo residente (mesmo fixado).
+
+        Se alguma thread ainda estiver usando o modelo, o descarregamento
+        acontece na última devolução.
+
+        Args:
+            nome: Identificador do modelo
+        """
+        with self._lock:
+            if nome not in self._residentes:
+                return
+            if self._residentes[nome]['em_uso'] > 0:
+                self._residentes[nome]['liberar_ao_devolver'] = True
+                self.logger.info(f"⏳ Modelo '{nome}' em uso - será descarregado ao ser devolvido")
+                return
+            residente = self._residentes.pop(nome)
+            self._descartar(nome, residente, motivo="liberação explícita")
+
+    def liberar_todos(self):
+        """Descarrega todos os modelos residentes (os em uso, ao serem devolvidos)."""
+        with self._lock:
+            for nome in list(self._residentes):
+                self.liberar(nome)
+
+    def residente(self, nome):
+        """Indica se um modelo está carregado."""
+        with self._lock:
+            return nome in self._residentes
+
+    def _liberar_espaco(self, dispositivo, necessario_mb, motivo, proteger=None):
+        """Despeja modelos LRU do dispositivo até caber `necessario_mb` no orçamento."""
+        orcamento = self.orcamentos.get(dispositivo)
+        if orcamento is None:
+            return
+
+        for nome in list(self._residentes):
+            if self._uso_mb(dispositivo) + necessario_mb <= orcamento:
+                return
+            residente = self._residentes[nome]
+            if nome == proteger or residente['dispositivo'] != dispositivo:
+                continue
+            # Despejar um modelo em uso não liberaria memória (a thread ainda o referencia)
+            if residente['em_uso'] > 0 or residente['fixado']:
+                continue
+            del self._residentes[nome]
+            self.estatisticas['despejos'] += 1
+            self._descartar(nome, residente, motivo=f"orçamento de {orcamento:.0f} MB ({motivo})")
+
+    def _descartar(self, nome, residente, motivo):
+        """Solta a referência do modelo e devolve a memória ao sistema."""
+        residente['modelo'] = None
+        gc.collect()
+        if residente['dispositivo'] == 'cuda' and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        self.logger.info(f"📤 Modelo '{nome}' descarregado (~{residente['tamanho_mb']:.0f} MB) - motivo: {motivo}")
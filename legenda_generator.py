@@ -1,14 +1,72 @@
 """
 Gerador de Legendas Profissionais para Vídeos
-Usa Whisper para transcrição/tradução e FFmpeg para renderização
+Usa Whisper (openai-whisper ou faster-whisper, ver backends_asr) para
+transcrição/tradução e FFmpeg para renderização
 """
 import os
+import math
 import time
+import wave
+import hashlib
 import logging
 import tempfile
+import threading
 import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+import numpy as np
+
+from alinhador_texto import AlinhadorTexto
+from backends_asr import criar_backend_asr, dispositivo_asr
+
+
+# Taxa de amostragem esperada pelo Whisper para áudio em memória
+TAXA_WHISPER = 16000
+
+
+# --- Trabalhador do pool de processos (transcrição em lote na CPU) ---
+# Cada processo carrega sua própria cópia do modelo uma única vez.
+_BACKEND_TRABALHADOR = None
+_MODELO_TRABALHADOR = None
+
+
+def _inicializar_trabalhador_transcricao(backend_asr, modelo_whisper, compute_type, threads_por_trabalhador):
+    """Inicializador do ProcessPoolExecutor: carrega o modelo do backend na CPU deste processo."""
+    global _BACKEND_TRABALHADOR, _MODELO_TRABALHADOR
+    _BACKEND_TRABALHADOR = criar_backend_asr(
+        backend_asr, modelo_whisper, threads=threads_por_trabalhador, compute_type=compute_type
+    )
+    _MODELO_TRABALHADOR = _BACKEND_TRABALHADOR.carregar("cpu")
+
+
+def _transcrever_no_trabalhador(audio, task):
+    """Transcreve no processo trabalhador e devolve (resultado, segundos)."""
+    inicio = time.perf_counter()
+    result = _BACKEND_TRABALHADOR.transcrever(_MODELO_TRABALHADOR, audio, task)
+    return result, time.perf_counter() - inicio
+
+
+# Pool de modelos Whisper do processo: sobrevive entre vídeos e entre instâncias
+_POOL_WHISPER = None
+_LOCK_POOL_WHISPER = threading.Lock()
+
+
+def pool_whisper(logger=None):
+    """
+    GerenciadorModelos compartilhado pelos LegendaGenerator sem gerenciador próprio.
+    
+    Os modelos ficam carregados (chave: backend + modelo + dispositivo) até serem
+    liberados explicitamente ou despejados pelo orçamento de memória.
+    """
+    global _POOL_WHISPER
+    with _LOCK_POOL_WHISPER:
+        if _POOL_WHISPER is None:
+            from gerenciador_modelos import GerenciadorModelos
+            _POOL_WHISPER = GerenciadorModelos(logger=logger)
+        return _POOL_WHISPER
+
 
 class LegendaGenerator:
     """
@@ -16,18 +74,44 @@ class LegendaGenerator:
     Separada do pipeline principal para melhor organização e reutilização.
     """
     
-    def __init__(self, modelo_whisper='small', logger=None):
+    def __init__(self, modelo_whisper='small', logger=None, cache=None, gerenciador_modelos=None,
+                 backend_asr='openai-whisper', compute_type='int8'):
         """
         Inicializa o gerador de legendas.
         
         Args:
             modelo_whisper: Nome do modelo Whisper ('tiny', 'base', 'small', 'medium', 'large')
             logger: Logger opcional para saída de logs
+            cache: CacheArtefatos opcional para reaproveitar transcrições
+            gerenciador_modelos: GerenciadorModelos que mantém o Whisper residente
+                                 (padrão: o pool do processo, ver pool_whisper)
+            backend_asr: 'openai-whisper' ou 'faster-whisper' (CTranslate2)
+            compute_type: Quantização do faster-whisper ('int8', 'float16', ...)
         """
         self.modelo_whisper = modelo_whisper
         self.logger = logger or self._criar_logger_padrao()
+        self.cache = cache
+        self.gerenciador_modelos = gerenciador_modelos or pool_whisper(self.logger)
+        self.backend = criar_backend_asr(backend_asr, modelo_whisper, compute_type=compute_type)
+        self.compute_type = compute_type
         self.model = None
     
+    @staticmethod
+    def chave_modelo(modelo_whisper, dispositivo, backend_asr='openai-whisper'):
+        """Nome do modelo no gerenciador (um por backend, modelo e dispositivo)."""
+        if backend_asr == 'openai-whisper':
+            return f"whisper:{modelo_whisper}:{dispositivo}"
+        return f"{backend_asr}:{modelo_whisper}:{dispositivo}"
+    
+    @staticmethod
+    def dispositivo():
+        """Dispositivo em que o Whisper é carregado."""
+        return dispositivo_asr()
+    
+    def _chave_modelo(self):
+        """Chave do modelo deste gerador no gerenciador."""
+        return self.chave_modelo(self.modelo_whisper, self.dispositivo(), self.backend.nome)
+    
     def _criar_logger_padrao(self):
         """Cria um logger padrão caso nenhum seja fornecido."""
         logger = logging.getLogger("LegendaGenerator")
@@ -47,40 +131,91 @@ class LegendaGenerator:
     def _carregar_modelo(self):
         """Carrega o modelo Whisper se ainda não estiver carregado."""
         if self.model is None:
-            try:
-                import whisper
-                self.logger.info(f"Carregando modelo Whisper '{self.modelo_whisper}'...")
-                self.model = whisper.load_model(self.modelo_whisper)
-                self.logger.info("✓ Modelo Whisper carregado com sucesso")
-            except ImportError:
-                raise ImportError(
-                    "Módulo 'whisper' não encontrado. "
-                    "Instale com: pip install openai-whisper"
+            dispositivo = self.dispositivo()
+            
+            def carregar():
+                self.logger.info(
+                    f"Carregando modelo Whisper '{self.modelo_whisper}' ({self.backend.nome}) em {dispositivo.upper()}..."
                 )
+                modelo = self.backend.carregar(dispositivo)
+                self.logger.info("✓ Modelo Whisper carregado com sucesso")
+                return modelo
+            
+            # Em uso até _soltar_modelo: o gerenciador não o despeja enquanto isso
+            self.model = self.gerenciador_modelos.adquirir(self._chave_modelo(), carregar, dispositivo=dispositivo)
+    
+    def _soltar_modelo(self):
+        """Solta a referência local e devolve o modelo ao gerenciador (que decide quando descarregar)."""
+        if self.model is not None:
+            self.model = None
+            self.gerenciador_modelos.devolver(self._chave_modelo())
     
     def _descarregar_modelo(self):
         """Descarrega o modelo Whisper da memória."""
         if self.model is not None:
-            import torch
-            del self.model
-            self.model = None
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
+            self._soltar_modelo()
+            self.gerenciador_modelos.liberar(self._chave_modelo())
             self.logger.info("✓ Modelo Whisper descarregado da memória")
     
+    def liberar_modelo(self):
+        """Descarrega explicitamente o Whisper deste gerador do pool (mesmo sem referência local)."""
+        self._soltar_modelo()
+        self.gerenciador_modelos.liberar(self._chave_modelo())
+    
+    def _carregar_pcm(self, arquivo_audio):
+        """
+        Lê um .wav PCM 16 bits direto para float32 mono a 16 kHz, sem passar
+        pelo ffmpeg do Whisper (reamostragem com scipy, se necessário).
+        
+        Returns:
+            Array float32 ou o próprio caminho, se não for possível ler sem o ffmpeg
+        """
+        if not isinstance(arquivo_audio, str) or not arquivo_audio.lower().endswith('.wav'):
+            return arquivo_audio
+        
+        with wave.open(arquivo_audio, 'rb') as f:
+            if f.getsampwidth() != 2:
+                return arquivo_audio
+            taxa = f.getframerate()
+            dados = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+            amostras = dados.reshape(-1, f.getnchannels()).mean(axis=1).astype(np.float32) / 32768.0
+        
+        if taxa != TAXA_WHISPER:
+            try:
+                from scipy.signal import resample_poly
+            except ImportError:
+                return arquivo_audio
+            divisor = math.gcd(taxa, TAXA_WHISPER)
+            amostras = resample_poly(amostras, TAXA_WHISPER // divisor, taxa // divisor).astype(np.float32)
+        return amostras
+    
+    def _hash_audio(self, audio):
+        """Hash do áudio para o cache de transcrições (arquivo ou PCM em memória)."""
+        if isinstance(audio, np.ndarray):
+            return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32).tobytes()).hexdigest()
+        return self.cache.hash_arquivo(audio)
+    
+    def _chave_transcricao(self, audio, task):
+        """Chave da transcrição no cache de artefatos."""
+        return self.cache.chave(
+            'transcricao',
+            audio=self._hash_audio(audio),
+            modelo=self.modelo_whisper,
+            backend=self.backend.nome,
+            task=task
+        )
+    
     def _transcrever_audio(self, arquivo_video, traduzir_para_ingles=True):
         """
-        Transcreve ou traduz o áudio do vídeo usando Whisper.
+        Transcreve ou traduz o áudio usando o backend de ASR configurado.
         
         Args:
-            arquivo_video: Caminho para o arquivo de vídeo
+            arquivo_video: Vídeo, .wav da narração ou PCM NumPy float32 mono a 16 kHz
             traduzir_para_ingles: Se True, traduz para inglês; se False, transcreve no idioma original
             
         Returns:
             Dicionário com resultados da transcrição (segments, words, etc)
         """
-        self._carregar_modelo()
-        
         if traduzir_para_ingles:
             self.logger.info("Modo TRADUÇÃO ativado (Áudio → Legendas em Inglês)")
             task = "translate"
@@ -88,13 +223,19 @@ class LegendaGenerator:
             self.logger.info("Modo TRANSCRIÇÃO ativado (Áudio → Legendas no mesmo idioma)")
             task = "transcribe"
         
-        self.logger.info("Transcrevendo áudio com timestamps de palavras...")
-        result = self.model.transcribe(
-            arquivo_video,
-            task=task,
-            word_timestamps=True,  # Timestamps palavra por palavra
-            fp16=False  # Desativa FP16 para compatibilidade
-        )
+        # Consulta o cache antes de carregar o Whisper
+        chave_cache = None
+        if self.cache is not None:
+            chave_cache = self._chave_transcricao(arquivo_video, task)
+            result = self.cache.obter_json('transcricao', chave_cache)
+            if result is not None:
+                self.logger.info("✓ Transcrição recuperada do cache")
+                return result
+        
+        self._carregar_modelo()
+        
+        self.logger.info(f"Transcrevendo áudio com timestamps de palavras ({self.backend.nome})...")
+        result = self.backend.transcrever(self.model, self._carregar_pcm(arquivo_video), task)
         
         # Contagem de palavras detectadas
         total_palavras = sum(
@@ -103,8 +244,57 @@ class LegendaGenerator:
         )
         self.logger.info(f"✓ Transcrição completa: {total_palavras} palavras detectadas")
         
+        if chave_cache is not None:
+            self.cache.guardar_json('transcricao', chave_cache, result)
+        
         return result
     
+    def _obter_palavras(self, arquivo_audio, traduzir_para_ingles=True, texto_conhecido=None, arquivo_tempos=None):
+        """
+        Palavras com tempos para as legendas: alinha o texto conhecido ao áudio
+        (sem Whisper) ou, se não houver texto ou for preciso traduzir, transcreve.
+        
+        Args:
+            arquivo_audio: Áudio (ou vídeo) da narração, ou PCM NumPy 16 kHz
+            traduzir_para_ingles: Se True, traduz para inglês (exige o Whisper)
+            texto_conhecido: Texto exato da narração (modo texto conhecido)
+            arquivo_tempos: JSON opcional com os tempos por frase do TTS
+            
+        Returns:
+            Dicionário no formato do Whisper (segments, words, etc)
+        """
+        if texto_conhecido and not traduzir_para_ingles:
+            self.logger.info("Modo TEXTO CONHECIDO ativado (narração alinhada ao áudio, sem Whisper)")
+            return AlinhadorTexto(logger=self.logger).alinhar(texto_conhecido, arquivo_audio, arquivo_tempos)
+        
+        if texto_conhecido:
+            self.logger.info("Texto conhecido ignorado: a tradução para inglês requer o Whisper")
+        return self._transcrever_audio(arquivo_audio, traduzir_para_ingles)
+    
+    def transcrever(self, arquivo_audio, traduzir_para_ingles=True, texto_conhecido=None, arquivo_tempos=None,
+                    descarregar_modelo=True):
+        """
+        Obtém só as palavras com tempos (sem gerar legendas), para ser feito
+        em paralelo com a montagem e entregue depois a gerar_legendas.
+        
+        Args:
+            arquivo_audio: .wav da narração ou PCM NumPy float32 mono a 16 kHz
+            traduzir_para_ingles: Se True, traduz para inglês; se False, transcreve
+            texto_conhecido: Texto exato da narração; sem tradução, dispensa o Whisper
+            arquivo_tempos: JSON opcional com os tempos por frase do TTS
+            descarregar_modelo: Se False, mantém o Whisper carregado para o próximo vídeo
+            
+        Returns:
+            Dicionário no formato do Whisper (segments, words, etc)
+        """
+        try:
+            return self._obter_palavras(arquivo_audio, traduzir_para_ingles, texto_conhecido, arquivo_tempos)
+        finally:
+            if descarregar_modelo:
+                self._descarregar_modelo()
+            else:
+                self._soltar_modelo()
+    
     def _gerar_arquivo_ass(
         self, 
         result, 
@@ -252,7 +442,8 @@ class LegendaGenerator:
         
         return arquivo_ass.name
     
-    def _renderizar_com_ffmpeg(self, arquivo_video_entrada, arquivo_ass, arquivo_video_saida):
+    def _renderizar_com_ffmpeg(self, arquivo_video_entrada, arquivo_ass, arquivo_video_saida, preset="medium", crf=23,
+                               threads=None):
         """
         Usa FFmpeg para queimar as legendas ASS no vídeo.
         
@@ -260,6 +451,9 @@ class LegendaGenerator:
             arquivo_video_entrada: Vídeo original
             arquivo_ass: Arquivo de legendas ASS
             arquivo_video_saida: Vídeo final com legendas
+            preset: Preset do libx264 (ex: 'medium', 'ultrafast')
+            crf: Qualidade do libx264 (18-28, menor = melhor)
+            threads: Threads do ffmpeg (None = automático)
         """
         self.logger.info("Renderizando vídeo com legendas...")
         
@@ -268,12 +462,14 @@ class LegendaGenerator:
             "-i", arquivo_video_entrada,
             "-vf", f"ass={arquivo_ass}",
             "-c:v", "libx264",
-            "-preset", "medium",  # Balanço velocidade/qualidade
-            "-crf", "23",  # Qualidade (18-28, menor = melhor)
+            "-preset", preset,  # Balanço velocidade/qualidade
+            "-crf", str(crf),  # Qualidade (18-28, menor = melhor)
             "-c:a", "copy",  # Copia áudio sem recodificar
             "-y",  # Sobrescrever sem perguntar
             arquivo_video_saida
         ]
+        if threads:
+            comando_ffmpeg[-2:-2] = ["-threads", str(threads)]
         
         self.logger.debug(f"Comando FFmpeg: {' '.join(comando_ffmpeg)}")
         
@@ -340,7 +536,14 @@ class LegendaGenerator:
         highlight_current_word=False,
         word_highlight_color="#FFFF00",
         padding=80,
-        manter_arquivo_ass=False
+        manter_arquivo_ass=False,
+        descarregar_modelo=True,
+        preset="medium",
+        crf=23,
+        texto_conhecido=None,
+        arquivo_tempos=None,
+        arquivo_audio=None,
+        transcricao=None
     ):
         """
         Método principal: gera legendas profissionais customizáveis para um vídeo.
@@ -360,6 +563,14 @@ class LegendaGenerator:
             word_highlight_color: Cor do destaque em hex (ex: "#FF0000" = vermelho)
             padding: Margem inferior em pixels (distância da borda, recomendado: 50-100)
             manter_arquivo_ass: Se True, salva arquivo .ass junto do vídeo
+            descarregar_modelo: Se False, mantém o Whisper carregado para o próximo vídeo
+            preset: Preset do libx264 na renderização final
+            crf: Qualidade do libx264 na renderização final
+            texto_conhecido: Texto exato da narração; sem tradução, dispensa o Whisper
+            arquivo_tempos: JSON opcional com os tempos por frase do TTS (modo texto conhecido)
+            arquivo_audio: Áudio a transcrever (.wav da narração ou PCM NumPy 16 kHz);
+                           padrão: o áudio do próprio vídeo de entrada
+            transcricao: Resultado já pronto de transcrever() (pula a etapa 1)
             
         Returns:
             True se sucesso, False se falhou
@@ -372,8 +583,11 @@ class LegendaGenerator:
         self.logger.info("└─────────────────────────────────────────────────────────────┘")
         
         try:
-            # ETAPA 1: Transcrição com Whisper
-            result = self._transcrever_audio(arquivo_video_entrada, traduzir_para_ingles)
+            # ETAPA 1: Transcrição com Whisper (ou alinhamento do texto conhecido)
+            result = transcricao
+            if result is None:
+                audio = arquivo_audio if arquivo_audio is not None else arquivo_video_entrada
+                result = self._obter_palavras(audio, traduzir_para_ingles, texto_conhecido, arquivo_tempos)
             
             # ETAPA 2: Gerar arquivo ASS com customizações
             arquivo_ass = self._gerar_arquivo_ass(
@@ -391,7 +605,7 @@ class LegendaGenerator:
             )
             
             # ETAPA 3: Renderizar com FFmpeg
-            self._renderizar_com_ffmpeg(arquivo_video_entrada, arquivo_ass, arquivo_video_saida)
+            self._renderizar_com_ffmpeg(arquivo_video_entrada, arquivo_ass, arquivo_video_saida, preset=preset, crf=crf)
             
             # Limpar arquivo temporário (se solicitado)
             if not manter_arquivo_ass:
@@ -434,8 +648,12 @@ class LegendaGenerator:
             return False
         
         finally:
-            # Sempre descarrega o modelo ao final
-            self._descarregar_modelo()
+            # Descarrega o modelo ao final (a menos que o chamador vá reutilizá-lo)
+            if descarregar_modelo:
+                self._descarregar_modelo()
+            else:
+                # Só solta a referência local; o gerenciador decide quando descarregar
+                self._soltar_modelo()
             
             # Remove arquivo ASS temporário em caso de erro
             if arquivo_ass and os.path.exists(arquivo_ass) and not manter_arquivo_ass:
@@ -444,50 +662,218 @@ class LegendaGenerator:
                 except:
                     pass
     
-    def processar_em_lote(self, lista_videos, traduzir_para_ingles=True):
+    def gerar_arquivo_legendas(self, arquivo_audio, traduzir_para_ingles=True, descarregar_modelo=True,
+                               texto_conhecido=None, arquivo_tempos=None, **estilo):
+        """
+        Transcreve um áudio e gera só o arquivo ASS, sem renderizar vídeo.
+
+        Usado quando as legendas são queimadas pela própria montagem (uma
+        única codificação do vídeo final).
+
+        Args:
+            arquivo_audio: Narração (.wav), PCM NumPy 16 kHz ou vídeo com o áudio a transcrever
+            traduzir_para_ingles: Se True, traduz para inglês; se False, transcreve
+            descarregar_modelo: Se False, mantém o Whisper carregado para o próximo vídeo
+            texto_conhecido: Texto exato da narração; sem tradução, dispensa o Whisper
+            arquivo_tempos: JSON opcional com os tempos por frase do TTS (modo texto conhecido)
+            **estilo: Mesmos parâmetros de estilo de gerar_legendas (font, font_size, ...)
+
+        Returns:
+            Caminho do arquivo ASS temporário (o chamador deve removê-lo)
+        """
+        result = self.transcrever(arquivo_audio, traduzir_para_ingles, texto_conhecido, arquivo_tempos, descarregar_modelo)
+        return self._gerar_arquivo_ass(result=result, **estilo)
+
+    def _dimensionar_transcricao(self, num_videos, trabalhadores=None):
+        """
+        Quantos processos de transcrição cabem na máquina (cada um com seu modelo).
+        
+        Limitado pelos núcleos (pelo menos 2 threads por processo) e pela RAM
+        disponível (70%) dividida pelo tamanho do modelo.
+        
+        Returns:
+            Tupla (trabalhadores, threads por trabalhador)
+        """
+        nucleos = os.cpu_count() or 1
+        if not trabalhadores:
+            trabalhadores = max(1, nucleos // 2)
+            try:
+                ram_livre_mb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / 1024**2
+                tamanho_mb = self.backend.tamanho_estimado_mb()
+                trabalhadores = min(trabalhadores, max(1, int(ram_livre_mb * 0.7 // tamanho_mb)))
+            except (ValueError, OSError, AttributeError):
+                pass
+        trabalhadores = max(1, min(int(trabalhadores), num_videos))
+        return trabalhadores, max(1, nucleos // trabalhadores)
+    
+    def _transcrever_local(self, audio, task):
+        """Transcreve com o modelo do pool (lote na GPU) e devolve (resultado, segundos)."""
+        self._carregar_modelo()
+        inicio = time.perf_counter()
+        result = self.backend.transcrever(self.model, self._carregar_pcm(audio), task)
+        return result, time.perf_counter() - inicio
+    
+    def _renderizar_tarefa(self, entrada, arquivo_ass, saida, preset, crf, threads):
+        """Renderização de um vídeo do lote (pool do FFmpeg); remove o ASS ao final."""
+        inicio = time.perf_counter()
+        try:
+            self._renderizar_com_ffmpeg(entrada, arquivo_ass, saida, preset=preset, crf=crf, threads=threads)
+        finally:
+            os.unlink(arquivo_ass)
+        return time.perf_counter() - inicio
+    
+    def processar_em_lote(self, lista_videos, traduzir_para_ingles=True, trabalhadores_transcricao=None,
+                          trabalhadores_render=2, threads_ffmpeg=None, preset="medium", crf=23):
         """
-        Processa múltiplos vídeos em sequência.
+        Processa múltiplos vídeos em dois estágios paralelos.
+        
+        1. Transcrição: na CPU, processos com um modelo Whisper cada (dimensionados
+           pelos núcleos e pela memória); na GPU, um único trabalhador com o modelo
+           do pool do processo (use liberar_modelo() para descarregá-lo depois).
+        2. Renderização: pool de FFmpeg que queima cada ASS assim que a transcrição
+           do vídeo termina, dividindo um orçamento global de threads.
         
         Args:
             lista_videos: Lista de tuplas (entrada, saida)
             traduzir_para_ingles: Aplica a todos os vídeos
+            trabalhadores_transcricao: Processos de transcrição na CPU (None = automático)
+            trabalhadores_render: FFmpegs renderizando ao mesmo tempo
+            threads_ffmpeg: Orçamento total de threads dos FFmpegs (None = núcleos da máquina)
+            preset: Preset do libx264
+            crf: Qualidade do libx264
             
         Returns:
-            Dicionário com estatísticas (sucessos, falhas, tempo)
+            Dicionário com estatísticas (sucessos, falhas, tempo, vazão por estágio,
+            carregamento economizado)
         """
         inicio_total = time.perf_counter()
         sucessos = 0
         falhas = 0
+        economizado_antes = self.gerenciador_modelos.estatisticas['tempo_economizado']
+        num_videos = len(lista_videos)
+        task = "translate" if traduzir_para_ingles else "transcribe"
+        
+        if self.dispositivo() == "cuda":
+            trabalhadores_t = 1
+            executor_t = ThreadPoolExecutor(max_workers=1)
+            transcrever = self._transcrever_local
+        else:
+            trabalhadores_t, threads_t = self._dimensionar_transcricao(num_videos, trabalhadores_transcricao)
+            executor_t = ProcessPoolExecutor(
+                max_workers=trabalhadores_t,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_trabalhador_transcricao,
+                initargs=(self.backend.nome, self.modelo_whisper, self.compute_type, threads_t)
+            )
+            transcrever = _transcrever_no_trabalhador
+        
+        trabalhadores_r = max(1, min(int(trabalhadores_render), num_videos or 1))
+        threads_por_render = max(1, (threads_ffmpeg or os.cpu_count() or 1) // trabalhadores_r)
         
-        self.logger.info(f"Iniciando processamento em lote: {len(lista_videos)} vídeos")
+        self.logger.info(
+            f"Iniciando processamento em lote: {num_videos} vídeos | "
+            f"{trabalhadores_t} trabalhador(es) de transcrição, "
+            f"{trabalhadores_r} FFmpeg(s) x {threads_por_render} threads"
+        )
+        
+        estagios = {
+            nome: {'itens': 0, 'tempo_ocupado': 0.0, 'tempo_parede': 0.0}
+            for nome in ('transcricao', 'renderizacao')
+        }
+        
+        def registrar(nome, tempo):
+            estagios[nome]['itens'] += 1
+            estagios[nome]['tempo_ocupado'] += tempo
+            estagios[nome]['tempo_parede'] = time.perf_counter() - inicio_total
         
-        for i, (entrada, saida) in enumerate(lista_videos, 1):
-            self.logger.info(f"\n{'='*60}")
-            self.logger.info(f"Vídeo {i}/{len(lista_videos)}")
-            self.logger.info(f"{'='*60}")
+        with executor_t, ThreadPoolExecutor(max_workers=trabalhadores_r) as executor_r:
+            futuros_r = {}
             
-            sucesso = self.gerar_legendas(entrada, saida, traduzir_para_ingles)
+            def enviar_para_render(indice, result):
+                """Gera o ASS e agenda a renderização; False se o ASS falhar (o vídeo conta como falha)."""
+                entrada, saida = lista_videos[indice]
+                try:
+                    arquivo_ass = self._gerar_arquivo_ass(result)
+                except Exception as e:
+                    self.logger.error(f"✗ Geração do ASS falhou ({Path(entrada).name}): {e}")
+                    return False
+                futuro = executor_r.submit(self._renderizar_tarefa, entrada, arquivo_ass, saida, preset, crf, threads_por_render)
+                futuros_r[futuro] = indice
+                return True
             
-            if sucesso:
-                sucessos += 1
-            else:
-                falhas += 1
-        
+            # Transcrições já em cache vão direto para a renderização
+            futuros_t = {}
+            for indice, (entrada, _) in enumerate(lista_videos):
+                chave = None
+                result = None
+                if self.cache is not None:
+                    try:
+                        chave = self._chave_transcricao(entrada, task)
+                        result = self.cache.obter_json('transcricao', chave)
+                    except (OSError, ValueError) as e:
+                        # Entrada do cache ilegível: transcreve de novo
+                        self.logger.warning(f"⚠️  Cache de transcrição ignorado ({Path(entrada).name}): {e}")
+                if result is not None:
+                    if not enviar_para_render(indice, result):
+                        falhas += 1
+                else:
+                    futuros_t[executor_t.submit(transcrever, entrada, task)] = (indice, chave)
+            
+            for futuro in as_completed(futuros_t):
+                indice, chave = futuros_t[futuro]
+                try:
+                    result, tempo = futuro.result()
+                    registrar('transcricao', tempo)
+                    if chave:
+                        self.cache.guardar_json('transcricao', chave, result)
+                except Exception as e:
+                    falhas += 1
+                    self.logger.error(f"✗ Transcrição falhou ({Path(lista_videos[indice][0]).name}): {e}")
+                    continue
+                if not enviar_para_render(indice, result):
+                    falhas += 1
+            
+            for futuro in as_completed(futuros_r):
+                indice = futuros_r[futuro]
+                try:
+                    registrar('renderizacao', futuro.result())
+                    sucessos += 1
+                    self.logger.info(f"✅ {Path(lista_videos[indice][1]).name}")
+                except Exception as e:
+                    falhas += 1
+                    self.logger.error(f"✗ Renderização falhou ({Path(lista_videos[indice][0]).name}): {e}")
+        
+        # Na GPU o modelo ficou em uso durante o lote; continua residente no pool
+        self._soltar_modelo()
         tempo_total = time.perf_counter() - inicio_total
+        tempo_economizado = self.gerenciador_modelos.estatisticas['tempo_economizado'] - economizado_antes
+        for estagio in estagios.values():
+            estagio['itens_por_minuto'] = (
+                estagio['itens'] * 60 / estagio['tempo_parede'] if estagio['tempo_parede'] > 0 else None
+            )
         
         self.logger.info(f"\n{'='*60}")
         self.logger.info("RESUMO DO PROCESSAMENTO EM LOTE")
         self.logger.info(f"{'='*60}")
-        self.logger.info(f"Total processado: {len(lista_videos)}")
+        self.logger.info(f"Total processado: {num_videos}")
         self.logger.info(f"✅ Sucessos: {sucessos}")
         self.logger.info(f"❌ Falhas: {falhas}")
         self.logger.info(f"⏱️  Tempo total: {self._formatar_tempo(tempo_total)}")
+        for nome, estagio in estagios.items():
+            if estagio['itens_por_minuto'] is not None:
+                self.logger.info(
+                    f"📈 {nome.capitalize()}: {estagio['itens']} vídeo(s), {estagio['itens_por_minuto']:.1f} vídeos/min "
+                    f"(ocupado {self._formatar_tempo(estagio['tempo_ocupado'])})"
+                )
+        self.logger.info(f"♻️  Carregamento do Whisper economizado: {self._formatar_tempo(tempo_economizado)}")
         
         return {
-            'total': len(lista_videos),
+            'total': num_videos,
             'sucessos': sucessos,
             'falhas': falhas,
-            'tempo_total': tempo_total
+            'tempo_total': tempo_total,
+            'estagios': estagios,
+            'tempo_carregamento_economizado': tempo_economizado
         }
 
 
@@ -0,0 +1,199 @@
+"""
+Manifesto Durável de Lotes (SQLite)
+Registra o estado de cada etapa de cada história para que um lote
+interrompido possa ser retomado exatamente de onde parou.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+
+class ManifestoLote:
+    """
+    Manifesto de um lote de vídeos, persistido em SQLite.
+
+    Cada linha da tabela `etapas` guarda, para um par (id_video, etapa):
+    o estado ('executando', 'concluida' ou 'falhou'), os caminhos de saída,
+    o hash das entradas, os tempos e a última mensagem de erro.
+    """
+
+    EXECUTANDO = 'executando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+
+    def __init__(self, caminho, logger=None):
+        """
+        Abre (ou cria) o manifesto.
+
+        Args:
+            caminho: Caminho do arquivo SQLite
+            logger: Logger opcional para saída de logs
+        """
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self.caminho = caminho
+        self.logger = logger or logging.getLogger("ManifestoLote")
+        self._lock = threading.Lock()
+
+        # O modo pipeline grava a partir de várias threads (protegido pelo lock)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        with self._conexao:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute(
+                """
+                CREATE TABLE IF NOT EXISTS etapas (
+                    id_video TEXT NOT NULL,
+                    etapa TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    saidas TEXT,
+                    hash_entrada TEXT,
+                    inicio REAL,
+                    fim REAL,
+                    duracao REAL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    erro TEXT,
+                    atualizado_em TEXT,
+                    PRIMARY KEY (id_video, etapa)
+                )
+                """
+            )
+
+    def fechar(self):
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conexao.close()
+
+    def obter(self, id_video, etapa):
+        """
+        Lê o registro de uma etapa.
+
+        Returns:
+            Dicionário com as colunas da etapa (saidas já desserializadas) ou None
+        """
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT * FROM etapas WHERE id_video = ? AND etapa = ?",
+                (id_video, etapa)
+            ).fetchone()
+
+        if linha is None:
+            return None
+
+        registro = dict(linha)
+        registro['saidas'] = json.loads(registro['saidas']) if registro['saidas'] else {}
+        return registro
+
+    def saidas_concluidas(self, id_video, etapa, hash_entrada):
+        """
+        Verifica se a etapa já foi concluída com as mesmas entradas.
+
+        A etapa só conta como concluída se o hash das entradas for o mesmo
+        e todos os arquivos de saída registrados ainda existirem em disco.
+
+        Returns:
+            Dicionário de saídas registradas, ou None se a etapa precisa rodar
+        """
+        registro = self.obter(id_video, etapa)
+        if registro is None or registro['estado'] != self.CONCLUIDA:
+            return None
+        if registro['hash_entrada'] != hash_entrada:
+            return None
+
+        for valor in registro['saidas'].values():
+            caminhos = valor if isinstance(valor, list) else [valor]
+            if not all(isinstance(c, str) and os.path.exists(c) for c in caminhos):
+                return None
+
+        return registro['saidas']
+
+    def iniciar(self, id_video, etapa, hash_entrada):
+        """Marca a etapa como em execução (conta uma nova tentativa)."""
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                """
+                INSERT INTO etapas (id_video, etapa, estado, hash_entrada, inicio, tentativas, atualizado_em)
+                VALUES (?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (id_video, etapa) DO UPDATE SET
+                    estado = excluded.estado,
+                    hash_entrada = excluded.hash_entrada,
+                    inicio = excluded.inicio,
+                    fim = NULL,
+                    duracao = NULL,
+                    erro = NULL,
+                    tentativas = etapas.tentativas + 1,
+                    atualizado_em = excluded.atualizado_em
+                """,
+                (id_video, etapa, self.EXECUTANDO, hash_entrada, agora, self._agora())
+            )
+
+    def concluir(self, id_video, etapa, saidas):
+        """Marca a etapa como concluída e registra os caminhos de saída."""
+        self._finalizar(id_video, etapa, self.CONCLUIDA, saidas=saidas)
+
+    def falhar(self, id_video, etapa, erro):
+        """Marca a etapa como falha e registra a mensagem de erro."""
+        self._finalizar(id_video, etapa, self.FALHOU, erro=str(erro))
+
+    def _finalizar(self, id_video, etapa, estado, saidas=None, erro=None):
+        """Atualiza estado, saídas, erro e tempos de uma etapa em execução."""
+        agora = time.time()
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                """
+                UPDATE etapas SET
+                    estado = ?,
+                    saidas = ?,
+                    erro = ?,
+                    fim = ?,
+                    duracao = ? - COALESCE(inicio, ?),
+                    atualizado_em = ?
+                WHERE id_video = ? AND etapa = ?
+                """,
+                (
+                    estado,
+                    json.dumps(saidas, ensure_ascii=False) if saidas is not None else None,
+                    erro,
+                    agora, agora, agora,
+                    self._agora(),
+                    id_video, etapa
+                )
+            )
+
+    def videos_pendentes_de_falha(self):
+        """
+        Lista os vídeos com alguma etapa que falhou ou foi interrompida.
+
+        Returns:
+            Conjunto de id_video
+        """
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT DISTINCT id_video FROM etapas WHERE estado IN (?, ?)",
+                (self.FALHOU, self.EXECUTANDO)
+            ).fetchall()
+        return {linha['id_video'] for linha in linhas}
+
+    def resumo(self):
+        """
+        Conta as etapas por estado.
+
+        Returns:
+            Dicionário {estado: quantidade}
+        """
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT estado, COUNT(*) AS total FROM etapas GROUP BY estado"
+            ).fetchall()
+        return {linha['estado']: linha['total'] for linha in linhas}
+
+    def _agora(self):
+        """Data/hora atual legível para a coluna atualizado_em."""
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
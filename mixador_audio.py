@@ -0,0 +1,191 @@
+"""
+Pré-mixagem de Áudio (narração + música de fundo) com NumPy
+Decodifica a música uma única vez por lote, faz o loop/corte, volume, ducking
+sob a voz e normalização de loudness com operações de array e grava uma faixa
+final pronta; os motores de montagem só precisam multiplexá-la. A mixagem é
+feita num formato de saída fixo (padrão 44,1 kHz estéreo, como o caminho
+MoviePy): a narração do TTS (24 kHz mono) é convertida para ele, e nunca a
+música para o formato do TTS.
+"""
+import os
+import wave
+import logging
+import threading
+import subprocess
+
+import numpy as np
+
+
+class MixadorAudio:
+    """
+    Mistura a narração com a música de fundo fora do encoder.
+
+    A música decodificada fica em memória (float32) indexada por
+    (arquivo, mtime, taxa, canais) e é reaproveitada por todos os vídeos do lote.
+    """
+
+    # Janela (s) usada para medir a presença da voz e o loudness
+    JANELA_ANALISE = 0.05
+
+    def __init__(self, ducking=True, reducao_ducking_db=8.0, limiar_voz_db=-40.0, suavizacao_ducking=0.25,
+                 loudness_alvo_db=-16.0, pico_maximo_db=-1.0, taxa_amostragem=44100, canais=2, logger=None):
+        """
+        Inicializa o mixador.
+
+        Args:
+            ducking: Se True, abaixa a música enquanto há voz
+            reducao_ducking_db: Quanto a música abaixa sob a voz (dB)
+            limiar_voz_db: Nível RMS (dBFS) a partir do qual uma janela conta como voz
+            suavizacao_ducking: Duração (s) da rampa de entrada/saída do ducking
+            loudness_alvo_db: Nível RMS (dBFS, janelas silenciosas ignoradas) da mixagem final,
+                              ou None para não normalizar
+            pico_maximo_db: Pico máximo (dBFS) da mixagem final
+            taxa_amostragem: Taxa (Hz) da faixa mixada
+            canais: Canais da faixa mixada
+            logger: Logger opcional para saída de logs
+        """
+        self.ducking = ducking
+        self.reducao_ducking_db = reducao_ducking_db
+        self.limiar_voz_db = limiar_voz_db
+        self.suavizacao_ducking = suavizacao_ducking
+        self.loudness_alvo_db = loudness_alvo_db
+        self.pico_maximo_db = pico_maximo_db
+        self.taxa_amostragem = int(taxa_amostragem)
+        self.canais = int(canais)
+        self.logger = logger or logging.getLogger("MixadorAudio")
+
+        self._musicas = {}
+        self._lock = threading.Lock()
+
+    # --- Leitura/escrita ---
+
+    def _ler_narracao(self, path_audio):
+        """
+        Lê a narração como float32 [amostras, canais] no formato de saída.
+
+        Um .wav PCM 16 bits na taxa de saída é lido direto (mono é duplicado
+        nos canais); qualquer outro caso é convertido pelo ffmpeg.
+        """
+        with wave.open(path_audio, 'rb') as f:
+            taxa = f.getframerate()
+            canais = f.getnchannels()
+            if f.getsampwidth() == 2 and taxa == self.taxa_amostragem and canais in (1, self.canais):
+                dados = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+                amostras = dados.reshape(-1, canais).astype(np.float32) / 32768.0
+                return np.repeat(amostras, self.canais // canais, axis=1)
+        return self._decodificar(path_audio, self.taxa_amostragem, self.canais)
+
+    def _decodificar(self, path_audio, taxa, canais):
+        """Decodifica qualquer áudio com o ffmpeg para float32 [amostras, canais]."""
+        comando = [
+            "ffmpeg", "-loglevel", "error", "-i", path_audio,
+            "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(taxa), "-ac", str(canais), "-"
+        ]
+        resultado = subprocess.run(comando, capture_output=True)
+        if resultado.returncode != 0:
+            linhas_erro = resultado.stderr.decode('utf-8', errors='replace').strip().split('\n')[-10:]
+            raise RuntimeError(f"FFmpeg falhou ao decodificar '{path_audio}':\n" + "\n".join(linhas_erro))
+        return np.frombuffer(resultado.stdout, dtype=np.float32).reshape(-1, canais)
+
+    def _gravar_wav(self, amostras, taxa, arquivo_saida):
+        """Grava float32 [amostras, canais] como .wav PCM 16 bits."""
+        pcm = (np.clip(amostras, -1.0, 1.0) * 32767).astype(np.int16)
+        with wave.open(arquivo_saida, 'wb') as f:
+            f.setnchannels(amostras.shape[1])
+            f.setsampwidth(2)
+            f.setframerate(taxa)
+            f.writeframes(pcm.tobytes())
+
+    def obter_musica(self, musica_path, taxa, canais):
+        """
+        Música decodificada na taxa/canais de saída (decodifica uma vez por lote).
+
+        Returns:
+            Array float32 [amostras, canais] (somente leitura, compartilhado)
+        """
+        chave = (os.path.abspath(musica_path), os.path.getmtime(musica_path), taxa, canais)
+        with self._lock:
+            if chave not in self._musicas:
+                self.logger.info(f"🎵 Decodificando música de fundo: {os.path.basename(musica_path)} ({taxa} Hz, {canais} canal(is))")
+                musica = self._decodificar(musica_path, taxa, canais)
+                musica.setflags(write=False)
+                self._musicas[chave] = musica
+            return self._musicas[chave]
+
+    # --- Processamento ---
+
+    def _rms_por_janela(self, amostras, tamanho_janela):
+        """RMS (linear) de cada janela de `tamanho_janela` amostras (mono)."""
+        mono = amostras.mean(axis=1)
+        num_janelas = int(np.ceil(len(mono) / tamanho_janela))
+        preenchido = np.zeros(num_janelas * tamanho_janela, dtype=np.float32)
+        preenchido[:len(mono)] = mono
+        return np.sqrt(np.mean(preenchido.reshape(num_janelas, tamanho_janela) ** 2, axis=1))
+
+    def _em_loop(self, musica, total_amostras):
+        """Repete (ou corta) a música até `total_amostras`."""
+        if len(musica) == 0:
+            return np.zeros((total_amostras, musica.shape[1]), dtype=np.float32)
+        repeticoes = int(np.ceil(total_amostras / len(musica)))
+        return np.tile(musica, (repeticoes, 1))[:total_amostras]
+
+    def _ganho_ducking(self, narracao, taxa):
+        """Ganho por amostra da música: 1 sem voz, -reducao_ducking_db sob a voz, com rampas."""
+        tamanho_janela = max(1, int(taxa * self.JANELA_ANALISE))
+        rms = self._rms_por_janela(narracao, tamanho_janela)
+        com_voz = 20 * np.log10(np.maximum(rms, 1e-10)) > self.limiar_voz_db
+
+        ganho = np.where(com_voz, 10 ** (-self.reducao_ducking_db / 20), 1.0).astype(np.float32)
+
+        # Rampa: média móvel do ganho ao longo de `suavizacao_ducking` segundos
+        largura = max(1, int(round(self.suavizacao_ducking / self.JANELA_ANALISE)))
+        if largura > 1:
+            ganho = np.convolve(np.pad(ganho, (largura // 2, largura - 1 - largura // 2), mode='edge'),
+                                np.ones(largura, dtype=np.float32) / largura, mode='valid')
+
+        return np.repeat(ganho, tamanho_janela)[:len(narracao), None]
+
+    def _normalizar(self, mixagem, taxa):
+        """Ajusta o nível RMS (janelas com som) ao alvo e limita o pico."""
+        if self.loudness_alvo_db is not None:
+            rms = self._rms_por_janela(mixagem, max(1, int(taxa * self.JANELA_ANALISE)))
+            # Janelas abaixo de -50 dBFS (pausas) não entram na medida
+            audiveis = rms[rms > 10 ** (-50 / 20)]
+            if len(audiveis):
+                nivel_db = 20 * np.log10(np.sqrt(np.mean(audiveis ** 2)))
+                mixagem *= 10 ** ((self.loudness_alvo_db - nivel_db) / 20)
+                self.logger.debug(f"Loudness: {nivel_db:.1f} dBFS → {self.loudness_alvo_db:.1f} dBFS")
+
+        pico = np.abs(mixagem).max() if len(mixagem) else 0.0
+        pico_maximo = 10 ** (self.pico_maximo_db / 20)
+        if pico > pico_maximo:
+            mixagem *= pico_maximo / pico
+        return mixagem
+
+    def mixar(self, path_narracao, arquivo_saida, musica_path=None, musica_volume=0.1):
+        """
+        Gera a faixa final (narração + música) em um .wav.
+
+        Args:
+            path_narracao: Narração (.wav) - define a duração; é convertida para o formato de saída
+            arquivo_saida: Caminho do .wav mixado
+            musica_path: Música de fundo opcional (em loop até o fim da narração)
+            musica_volume: Volume da música (multiplicador)
+
+        Returns:
+            Caminho do arquivo mixado
+        """
+        taxa = self.taxa_amostragem
+        narracao = self._ler_narracao(path_narracao)
+        mixagem = narracao.copy()
+
+        if musica_path:
+            musica = self._em_loop(self.obter_musica(musica_path, taxa, self.canais), len(narracao))
+            musica = musica * np.float32(musica_volume)
+            if self.ducking:
+                musica *= self._ganho_ducking(narracao, taxa)
+            mixagem += musica
+
+        mixagem = self._normalizar(mixagem, taxa)
+        self._gravar_wav(mixagem, taxa, arquivo_saida)
+        return arquivo_saida
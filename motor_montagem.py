@@ -0,0 +1,816 @@
+"""
+Motores de Montagem Ken Burns (NumPy + FFmpeg, FFmpeg puro)
+Monta o vídeo base sem o MoviePy:
+- MotorMontagem: calcula de antemão os retângulos de zoom/pan de cada cena e
+  gera cada quadro com uma única reamostragem, enviada crua para o stdin do ffmpeg
+- MontagemFFmpeg: descreve a montagem inteira como um único filtergraph do
+  ffmpeg (nenhum quadro passa pelo Python)
+- MontagemSegmentada: renderiza cada cena (e cada junção de crossfade) em um
+  processo separado e junta os trechos com o concat demuxer, sem recodificar
+"""
+import os
+import time
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import wave
+import random
+import logging
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+
+# Movimentos do Ken Burns (mesma numeração de VideoPipeline._apply_ken_burns)
+ZOOM_IN, ZOOM_OUT, PAN_ESQUERDA_DIREITA, PAN_DIREITA_ESQUERDA = range(4)
+
+
+def duracao_wav(path_audio):
+    """Duração de um .wav em segundos."""
+    with wave.open(path_audio, 'rb') as f:
+        return f.getnframes() / float(f.getframerate())
+
+
+def linha_do_tempo(num_cenas, duracao_total, duracao_transicao):
+    """
+    Intervalos (inicio, fim) em que cada cena fica visível.
+
+    A cena i começa em i*d - transição (a primeira em 0), como no caminho
+    MoviePy, e continua visível até (i+1)*d, por baixo do crossfade da
+    cena seguinte; a última vai até o fim do áudio.
+
+    Returns:
+        Lista de tuplas (inicio, fim) em segundos
+    """
+    duracao_cena = duracao_total / num_cenas
+    intervalos = []
+    for i in range(num_cenas):
+        inicio = 0.0 if i == 0 else i * duracao_cena - duracao_transicao
+        fim = duracao_total if i == num_cenas - 1 else (i + 1) * duracao_cena
+        intervalos.append((inicio, fim))
+    return intervalos
+
+
+def filtro_mistura_audio(entrada_narracao, entrada_musica, musica_volume, rotulo="audio"):
+    """
+    Trecho de filtergraph que mistura a narração com a música (já em loop na entrada).
+
+    A mistura termina junto com a narração e não normaliza o volume
+    (soma simples, como o CompositeAudioClip do MoviePy).
+
+    Args:
+        entrada_narracao: Índice da entrada de narração no ffmpeg
+        entrada_musica: Índice da entrada de música no ffmpeg
+        musica_volume: Volume da música (multiplicador)
+        rotulo: Nome do rótulo de saída
+
+    Returns:
+        String do filtro, com saída em [rotulo]
+    """
+    return (
+        f"[{entrada_musica}:a]volume={musica_volume}[musica];"
+        f"[{entrada_narracao}:a][musica]amix=inputs=2:duration=first:normalize=0[{rotulo}]"
+    )
+
+
+def filtro_legendas(arquivo_legendas, deslocamento=0.0):
+    """
+    Filtro de vídeo que queima as legendas .ass na montagem (codificação única).
+
+    Args:
+        arquivo_legendas: Caminho do arquivo .ass
+        deslocamento: Instante (s) do vídeo completo em que o trecho começa;
+                      os tempos do .ass são relativos ao vídeo inteiro
+
+    Returns:
+        String do filtro (sem rótulos)
+    """
+    if not deslocamento:
+        return f"ass={arquivo_legendas}"
+    return f"setpts=PTS+{deslocamento:.6f}/TB,ass={arquivo_legendas},setpts=PTS-STARTPTS"
+
+
+def escala_base(tamanho_imagem, largura, altura):
+    """Escala que faz a imagem cobrir 1.1x o quadro (altura ajustada e depois 1.1x)."""
+    w_img, h_img = tamanho_imagem
+    return 1.1 * max(altura / h_img, largura / w_img)
+
+
+def regiao_movimento(tamanho_imagem, largura, altura, efeito):
+    """
+    Parte da imagem original que o movimento chega a mostrar e o tamanho em
+    que ela precisa estar para que nenhum quadro seja ampliado.
+
+    Zooms só mostram o recorte central do quadro (em 1.0x) e chegam a 1.1x;
+    pans mostram toda a largura, numa faixa da altura do quadro, sem zoom.
+
+    Args:
+        tamanho_imagem: (largura, altura) da imagem original
+        largura: Largura do vídeo (px)
+        altura: Altura do vídeo (px)
+        efeito: ZOOM_IN, ZOOM_OUT, PAN_ESQUERDA_DIREITA ou PAN_DIREITA_ESQUERDA
+
+    Returns:
+        Tupla (caixa (x0, y0, x1, y1) na imagem original, (largura, altura) preparada)
+    """
+    w_img, h_img = tamanho_imagem
+    escala = escala_base(tamanho_imagem, largura, altura)
+    w_base, h_base = w_img * escala, h_img * escala
+
+    if efeito in (ZOOM_IN, ZOOM_OUT):
+        x0, y0 = (w_base - largura) / 2, (h_base - altura) / 2
+        caixa = (x0, y0, x0 + largura, y0 + altura)
+        tamanho = (int(round(largura * 1.1)), int(round(altura * 1.1)))
+    else:
+        y0 = (h_base - altura) / 2
+        caixa = (0.0, y0, w_base, y0 + altura)
+        tamanho = (int(round(w_base)), altura)
+
+    return tuple(c / escala for c in caixa), tamanho
+
+
+def _executar_ffmpeg(comando, logger):
+    """Executa o ffmpeg e levanta RuntimeError com as últimas linhas do erro."""
+    logger.debug(f"Comando FFmpeg: {' '.join(comando)}")
+    resultado = subprocess.run(comando, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if resultado.returncode != 0:
+        linhas_erro = resultado.stderr.strip().split('\n')[-10:]
+        raise RuntimeError(f"FFmpeg falhou com código {resultado.returncode}:\n" + "\n".join(linhas_erro))
+
+
+class MotorMontagem:
+    """
+    Renderizador do vídeo base: cenas com Ken Burns, crossfade entre cenas,
+    narração e música de fundo.
+
+    As cenas são ampliadas para cobrir 1.1x o quadro (como no caminho MoviePy);
+    o zoom vai de 1.0x a 1.1x (ou o contrário) centralizado e os pans percorrem
+    a largura da imagem de uma borda à outra, centralizados na vertical.
+    """
+
+    def __init__(self, largura, altura, fps=24, duracao_transicao=0.5, logger=None):
+        """
+        Inicializa o motor.
+
+        Args:
+            largura: Largura do vídeo (px)
+            altura: Altura do vídeo (px)
+            fps: Quadros por segundo
+            duracao_transicao: Duração do crossfade entre cenas (s)
+            logger: Logger opcional para saída de logs
+        """
+        self.largura = int(largura)
+        self.altura = int(altura)
+        self.fps = fps
+        self.duracao_transicao = duracao_transicao
+        self.logger = logger or logging.getLogger("MotorMontagem")
+
+        # Buffers reaproveitados entre quadros (crossfade)
+        self._buffer_a = np.empty((self.altura, self.largura, 3), dtype=np.uint16)
+        self._buffer_b = np.empty((self.altura, self.largura, 3), dtype=np.uint16)
+        self._buffer_quadro = np.empty((self.altura, self.largura, 3), dtype=np.uint8)
+
+    # --- Planejamento ---
+
+    def quadro_do_instante(self, segundos):
+        """Índice do primeiro quadro em ou depois de um instante."""
+        return int(np.ceil(segundos * self.fps - 1e-9))
+
+    def planejar_cenas(self, paths_imagens, duracao_total, efeitos=None, carregar=None, preparadas=None):
+        """
+        Calcula a linha do tempo (ver linha_do_tempo) e os retângulos de
+        recorte de todas as cenas.
+
+        Args:
+            paths_imagens: Lista de caminhos das cenas
+            duracao_total: Duração do vídeo (s)
+            efeitos: Lista opcional com o movimento de cada cena (padrão: aleatório)
+            carregar: Índices das cenas cujas imagens devem ser carregadas (padrão: todas).
+                      As demais só recebem a linha do tempo.
+            preparadas: Lista opcional de .npy de PreparadorCenas (um por cena, feitos
+                        com os mesmos `efeitos`); são abertos com memory-map, sem redimensionar
+
+        Returns:
+            Lista de dicionários {inicio, fim, primeiro_quadro, fim_transicao, imagem, retangulos}
+            onde `retangulos` é um array [quadros, 4] com (x0, y0, x1, y1) na imagem
+            carregada (a original ou a preparada) e `fim_transicao` é o primeiro
+            quadro (exclusivo) depois do crossfade com a cena anterior
+        """
+        intervalos = linha_do_tempo(len(paths_imagens), duracao_total, self.duracao_transicao)
+        cenas = []
+
+        for i, (path_img, (inicio, fim)) in enumerate(zip(paths_imagens, intervalos)):
+            efeito = efeitos[i] if efeitos is not None else random.randint(0, 3)
+            cena = {
+                'inicio': inicio,
+                'fim': fim,
+                'primeiro_quadro': self.quadro_do_instante(inicio)
+            }
+            # Limite do crossfade em índices de quadro, nunca além dos retângulos da cena anterior
+            cena['fim_transicao'] = cena['primeiro_quadro']
+            if i > 0 and self.duracao_transicao > 0:
+                cena['fim_transicao'] = min(
+                    self.quadro_do_instante(inicio + self.duracao_transicao),
+                    self.quadro_do_instante(intervalos[i - 1][1])
+                )
+
+            if carregar is None or i in carregar:
+                t_local = np.arange(cena['primeiro_quadro'], self.quadro_do_instante(fim)) / self.fps - inicio
+                if preparadas is not None:
+                    self._carregar_preparada(cena, path_img, preparadas[i], t_local, fim - inicio, efeito)
+                else:
+                    imagem = Image.open(path_img).convert("RGB")
+                    imagem.load()
+                    cena['imagem'] = imagem
+                    cena['retangulos'] = self._retangulos(imagem.size, t_local, fim - inicio, efeito)
+
+            cenas.append(cena)
+
+        return cenas
+
+    def _carregar_preparada(self, cena, path_img, path_preparada, t_local, duracao_cena, efeito):
+        """Abre a cena preparada (memory-map) e leva os retângulos para as coordenadas dela."""
+        preparada = np.load(path_preparada, mmap_mode='r')
+        with Image.open(path_img) as imagem:
+            tamanho_original = imagem.size
+
+        caixa, tamanho = regiao_movimento(tamanho_original, self.largura, self.altura, efeito)
+        if (preparada.shape[1], preparada.shape[0]) != tamanho:
+            raise ValueError(f"Cena preparada {os.path.basename(path_preparada)} não corresponde ao movimento da cena")
+
+        fator = tamanho[0] / (caixa[2] - caixa[0])
+        retangulos = self._retangulos(tamanho_original, t_local, duracao_cena, efeito)
+        cena['imagem'] = preparada
+        cena['retangulos'] = (retangulos - np.array(caixa[:2] * 2)) * fator
+
+    def _retangulos(self, tamanho_imagem, t_local, duracao_cena, efeito):
+        """
+        Retângulos de recorte (na imagem original) para os instantes `t_local`.
+
+        Args:
+            tamanho_imagem: (largura, altura) da imagem original
+            t_local: Array com o tempo de cada quadro desde o início da cena
+            duracao_cena: Duração visível da cena (o movimento vai de 0 a 1 nela)
+            efeito: ZOOM_IN, ZOOM_OUT, PAN_ESQUERDA_DIREITA ou PAN_DIREITA_ESQUERDA
+
+        Returns:
+            Array float64 [quadros, 4] com (x0, y0, x1, y1)
+        """
+        w_img, h_img = tamanho_imagem
+        escala = escala_base(tamanho_imagem, self.largura, self.altura)
+        w_base, h_base = w_img * escala, h_img * escala
+
+        progresso = np.clip(t_local / duracao_cena, 0.0, 1.0)
+
+        if efeito in (ZOOM_IN, ZOOM_OUT):
+            zoom = 1.0 + progresso * 0.1 if efeito == ZOOM_IN else 1.1 - progresso * 0.1
+            w_janela = self.largura / zoom
+            h_janela = self.altura / zoom
+            x0 = (w_base - w_janela) / 2
+            y0 = (h_base - h_janela) / 2
+        else:
+            w_janela = np.full_like(progresso, self.largura, dtype=np.float64)
+            h_janela = np.full_like(progresso, self.altura, dtype=np.float64)
+            deslocamento = w_base - self.largura
+            if efeito == PAN_DIREITA_ESQUERDA:
+                progresso = 1.0 - progresso
+            x0 = progresso * deslocamento
+            y0 = np.full_like(progresso, (h_base - self.altura) / 2)
+
+        # Volta para as coordenadas da imagem original (uma única reamostragem por quadro)
+        retangulos = np.stack([x0, y0, x0 + w_janela, y0 + h_janela], axis=1) / escala
+        return retangulos
+
+    # --- Renderização ---
+
+    def _quadro_da_cena(self, cena, indice_quadro):
+        """Gera o quadro de uma cena com uma única reamostragem (recorte + escala)."""
+        retangulo = cena['retangulos'][indice_quadro - cena['primeiro_quadro']]
+        imagem = cena['imagem']
+
+        if isinstance(imagem, np.ndarray):
+            x0, y0, x1, y1 = retangulo
+            if abs((x1 - x0) - self.largura) < 0.5 and abs((y1 - y0) - self.altura) < 0.5:
+                # Pan sobre a cena preparada: a janela já está na escala do vídeo, basta recortar
+                x = int(np.clip(round(x0), 0, imagem.shape[1] - self.largura))
+                y = int(np.clip(round(y0), 0, imagem.shape[0] - self.altura))
+                return imagem[y:y + self.altura, x:x + self.largura]
+            # Zoom: o PIL precisa da imagem em memória (uma cópia por cena, não por quadro)
+            if 'imagem_pil' not in cena:
+                cena['imagem_pil'] = Image.fromarray(np.asarray(imagem))
+            imagem = cena['imagem_pil']
+
+        return imagem.resize((self.largura, self.altura), Image.BILINEAR, box=tuple(retangulo))
+
+    def _misturar(self, quadro_anterior, quadro_atual, alfa):
+        """Crossfade em inteiros nos buffers pré-alocados: anterior*(1-alfa) + atual*alfa."""
+        peso = int(round(alfa * 256))
+        np.multiply(np.asarray(quadro_anterior), 256 - peso, out=self._buffer_a, dtype=np.uint16)
+        np.multiply(np.asarray(quadro_atual), peso, out=self._buffer_b, dtype=np.uint16)
+        np.add(self._buffer_a, self._buffer_b, out=self._buffer_a)
+        np.right_shift(self._buffer_a, 8, out=self._buffer_a)
+        np.copyto(self._buffer_quadro, self._buffer_a, casting='unsafe')
+        return self._buffer_quadro
+
+    def gerar_quadros(self, cenas, ultimo_quadro, primeiro_quadro=0):
+        """
+        Gera os quadros do vídeo em ordem (bytes RGB24).
+
+        Args:
+            cenas: Saída de planejar_cenas
+            ultimo_quadro: Quadro final (exclusivo) - o total de quadros para o vídeo inteiro
+            primeiro_quadro: Quadro inicial (para renderizar só um trecho)
+        """
+        indice_cena = 0
+        for quadro in range(primeiro_quadro, ultimo_quadro):
+            # Avança para a cena mais recente que já começou
+            while indice_cena + 1 < len(cenas) and cenas[indice_cena + 1]['primeiro_quadro'] <= quadro:
+                indice_cena += 1
+
+            cena = cenas[indice_cena]
+            atual = self._quadro_da_cena(cena, quadro)
+
+            if quadro < cena['fim_transicao']:
+                t_na_cena = quadro / self.fps - cena['inicio']
+                anterior = self._quadro_da_cena(cenas[indice_cena - 1], quadro)
+                alfa = min(max(t_na_cena / self.duracao_transicao, 0.0), 1.0)
+                yield self._misturar(anterior, atual, alfa).data
+            else:
+                yield atual.tobytes()
+
+    def _comando_ffmpeg(self, path_audio, arquivo_saida, musica_path, musica_volume, preset, crf, threads,
+                        arquivo_legendas=None):
+        """Monta o comando do ffmpeg que recebe os quadros crus pelo stdin."""
+        comando = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{self.largura}x{self.altura}", "-r", str(self.fps),
+            "-i", "-",
+            "-i", path_audio
+        ]
+
+        if musica_path:
+            # Música em loop, com volume, misturada à narração (termina junto com a narração)
+            comando += ["-stream_loop", "-1", "-i", musica_path]
+            comando += [
+                "-filter_complex", filtro_mistura_audio(1, 2, musica_volume),
+                "-map", "0:v", "-map", "[audio]"
+            ]
+        else:
+            comando += ["-map", "0:v", "-map", "1:a"]
+
+        if arquivo_legendas:
+            comando += ["-vf", filtro_legendas(arquivo_legendas)]
+
+        comando += [
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+            "-pix_fmt", "yuv420p",
+            "-c:a", "aac",
+            "-shortest"
+        ]
+        if threads:
+            comando += ["-threads", str(threads)]
+        comando.append(arquivo_saida)
+        return comando
+
+    def _enviar_quadros(self, comando, quadros):
+        """Executa o ffmpeg escrevendo os quadros crus no stdin."""
+        self.logger.debug(f"Comando FFmpeg: {' '.join(comando)}")
+
+        # stderr vai para um arquivo: um pipe cheio travaria o ffmpeg enquanto escrevemos no stdin
+        with tempfile.TemporaryFile() as log_erro:
+            processo = subprocess.Popen(comando, stdin=subprocess.PIPE, stderr=log_erro)
+            try:
+                for dados in quadros:
+                    processo.stdin.write(dados)
+                processo.stdin.close()
+            except BrokenPipeError:
+                pass  # O ffmpeg saiu antes; o código de retorno abaixo explica o motivo
+            finally:
+                codigo = processo.wait()
+
+            if codigo != 0:
+                log_erro.seek(0)
+                linhas_erro = log_erro.read().decode('utf-8', errors='replace').strip().split('\n')[-10:]
+                raise RuntimeError(f"FFmpeg falhou com código {codigo}:\n" + "\n".join(linhas_erro))
+
+    def renderizar_trecho(self, cenas, primeiro_quadro, ultimo_quadro, arquivo_saida, preset="medium", crf=23, threads=None,
+                          arquivo_legendas=None):
+        """
+        Renderiza só os quadros [primeiro_quadro, ultimo_quadro) em um arquivo de vídeo sem áudio.
+
+        Os trechos usam sempre os mesmos parâmetros de codificação, para que
+        possam ser unidos pelo concat demuxer sem recodificar. Com
+        `arquivo_legendas`, as legendas do instante do trecho são queimadas nele.
+        """
+        comando = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{self.largura}x{self.altura}", "-r", str(self.fps),
+            "-i", "-",
+            "-an"
+        ]
+        if arquivo_legendas:
+            comando += ["-vf", filtro_legendas(arquivo_legendas, primeiro_quadro / self.fps)]
+        comando += [
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+            "-pix_fmt", "yuv420p"
+        ]
+        if threads:
+            comando += ["-threads", str(threads)]
+        comando.append(arquivo_saida)
+        self._enviar_quadros(comando, self.gerar_quadros(cenas, ultimo_quadro, primeiro_quadro))
+
+    def renderizar(self, paths_imagens, path_audio, arquivo_saida, musica_path=None, musica_volume=0.1,
+                   preset="medium", crf=23, threads=None, arquivo_legendas=None, efeitos=None, preparadas=None):
+        """
+        Renderiza o vídeo base completo.
+
+        Args:
+            paths_imagens: Lista de caminhos das cenas
+            path_audio: Narração (.wav) - define a duração do vídeo
+            arquivo_saida: Caminho do .mp4 de saída
+            musica_path: Música de fundo opcional (em loop até o fim da narração)
+            musica_volume: Volume da música (multiplicador)
+            preset: Preset do libx264
+            crf: Qualidade do libx264
+            threads: Threads do ffmpeg (None = automático)
+            arquivo_legendas: Legendas .ass opcionais, queimadas na mesma codificação
+            efeitos: Lista opcional com o movimento de cada cena (padrão: aleatório)
+            preparadas: Lista opcional de cenas preparadas (.npy) para esses `efeitos`
+
+        Returns:
+            Dicionário com quadros, tempo e quadros por segundo renderizados
+        """
+        inicio = time.perf_counter()
+        duracao_total = duracao_wav(path_audio)
+        total_quadros = self.quadro_do_instante(duracao_total)
+        cenas = self.planejar_cenas(paths_imagens, duracao_total, efeitos, preparadas=preparadas)
+
+        self.logger.info(
+            f"🎞️  Motor NumPy: {len(cenas)} cenas, {total_quadros} quadros "
+            f"({self.largura}x{self.altura} @ {self.fps} fps)"
+        )
+
+        comando = self._comando_ffmpeg(path_audio, arquivo_saida, musica_path, musica_volume, preset, crf, threads,
+                                       arquivo_legendas)
+        self._enviar_quadros(comando, self.gerar_quadros(cenas, total_quadros))
+
+        tempo = time.perf_counter() - inicio
+        return {
+            'quadros': total_quadros,
+            'tempo': tempo,
+            'quadros_por_segundo': total_quadros / tempo if tempo > 0 else 0.0
+        }
+
+
+class MontagemFFmpeg:
+    """
+    Montagem do vídeo base como um único filtergraph do ffmpeg.
+
+    Cada cena é uma entrada de imagem em loop; o Ken Burns usa `zoompan`
+    (zoom centralizado) ou `crop` com posição em função do tempo (pans), as
+    cenas são encadeadas com `xfade` e a música entra com `-stream_loop`,
+    `volume` e `amix`. Todo o trabalho fica nas threads do próprio ffmpeg.
+    """
+
+    def __init__(self, largura, altura, fps=24, duracao_transicao=0.5, logger=None):
+        """
+        Inicializa a montagem.
+
+        Args:
+            largura: Largura do vídeo (px)
+            altura: Altura do vídeo (px)
+            fps: Quadros por segundo
+            duracao_transicao: Duração do crossfade entre cenas (s)
+            logger: Logger opcional para saída de logs
+        """
+        self.largura = int(largura)
+        self.altura = int(altura)
+        self.fps = fps
+        self.duracao_transicao = duracao_transicao
+        self.logger = logger or logging.getLogger("MontagemFFmpeg")
+
+    def _par(self, valor):
+        """Arredonda para o par mais próximo (exigência do yuv420p/libx264)."""
+        return max(2, int(round(valor / 2.0)) * 2)
+
+    def filtro_cena(self, entrada, tamanho_imagem, duracao, efeito, rotulo):
+        """
+        Filtro de vídeo de uma cena: escala, Ken Burns e formato comum ao xfade.
+
+        Args:
+            entrada: Índice da entrada da imagem no ffmpeg
+            tamanho_imagem: (largura, altura) da imagem original
+            duracao: Tempo em que a cena fica visível (s)
+            efeito: ZOOM_IN, ZOOM_OUT, PAN_ESQUERDA_DIREITA ou PAN_DIREITA_ESQUERDA
+            rotulo: Nome do rótulo de saída
+
+        Returns:
+            String do filtro, com saída em [rotulo]
+        """
+        escala = escala_base(tamanho_imagem, self.largura, self.altura)
+        w_base = self._par(tamanho_imagem[0] * escala)
+        h_base = self._par(tamanho_imagem[1] * escala)
+        filtros = [f"scale={w_base}:{h_base}"]
+
+        if efeito in (ZOOM_IN, ZOOM_OUT):
+            # Recorte central com o aspecto do vídeo; no zoompan, z=1.1 mostra exatamente o quadro (zoom 1.0x)
+            w_recorte = self._par(self.largura * 1.1)
+            h_recorte = self._par(self.altura * 1.1)
+            quadros = max(1, int(round(duracao * self.fps)) - 1)
+            if efeito == ZOOM_IN:
+                zoom = f"1.1+0.11*on/{quadros}"
+            else:
+                zoom = f"1.21-0.11*on/{quadros}"
+            filtros += [
+                f"crop={w_recorte}:{h_recorte}",
+                f"zoompan=z='{zoom}':x='iw/2-iw/zoom/2':y='ih/2-ih/zoom/2'"
+                f":d=1:s={self.largura}x{self.altura}:fps={self.fps}"
+            ]
+        else:
+            if efeito == PAN_ESQUERDA_DIREITA:
+                x = f"(iw-ow)*t/{duracao:.6f}"
+            else:
+                x = f"(iw-ow)*(1-t/{duracao:.6f})"
+            filtros.append(f"crop=w={self.largura}:h={self.altura}:x='{x}':y='(ih-oh)/2'")
+
+        filtros += ["setsar=1", "format=yuv420p", f"fps={self.fps}"]
+        return f"[{entrada}:v]" + ",".join(filtros) + f"[{rotulo}]"
+
+    def construir_filtergraph(self, tamanhos_imagens, duracao_total, efeitos, entrada_narracao, entrada_musica=None,
+                              musica_volume=0.1, arquivo_legendas=None):
+        """
+        Monta o filtergraph completo (cenas, crossfades, legendas opcionais e áudio).
+
+        As imagens devem ser as entradas 0..N-1, cada uma em loop com a
+        duração do seu intervalo na linha do tempo.
+
+        Returns:
+            Tupla (filtergraph, rótulo do vídeo, rótulo do áudio ou None)
+        """
+        intervalos = linha_do_tempo(len(tamanhos_imagens), duracao_total, self.duracao_transicao)
+        partes = []
+
+        for i, (tamanho, (inicio, fim)) in enumerate(zip(tamanhos_imagens, intervalos)):
+            partes.append(self.filtro_cena(i, tamanho, fim - inicio, efeitos[i], f"c{i}"))
+
+        # Encadeia os crossfades: o offset é o início da cena seguinte na linha do tempo
+        rotulo_video = "c0"
+        for i in range(1, len(intervalos)):
+            saida = f"x{i}"
+            if self.duracao_transicao > 0:
+                partes.append(
+                    f"[{rotulo_video}][c{i}]xfade=transition=fade:"
+                    f"duration={self.duracao_transicao}:offset={intervalos[i][0]:.6f}[{saida}]"
+                )
+            else:
+                partes.append(f"[{rotulo_video}][c{i}]concat=n=2:v=1:a=0[{saida}]")
+            rotulo_video = saida
+
+        if arquivo_legendas:
+            partes.append(f"[{rotulo_video}]{filtro_legendas(arquivo_legendas)}[legendado]")
+            rotulo_video = "legendado"
+
+        rotulo_audio = None
+        if entrada_musica is not None:
+            partes.append(filtro_mistura_audio(entrada_narracao, entrada_musica, musica_volume))
+            rotulo_audio = "audio"
+
+        return ";\n".join(partes), rotulo_video, rotulo_audio
+
+    def renderizar(self, paths_imagens, path_audio, arquivo_saida, musica_path=None, musica_volume=0.1,
+                   preset="medium", crf=23, threads=None, efeitos=None, arquivo_legendas=None):
+        """
+        Renderiza o vídeo base completo com uma única chamada do ffmpeg.
+
+        Args:
+            paths_imagens: Lista de caminhos das cenas
+            path_audio: Narração (.wav) - define a duração do vídeo
+            arquivo_saida: Caminho do .mp4 de saída
+            musica_path: Música de fundo opcional (em loop até o fim da narração)
+            musica_volume: Volume da música (multiplicador)
+            preset: Preset do libx264
+            crf: Qualidade do libx264
+            threads: Threads do ffmpeg (None = automático)
+            efeitos: Lista opcional com o movimento de cada cena (padrão: aleatório)
+            arquivo_legendas: Legendas .ass opcionais, queimadas na mesma codificação
+
+        Returns:
+            Dicionário com quadros, tempo e quadros por segundo renderizados
+        """
+        inicio = time.perf_counter()
+        duracao_total = duracao_wav(path_audio)
+        intervalos = linha_do_tempo(len(paths_imagens), duracao_total, self.duracao_transicao)
+        efeitos = efeitos if efeitos is not None else [random.randint(0, 3) for _ in paths_imagens]
+
+        tamanhos = []
+        comando = ["ffmpeg", "-y", "-loglevel", "error"]
+        for path_img, (inicio_cena, fim_cena) in zip(paths_imagens, intervalos):
+            with Image.open(path_img) as imagem:
+                tamanhos.append(imagem.size)
+            # Um quadro a mais de folga: o xfade precisa da cena anterior até o fim da transição
+            duracao_entrada = fim_cena - inicio_cena + 1.0 / self.fps
+            comando += ["-loop", "1", "-framerate", str(self.fps), "-t", f"{duracao_entrada:.6f}", "-i", path_img]
+
+        entrada_narracao = len(paths_imagens)
+        comando += ["-i", path_audio]
+        entrada_musica = None
+        if musica_path:
+            entrada_musica = entrada_narracao + 1
+            comando += ["-stream_loop", "-1", "-i", musica_path]
+
+        filtergraph, rotulo_video, rotulo_audio = self.construir_filtergraph(
+            tamanhos, duracao_total, efeitos, entrada_narracao, entrada_musica, musica_volume, arquivo_legendas
+        )
+
+        self.logger.info(
+            f"🎞️  Montagem FFmpeg: {len(paths_imagens)} cenas em um único filtergraph "
+            f"({self.largura}x{self.altura} @ {self.fps} fps)"
+        )
+
+        # O filtergraph vai em arquivo: com muitas cenas ele passa do limite da linha de comando
+        fd, arquivo_filtro = tempfile.mkstemp(suffix='.txt', prefix='filtergraph_')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(filtergraph)
+
+            comando += ["-filter_complex_script", arquivo_filtro, "-map", f"[{rotulo_video}]"]
+            comando += ["-map", f"[{rotulo_audio}]" if rotulo_audio else f"{entrada_narracao}:a"]
+            comando += [
+                "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+                "-pix_fmt", "yuv420p",
+                "-c:a", "aac",
+                "-t", f"{duracao_total:.6f}"
+            ]
+            if threads:
+                comando += ["-threads", str(threads)]
+            comando.append(arquivo_saida)
+
+            _executar_ffmpeg(comando, self.logger)
+        finally:
+            os.unlink(arquivo_filtro)
+
+        tempo = time.perf_counter() - inicio
+        total_quadros = int(np.ceil(duracao_total * self.fps - 1e-9))
+        return {
+            'quadros': total_quadros,
+            'tempo': tempo,
+            'quadros_por_segundo': total_quadros / tempo if tempo > 0 else 0.0
+        }
+
+
+# --- Trabalhador do pool de processos (MontagemSegmentada) ---
+
+def _renderizar_peca(largura, altura, fps, duracao_transicao, paths_imagens, duracao_total, efeitos,
+                     indices_cenas, primeiro_quadro, ultimo_quadro, arquivo_saida, preset, crf, threads,
+                     arquivo_legendas=None, preparadas=None):
+    """Renderiza um trecho (corpo de cena ou junção) em um processo separado."""
+    inicio = time.perf_counter()
+    motor = MotorMontagem(largura, altura, fps, duracao_transicao)
+    # Só as imagens das cenas deste trecho são carregadas (as preparadas, por memory-map compartilhado)
+    cenas = motor.planejar_cenas(paths_imagens, duracao_total, efeitos, carregar=set(indices_cenas), preparadas=preparadas)
+    motor.renderizar_trecho(cenas, primeiro_quadro, ultimo_quadro, arquivo_saida, preset, crf, threads, arquivo_legendas)
+    return {'quadros': ultimo_quadro - primeiro_quadro, 'tempo': time.perf_counter() - inicio}
+
+
+class MontagemSegmentada:
+    """
+    Montagem em trechos paralelos.
+
+    O vídeo é dividido em corpos de cena (só uma imagem, Ken Burns puro) e
+    junções (os poucos quadros de crossfade entre duas cenas). Cada trecho é
+    renderizado pelo MotorMontagem em um processo próprio e os trechos são
+    unidos pelo concat demuxer do ffmpeg com cópia de stream; só o áudio é
+    codificado na união. O tempo de parede passa a cair com o número de núcleos.
+    """
+
+    def __init__(self, largura, altura, fps=24, duracao_transicao=0.5, trabalhadores=None, logger=None):
+        """
+        Inicializa a montagem.
+
+        Args:
+            largura: Largura do vídeo (px)
+            altura: Altura do vídeo (px)
+            fps: Quadros por segundo
+            duracao_transicao: Duração do crossfade entre cenas (s)
+            trabalhadores: Processos em paralelo (None = núcleos da máquina)
+            logger: Logger opcional para saída de logs
+        """
+        self.largura = int(largura)
+        self.altura = int(altura)
+        self.fps = fps
+        self.duracao_transicao = duracao_transicao
+        self.trabalhadores = max(1, int(trabalhadores or os.cpu_count() or 1))
+        self.logger = logger or logging.getLogger("MontagemSegmentada")
+
+    def planejar_pecas(self, cenas, total_quadros):
+        """
+        Divide o vídeo em trechos na ordem de exibição.
+
+        Args:
+            cenas: Saída de MotorMontagem.planejar_cenas (sem imagens)
+            total_quadros: Número de quadros do vídeo
+
+        Returns:
+            Lista de dicionários {tipo, cenas, primeiro_quadro, ultimo_quadro}
+        """
+        pecas = []
+
+        for i, cena in enumerate(cenas):
+            inicio_corpo = cena['primeiro_quadro']
+            if i > 0 and self.duracao_transicao > 0:
+                # Junção: quadros em que a cena i ainda está entrando sobre a cena i-1
+                # (o mesmo limite em quadros que MotorMontagem.gerar_quadros usa)
+                fim_juncao = min(cena['fim_transicao'], total_quadros)
+                if fim_juncao > inicio_corpo:
+                    pecas.append({'tipo': 'juncao', 'cenas': [i - 1, i], 'primeiro_quadro': inicio_corpo, 'ultimo_quadro': fim_juncao})
+                inicio_corpo = fim_juncao
+
+            fim_corpo = cenas[i + 1]['primeiro_quadro'] if i + 1 < len(cenas) else total_quadros
+            if fim_corpo > inicio_corpo:
+                pecas.append({'tipo': 'cena', 'cenas': [i], 'primeiro_quadro': inicio_corpo, 'ultimo_quadro': fim_corpo})
+
+        return pecas
+
+    def renderizar(self, paths_imagens, path_audio, arquivo_saida, musica_path=None, musica_volume=0.1,
+                   preset="medium", crf=23, threads=None, efeitos=None, arquivo_legendas=None, preparadas=None):
+        """
+        Renderiza o vídeo base em trechos paralelos e os une sem recodificar.
+
+        Args:
+            paths_imagens: Lista de caminhos das cenas
+            path_audio: Narração (.wav) - define a duração do vídeo
+            arquivo_saida: Caminho do .mp4 de saída
+            musica_path: Música de fundo opcional (em loop até o fim da narração)
+            musica_volume: Volume da música (multiplicador)
+            preset: Preset do libx264
+            crf: Qualidade do libx264
+            threads: Orçamento total de threads do ffmpeg, dividido entre os trechos
+            efeitos: Lista opcional com o movimento de cada cena (padrão: aleatório)
+            arquivo_legendas: Legendas .ass opcionais, queimadas em cada trecho
+            preparadas: Lista opcional de cenas preparadas (.npy) para esses `efeitos`
+
+        Returns:
+            Dicionário com quadros, tempo e quadros por segundo renderizados
+        """
+        inicio = time.perf_counter()
+        duracao_total = duracao_wav(path_audio)
+        # Os movimentos são sorteados aqui para que corpo e junção da mesma cena coincidam
+        efeitos = efeitos if efeitos is not None else [random.randint(0, 3) for _ in paths_imagens]
+
+        motor = MotorMontagem(self.largura, self.altura, self.fps, self.duracao_transicao)
+        total_quadros = motor.quadro_do_instante(duracao_total)
+        cenas = motor.planejar_cenas(paths_imagens, duracao_total, efeitos, carregar=set())
+        pecas = self.planejar_pecas(cenas, total_quadros)
+
+        trabalhadores = min(self.trabalhadores, len(pecas))
+        threads_por_peca = max(1, threads // trabalhadores) if threads else None
+        self.logger.info(
+            f"🎞️  Montagem segmentada: {len(pecas)} trechos "
+            f"({sum(p['tipo'] == 'juncao' for p in pecas)} junções) em {trabalhadores} processo(s)"
+        )
+
+        pasta_trechos = tempfile.mkdtemp(prefix="trechos_", dir=os.path.dirname(os.path.abspath(arquivo_saida)))
+        try:
+            # 1. Renderiza os trechos em paralelo (.ts: cada um leva seus próprios SPS/PPS)
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=trabalhadores, mp_context=contexto) as executor:
+                futuros = []
+                for indice, peca in enumerate(pecas):
+                    peca['arquivo'] = os.path.join(pasta_trechos, f"trecho_{indice:04d}.ts")
+                    futuros.append(executor.submit(
+                        _renderizar_peca,
+                        self.largura, self.altura, self.fps, self.duracao_transicao,
+                        list(paths_imagens), duracao_total, efeitos, peca['cenas'],
+                        peca['primeiro_quadro'], peca['ultimo_quadro'], peca['arquivo'],
+                        preset, crf, threads_por_peca, arquivo_legendas, preparadas
+                    ))
+                tempo_cpu = sum(futuro.result()['tempo'] for futuro in futuros)
+
+            # 2. Une os trechos (cópia de stream) e mistura o áudio
+            lista = os.path.join(pasta_trechos, "lista.txt")
+            with open(lista, 'w', encoding='utf-8') as f:
+                for peca in pecas:
+                    f.write(f"file '{peca['arquivo']}'\n")
+
+            comando = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", lista, "-i", path_audio]
+            if musica_path:
+                comando += ["-stream_loop", "-1", "-i", musica_path]
+                comando += ["-filter_complex", filtro_mistura_audio(1, 2, musica_volume), "-map", "0:v", "-map", "[audio]"]
+            else:
+                comando += ["-map", "0:v", "-map", "1:a"]
+            comando += ["-c:v", "copy", "-c:a", "aac", "-t", f"{duracao_total:.6f}", arquivo_saida]
+            _executar_ffmpeg(comando, self.logger)
+        finally:
+            shutil.rmtree(pasta_trechos, ignore_errors=True)
+
+        tempo = time.perf_counter() - inicio
+        self.logger.info(f"  ├─ Soma do tempo dos trechos: {tempo_cpu:.1f}s | parede: {tempo:.1f}s")
+        return {
+            'quadros': total_quadros,
+            'tempo': tempo,
+            'quadros_por_segundo': total_quadros / tempo if tempo > 0 else 0.0
+        }
@@ -0,0 +1,106 @@
+"""
+Preparação das Cenas para a Montagem
+Grava cada cena já recortada e redimensionada para o tamanho exato que o seu
+movimento Ken Burns precisa, em .npy (RGB cru), para que a montagem abra a
+imagem por memory-map, sem decodificar PNG nem redimensionar ao carregar.
+"""
+import os
+import time
+import logging
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from motor_montagem import regiao_movimento
+
+
+class PreparadorCenas:
+    """
+    Cenas preparadas (uint8 [altura, largura, 3]) por (imagem, tamanho do vídeo, movimento).
+
+    Com cache, os .npy ficam no CacheArtefatos e são lidos direto de lá;
+    sem cache, são gravados ao lado das imagens das cenas.
+    """
+
+    def __init__(self, largura, altura, cache=None, logger=None):
+        """
+        Inicializa o preparador.
+
+        Args:
+            largura: Largura do vídeo (px)
+            altura: Altura do vídeo (px)
+            cache: Instância opcional de CacheArtefatos
+            logger: Logger opcional para saída de logs
+        """
+        self.largura = int(largura)
+        self.altura = int(altura)
+        self.cache = cache
+        self.logger = logger or logging.getLogger("PreparadorCenas")
+
+    def _chave(self, path_imagem, efeito):
+        """Chave da cena preparada no cache de artefatos."""
+        return self.cache.chave(
+            'cena_preparada',
+            imagem=self.cache.hash_arquivo(path_imagem),
+            largura=self.largura,
+            altura=self.altura,
+            efeito=efeito
+        )
+
+    def _gerar(self, path_imagem, efeito, destino):
+        """Recorta e redimensiona a cena (uma única reamostragem) e grava o .npy."""
+        with Image.open(path_imagem) as imagem:
+            imagem = imagem.convert("RGB")
+            caixa, tamanho = regiao_movimento(imagem.size, self.largura, self.altura, efeito)
+            preparada = imagem.resize(tamanho, Image.LANCZOS, box=caixa)
+        np.save(destino, np.asarray(preparada))
+
+    def preparar(self, path_imagem, efeito):
+        """
+        Retorna o .npy da cena preparada para um movimento, gerando-o se preciso.
+
+        Args:
+            path_imagem: Imagem da cena
+            efeito: Movimento Ken Burns da cena (ver motor_montagem)
+
+        Returns:
+            Caminho do .npy (abrir com np.load(..., mmap_mode='r'))
+        """
+        if self.cache is None:
+            destino = f"{os.path.splitext(path_imagem)[0]}_preparada_{efeito}_{self.largura}x{self.altura}.npy"
+            self._gerar(path_imagem, efeito, destino)
+            return destino
+
+        chave = self._chave(path_imagem, efeito)
+        caminho = self.cache.obter_caminho('cena_preparada', chave, '.npy')
+        if caminho is not None:
+            return caminho
+
+        fd, temporario = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(os.path.abspath(path_imagem)))
+        os.close(fd)
+        try:
+            self._gerar(path_imagem, efeito, temporario)
+            self.cache.guardar_arquivo('cena_preparada', chave, '.npy', temporario)
+        finally:
+            os.unlink(temporario)
+        return self.cache.caminho(chave, '.npy')
+
+    def preparar_todas(self, paths_imagens, efeitos):
+        """
+        Prepara todas as cenas de um vídeo.
+
+        Args:
+            paths_imagens: Lista de caminhos das cenas
+            efeitos: Movimento de cada cena
+
+        Returns:
+            Lista de caminhos .npy, na ordem das cenas
+        """
+        inicio = time.perf_counter()
+        preparadas = [self.preparar(path, efeito) for path, efeito in zip(paths_imagens, efeitos)]
+        self.logger.info(
+            f"🖼️  {len(preparadas)} cena(s) preparada(s) no tamanho exato do movimento "
+            f"em {time.perf_counter() - inicio:.2f}s"
+        )
+        return preparadas
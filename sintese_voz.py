@@ -0,0 +1,444 @@
+"""
+Síntese de Voz com XTTS
+Reaproveita o condicionamento do locutor (latentes GPT + speaker embedding)
+calculado a partir do arquivo de voz clonada, em vez de recalculá-lo a cada
+chamada de tts_to_file, e oferece um modo por frases com trabalhadores em
+paralelo e escrita do .wav em fluxo (normalizado pelo pico numa segunda passada).
+"""
+import os
+import json
+import time
+import wave
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+
+# Silêncio entre frases, igual ao que o Synthesizer do Coqui TTS insere (amostras)
+AMOSTRAS_SILENCIO_ENTRE_FRASES = 10000
+
+# Amostras por bloco na passada de normalização do modo por frases
+AMOSTRAS_BLOCO_NORMALIZACAO = 1 << 20
+
+
+# --- Trabalhador do pool de processos (modo CPU) ---
+# Cada processo carrega sua própria cópia do modelo uma única vez.
+_TTS_TRABALHADOR = None
+
+
+def _inicializar_trabalhador(modelo_id, threads_por_trabalhador):
+    """Inicializador do ProcessPoolExecutor: carrega o XTTS na CPU deste processo."""
+    global _TTS_TRABALHADOR
+    from TTS.api import TTS
+
+    torch.set_num_threads(threads_por_trabalhador)
+    _TTS_TRABALHADOR = TTS(modelo_id)
+    _TTS_TRABALHADOR.to("cpu")
+
+
+def _sintetizar_frase_no_trabalhador(frase, idioma, gpt_cond_latent, speaker_embedding, parametros):
+    """Sintetiza uma frase no processo trabalhador e devolve as amostras float32."""
+    modelo = _TTS_TRABALHADOR.synthesizer.tts_model
+    return _inferir_frase(modelo, frase, idioma, gpt_cond_latent, speaker_embedding, parametros)
+
+
+# O XTTS guarda o prefixo (texto + condicionamento) da frase em andamento num
+# atributo compartilhado do modelo (gpt_inference.cached_prefix_emb): duas
+# inferências simultâneas no mesmo modelo trocariam os prefixos entre si
+# (palavras erradas/áudio embaralhado, sem erro). Por isso, no mesmo processo,
+# a inferência é serializada.
+_LOCK_INFERENCIA = threading.Lock()
+
+
+def _inferir_frase(modelo, frase, idioma, gpt_cond_latent, speaker_embedding, parametros):
+    """Roda o XTTS em uma frase (uma inferência por vez no processo) e devolve um array float32 1D."""
+    with _LOCK_INFERENCIA:
+        saida = modelo.inference(
+            frase,
+            idioma,
+            gpt_cond_latent,
+            speaker_embedding,
+            **parametros
+        )
+    amostras = saida['wav']
+    if torch.is_tensor(amostras):
+        amostras = amostras.squeeze().cpu().numpy()
+    return np.asarray(amostras, dtype=np.float32)
+
+
+class SintetizadorXTTS:
+    """
+    Sintetiza narrações com XTTS usando latentes de locutor em cache.
+
+    Os latentes de cada arquivo de voz são calculados uma única vez,
+    mantidos em memória e persistidos no CacheArtefatos (chave: hash do
+    arquivo de voz + id do modelo TTS). Com o cache ativo, cada frase
+    sintetizada também é guardada, e frases repetidas entre histórias
+    (ganchos de abertura, "Moral da história: ...") são emendadas do cache.
+    """
+
+    def __init__(self, modelo_id, idioma, cache=None, logger=None):
+        """
+        Inicializa o sintetizador.
+
+        Args:
+            modelo_id: Id do modelo TTS (ex: 'tts_models/multilingual/multi-dataset/xtts_v2')
+            idioma: Código do idioma da narração (ex: 'pt')
+            cache: CacheArtefatos opcional para persistir os latentes em disco
+            logger: Logger opcional para saída de logs
+        """
+        self.modelo_id = modelo_id
+        self.idioma = idioma
+        self.cache = cache
+        self.logger = logger or logging.getLogger("SintetizadorXTTS")
+
+        # hash do arquivo de voz -> (gpt_cond_latent, speaker_embedding) na CPU
+        self._latentes = {}
+        self._lock = threading.Lock()
+
+        # Pool de trabalhadores do modo por frases (criado sob demanda)
+        self._pool = None
+        self._pool_tipo = None
+
+    @staticmethod
+    def suporta(tts):
+        """Indica se o modelo carregado é um XTTS (aceita latentes de locutor)."""
+        modelo = getattr(getattr(tts, 'synthesizer', None), 'tts_model', None)
+        return hasattr(modelo, 'get_conditioning_latents') and hasattr(modelo, 'inference')
+
+    def _hash_voz(self, voz_path):
+        """SHA-256 do arquivo de voz (usa o hash memorizado do cache, se houver)."""
+        if self.cache is not None:
+            return self.cache.hash_arquivo(voz_path)
+
+        sha = hashlib.sha256()
+        with open(voz_path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    def obter_latentes(self, tts, voz_path):
+        """
+        Retorna os latentes de condicionamento do locutor para um arquivo de voz.
+
+        Ordem de busca: memória → cache em disco → cálculo pelo encoder do XTTS.
+
+        Args:
+            tts: Instância de TTS já carregada (XTTS)
+            voz_path: Caminho do .wav de referência
+
+        Returns:
+            Tupla (gpt_cond_latent, speaker_embedding) no dispositivo do modelo
+        """
+        modelo = tts.synthesizer.tts_model
+        dispositivo = next(modelo.parameters()).device
+        hash_voz = self._hash_voz(voz_path)
+
+        with self._lock:
+            latentes = self._latentes.get(hash_voz)
+
+            if latentes is None and self.cache is not None:
+                chave = self.cache.chave('latentes_voz', voz=hash_voz, modelo=self.modelo_id)
+                caminho = self.cache.obter_caminho('latentes_voz', chave, '.pt')
+                if caminho is not None:
+                    dados = torch.load(caminho, map_location="cpu")
+                    latentes = (dados['gpt_cond_latent'], dados['speaker_embedding'])
+                    self.logger.info(f"🗄️  Latentes da voz '{os.path.basename(voz_path)}' recuperados do cache")
+
+            if latentes is None:
+                self.logger.info(f"🎤 Calculando latentes da voz '{os.path.basename(voz_path)}' (uma vez por arquivo)...")
+                inicio = time.perf_counter()
+                config = modelo.config
+                # Mesmos parâmetros que o XTTS usa dentro de tts_to_file
+                gpt_cond_latent, speaker_embedding = modelo.get_conditioning_latents(
+                    audio_path=[voz_path],
+                    gpt_cond_len=getattr(config, 'gpt_cond_len', 30),
+                    gpt_cond_chunk_len=getattr(config, 'gpt_cond_chunk_len', 4),
+                    max_ref_length=getattr(config, 'max_ref_len', 30),
+                    sound_norm_refs=getattr(config, 'sound_norm_refs', False)
+                )
+                latentes = (gpt_cond_latent.detach().cpu(), speaker_embedding.detach().cpu())
+                self.logger.info(f"✓ Latentes calculados em {time.perf_counter() - inicio:.1f}s")
+
+                if self.cache is not None:
+                    self._persistir_latentes(hash_voz, latentes)
+
+            self._latentes[hash_voz] = latentes
+
+        return latentes[0].to(dispositivo), latentes[1].to(dispositivo)
+
+    def _persistir_latentes(self, hash_voz, latentes):
+        """Salva os latentes no cache de artefatos."""
+        chave = self.cache.chave('latentes_voz', voz=hash_voz, modelo=self.modelo_id)
+        fd, temporario = tempfile.mkstemp(suffix='.pt')
+        os.close(fd)
+        try:
+            torch.save({'gpt_cond_latent': latentes[0], 'speaker_embedding': latentes[1]}, temporario)
+            self.cache.guardar_arquivo('latentes_voz', chave, '.pt', temporario)
+        finally:
+            os.unlink(temporario)
+
+    # --- Cache por frase ---
+
+    @staticmethod
+    def normalizar_frase(frase):
+        """Normaliza o texto da frase para a chave do cache (Unicode, caixa e espaços)."""
+        return " ".join(unicodedata.normalize("NFC", frase).lower().split())
+
+    def _chave_frase(self, frase, hash_voz, parametros):
+        """Chave do cache de uma frase: texto normalizado, voz, idioma e modelo."""
+        return self.cache.chave(
+            'frase_tts',
+            frase=self.normalizar_frase(frase),
+            voz=hash_voz,
+            idioma=self.idioma,
+            modelo=self.modelo_id,
+            parametros=parametros
+        )
+
+    def _frase_do_cache(self, chave):
+        """Lê as amostras float32 de uma frase do cache (ou None)."""
+        if self.cache is None:
+            return None
+        caminho = self.cache.obter_caminho('frase_tts', chave, '.npy')
+        if caminho is None:
+            return None
+        return np.load(caminho)
+
+    def _guardar_frase(self, chave, amostras):
+        """Guarda as amostras float32 de uma frase no cache."""
+        if self.cache is None:
+            return
+        fd, temporario = tempfile.mkstemp(suffix='.npy')
+        os.close(fd)
+        try:
+            np.save(temporario, amostras)
+            self.cache.guardar_arquivo('frase_tts', chave, '.npy', temporario)
+        finally:
+            os.unlink(temporario)
+
+    def _parametros_inferencia(self, modelo):
+        """Parâmetros de amostragem do config do XTTS (os mesmos de tts_to_file)."""
+        config = modelo.config
+        return {
+            'temperature': getattr(config, 'temperature', 0.75),
+            'length_penalty': getattr(config, 'length_penalty', 1.0),
+            'repetition_penalty': getattr(config, 'repetition_penalty', 10.0),
+            'top_k': getattr(config, 'top_k', 50),
+            'top_p': getattr(config, 'top_p', 0.85)
+        }
+
+    def sintetizar(self, tts, texto, arquivo_saida, voz_path):
+        """
+        Gera a narração em arquivo usando os latentes em cache.
+
+        O texto é dividido em frases como no Synthesizer do Coqui TTS,
+        e as frases são unidas com o mesmo silêncio entre elas.
+
+        Args:
+            tts: Instância de TTS já carregada (XTTS)
+            texto: Texto da narração
+            arquivo_saida: Caminho do .wav de saída
+            voz_path: Caminho do .wav de referência (voz clonada)
+
+        Returns:
+            Caminho do arquivo gerado
+        """
+        gpt_cond_latent, speaker_embedding = self.obter_latentes(tts, voz_path)
+        modelo = tts.synthesizer.tts_model
+        parametros = self._parametros_inferencia(modelo)
+        hash_voz = self._hash_voz(voz_path)
+
+        wav = []
+        emendadas = 0
+        frases = tts.synthesizer.split_into_sentences(texto)
+        for frase in frases:
+            chave = self._chave_frase(frase, hash_voz, parametros) if self.cache is not None else None
+            amostras = self._frase_do_cache(chave) if chave else None
+            if amostras is not None:
+                emendadas += 1
+            else:
+                amostras = _inferir_frase(modelo, frase, self.idioma, gpt_cond_latent, speaker_embedding, parametros)
+                if chave:
+                    self._guardar_frase(chave, amostras)
+            wav.extend(list(amostras))
+            wav.extend([0] * AMOSTRAS_SILENCIO_ENTRE_FRASES)
+
+        if emendadas:
+            self.logger.info(f"🗄️  {emendadas}/{len(frases)} frase(s) emendada(s) do cache de TTS")
+
+        tts.synthesizer.save_wav(wav=wav, path=arquivo_saida)
+        return arquivo_saida
+
+    # --- Modo por frases ---
+
+    def _obter_pool(self, dispositivo, trabalhadores):
+        """
+        Retorna o pool de trabalhadores do modo por frases.
+
+        Na GPU usa uma única thread: o modelo residente é compartilhado e o
+        XTTS não suporta inferências simultâneas no mesmo modelo (ver
+        _LOCK_INFERENCIA); a thread só tira a síntese do caminho da escrita.
+        Na CPU usa processos, cada um com sua própria cópia do modelo e uma
+        fatia dos núcleos.
+        """
+        tipo = "threads" if dispositivo.type == "cuda" else "processos"
+        if self._pool is not None and self._pool_tipo == tipo:
+            return self._pool
+
+        self.encerrar()
+        if tipo == "threads":
+            if trabalhadores > 1:
+                self.logger.info("🧵 TTS na GPU: frases sintetizadas uma por vez (modelo compartilhado)")
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-frase")
+        else:
+            threads_por_trabalhador = max(1, (os.cpu_count() or 1) // trabalhadores)
+            self.logger.info(
+                f"🧵 Iniciando {trabalhadores} processo(s) TTS na CPU "
+                f"({threads_por_trabalhador} thread(s) cada)"
+            )
+            self._pool = ProcessPoolExecutor(
+                max_workers=trabalhadores,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_trabalhador,
+                initargs=(self.modelo_id, threads_por_trabalhador)
+            )
+        self._pool_tipo = tipo
+        return self._pool
+
+    def encerrar(self):
+        """Finaliza o pool de trabalhadores do modo por frases (se existir)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_tipo = None
+
+    def sintetizar_em_frases(self, tts, texto, arquivo_saida, voz_path, trabalhadores=2,
+                             silencio_entre_frases=None, arquivo_tempos=None):
+        """
+        Gera a narração frase a frase em paralelo.
+
+        As frases são distribuídas entre os trabalhadores e escritas em fluxo,
+        na ordem do texto, num arquivo temporário float32 enquanto o pico é
+        acompanhado; uma segunda passada em blocos normaliza pelo pico (como o
+        save_wav do Coqui no modo de uma chamada só, para que o volume não
+        dependa de tts_em_frases) e grava o .wav. A narração inteira nunca fica
+        na memória.
+
+        Args:
+            tts: Instância de TTS já carregada (XTTS)
+            texto: Texto da narração
+            arquivo_saida: Caminho do .wav de saída
+            voz_path: Caminho do .wav de referência (voz clonada)
+            trabalhadores: Quantas frases sintetizar ao mesmo tempo
+            silencio_entre_frases: Pausa entre frases em segundos
+                                   (None = mesmo silêncio do tts_to_file)
+            arquivo_tempos: JSON opcional com início/fim de cada frase
+
+        Returns:
+            Lista de dicionários {indice, texto, inicio, fim} (segundos)
+        """
+        gpt_cond_latent, speaker_embedding = self.obter_latentes(tts, voz_path)
+        modelo = tts.synthesizer.tts_model
+        parametros = self._parametros_inferencia(modelo)
+        taxa = tts.synthesizer.output_sample_rate
+        dispositivo = next(modelo.parameters()).device
+
+        if silencio_entre_frases is None:
+            amostras_silencio = AMOSTRAS_SILENCIO_ENTRE_FRASES
+        else:
+            amostras_silencio = int(round(silencio_entre_frases * taxa))
+        silencio = np.zeros(amostras_silencio, dtype=np.float32)
+
+        frases = [f for f in tts.synthesizer.split_into_sentences(texto) if f.strip()]
+
+        # Frases já sintetizadas antes (mesma voz/idioma/modelo) vêm do cache
+        hash_voz = self._hash_voz(voz_path)
+        chaves = [
+            self._chave_frase(frase, hash_voz, parametros) if self.cache is not None else None
+            for frase in frases
+        ]
+        prontas = [self._frase_do_cache(chave) if chave else None for chave in chaves]
+        a_sintetizar = [i for i, amostras in enumerate(prontas) if amostras is None]
+
+        trabalhadores = max(1, min(int(trabalhadores), len(a_sintetizar) or 1))
+        futuros = {}
+        if a_sintetizar:
+            pool = self._obter_pool(dispositivo, trabalhadores)
+            if self._pool_tipo == "threads":
+                trabalhadores = 1
+            self.logger.info(
+                f"🔊 Sintetizando {len(a_sintetizar)}/{len(frases)} frase(s) com "
+                f"{trabalhadores} trabalhador(es) ({self._pool_tipo})"
+            )
+
+            if self._pool_tipo == "threads":
+                for i in a_sintetizar:
+                    futuros[i] = pool.submit(
+                        _inferir_frase, modelo, frases[i], self.idioma, gpt_cond_latent, speaker_embedding, parametros
+                    )
+            else:
+                # Latentes vão para os processos como tensores de CPU
+                latente_cpu, embedding_cpu = gpt_cond_latent.cpu(), speaker_embedding.cpu()
+                for i in a_sintetizar:
+                    futuros[i] = pool.submit(
+                        _sintetizar_frase_no_trabalhador, frases[i], self.idioma, latente_cpu, embedding_cpu, parametros
+                    )
+
+        if len(a_sintetizar) < len(frases):
+            self.logger.info(f"🗄️  {len(frases) - len(a_sintetizar)}/{len(frases)} frase(s) emendada(s) do cache de TTS")
+
+        tempos = []
+        posicao = 0
+        pico = 0.0
+        fd, temporario = tempfile.mkstemp(suffix='.f32', dir=os.path.dirname(os.path.abspath(arquivo_saida)))
+        try:
+            # 1ª passada: escreve cada frase assim que ela (e as anteriores) ficam prontas
+            with os.fdopen(fd, 'wb') as bruto:
+                for indice, frase in enumerate(frases):
+                    amostras = prontas[indice]
+                    if amostras is None:
+                        amostras = futuros[indice].result()
+                        if chaves[indice]:
+                            self._guardar_frase(chaves[indice], amostras)
+                    amostras = np.asarray(amostras, dtype=np.float32)
+                    if len(amostras):
+                        pico = max(pico, float(np.max(np.abs(amostras))))
+                    bruto.write(amostras.tobytes())
+                    bruto.write(silencio.tobytes())
+
+                    tempos.append({
+                        'indice': indice,
+                        'texto': frase,
+                        'inicio': posicao / taxa,
+                        'fim': (posicao + len(amostras)) / taxa
+                    })
+                    posicao += len(amostras) + len(silencio)
+
+            # 2ª passada: mesma normalização de pico do save_wav do Coqui (TTS.utils.audio), em blocos
+            ganho = np.float32(32767 / max(0.01, pico))
+            with wave.open(arquivo_saida, 'wb') as saida:
+                saida.setnchannels(1)
+                saida.setsampwidth(2)
+                saida.setframerate(taxa)
+                if posicao:
+                    narracao = np.memmap(temporario, dtype=np.float32, mode='r')
+                    for inicio in range(0, len(narracao), AMOSTRAS_BLOCO_NORMALIZACAO):
+                        bloco = narracao[inicio:inicio + AMOSTRAS_BLOCO_NORMALIZACAO]
+                        saida.writeframes((bloco * ganho).astype(np.int16).tobytes())
+                    del narracao
+        finally:
+            os.unlink(temporario)
+
+        if arquivo_tempos:
+            with open(arquivo_tempos, 'w', encoding='utf-8') as f:
+                json.dump({'taxa_amostragem': taxa, 'frases': tempos}, f, ensure_ascii=False, indent=2)
+
+        return tempos
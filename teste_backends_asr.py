@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Comparação dos backends de ASR das legendas: openai-whisper x faster-whisper (int8)
+Transcreve o mesmo áudio com cada backend (sem cache) e compara a velocidade e
+o desvio dos tempos das palavras em relação ao openai-whisper (referência).
+"""
+import re
+import sys
+import json
+import time
+import wave
+import difflib
+
+import numpy as np
+
+from legenda_generator import LegendaGenerator
+
+if len(sys.argv) < 2:
+    print("Uso: python teste_backends_asr.py <narracao.wav> [modelo] [traduzir:sim/nao] [relatorio.json]")
+    print("Exemplo: python teste_backends_asr.py saida/historia_1_audio.wav small nao")
+    sys.exit(1)
+
+path_audio = sys.argv[1]
+modelo = sys.argv[2] if len(sys.argv) > 2 else 'small'
+traduzir = len(sys.argv) > 3 and sys.argv[3].lower() in ['sim', 's', 'yes', 'y', 'true']
+arquivo_relatorio = sys.argv[4] if len(sys.argv) > 4 else None
+
+with wave.open(path_audio, 'rb') as f:
+    duracao_audio = f.getnframes() / f.getframerate()
+
+
+def palavras(result):
+    """Lista (palavra normalizada, início, fim) de uma transcrição."""
+    return [
+        (re.sub(r"[^\w']", "", w['word'].lower()), w['start'], w['end'])
+        for seg in result['segments'] for w in seg.get('words', [])
+    ]
+
+
+def desvio(referencia, candidata):
+    """Desvio (s) de início/fim das palavras iguais, pareadas por alinhamento de sequência."""
+    matcher = difflib.SequenceMatcher(a=[p for p, _, _ in referencia], b=[p for p, _, _ in candidata], autojunk=False)
+    desvios = []
+    for bloco in matcher.get_matching_blocks():
+        for k in range(bloco.size):
+            _, ini_ref, fim_ref = referencia[bloco.a + k]
+            _, ini, fim = candidata[bloco.b + k]
+            desvios.append((abs(ini - ini_ref), abs(fim - fim_ref)))
+    if not desvios:
+        return {'pareadas': 0}
+    desvios = np.array(desvios)
+    return {
+        'pareadas': len(desvios),
+        'concordancia_texto': matcher.ratio(),
+        'inicio_medio': float(desvios[:, 0].mean()),
+        'inicio_p95': float(np.percentile(desvios[:, 0], 95)),
+        'fim_medio': float(desvios[:, 1].mean()),
+        'fim_p95': float(np.percentile(desvios[:, 1], 95)),
+        'maximo': float(desvios.max())
+    }
+
+
+print("=" * 60)
+print(f"COMPARAÇÃO DE BACKENDS ASR: modelo '{modelo}', {duracao_audio:.1f}s de áudio, "
+      f"{'tradução' if traduzir else 'transcrição'}")
+print("=" * 60)
+
+relatorio = {'audio': path_audio, 'modelo': modelo, 'duracao_audio': duracao_audio, 'backends': {}}
+resultados = {}
+for backend in ('openai-whisper', 'faster-whisper'):
+    gerador = LegendaGenerator(modelo_whisper=modelo, backend_asr=backend)
+    try:
+        inicio = time.perf_counter()
+        gerador._carregar_modelo()
+        tempo_carga = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultados[backend] = gerador._transcrever_audio(path_audio, traduzir)
+        tempo = time.perf_counter() - inicio
+    except ImportError as e:
+        print(f"{backend:>15}: indisponível ({e})")
+        continue
+    finally:
+        gerador.liberar_modelo()
+
+    relatorio['backends'][backend] = {
+        'carregamento': tempo_carga,
+        'transcricao': tempo,
+        'tempo_real': duracao_audio / tempo if tempo > 0 else None,
+        'palavras': len(palavras(resultados[backend]))
+    }
+    print(f"{backend:>15}: carga {tempo_carga:.1f}s | transcrição {tempo:.1f}s "
+          f"({duracao_audio / tempo:.1f}x tempo real) | {relatorio['backends'][backend]['palavras']} palavras")
+
+if len(resultados) == 2:
+    tempos = relatorio['backends']
+    d = desvio(palavras(resultados['openai-whisper']), palavras(resultados['faster-whisper']))
+    relatorio['desvio_palavras'] = d
+    print()
+    print(f"Aceleração (faster-whisper): {tempos['openai-whisper']['transcricao'] / tempos['faster-whisper']['transcricao']:.1f}x")
+    if d['pareadas']:
+        print(f"Palavras pareadas: {d['pareadas']} (concordância do texto {d['concordancia_texto']:.0%})")
+        print(f"Desvio do início: médio {d['inicio_medio'] * 1000:.0f} ms | p95 {d['inicio_p95'] * 1000:.0f} ms")
+        print(f"Desvio do fim:    médio {d['fim_medio'] * 1000:.0f} ms | p95 {d['fim_p95'] * 1000:.0f} ms")
+        print(f"Desvio máximo:    {d['maximo'] * 1000:.0f} ms")
+    else:
+        print("Nenhuma palavra em comum entre as transcrições")
+
+if arquivo_relatorio:
+    with open(arquivo_relatorio, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nRelatório salvo em: {arquivo_relatorio}")
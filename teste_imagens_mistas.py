@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Benchmark de cenas mistas (T2I ↔ I2I) na Etapa 2
+Alterna cenas com e sem 'imagem_base' e mostra quantas vezes o
+Stable Diffusion foi carregado e o tempo total da etapa.
+"""
+import sys
+import time
+
+from gerar_lote_v3 import VideoPipeline
+
+if len(sys.argv) < 2:
+    print("Uso: python teste_imagens_mistas.py <imagem_base.png> [num_cenas]")
+    print("Exemplo: python teste_imagens_mistas.py imagens_base/cena1_anansi_e_leopardo.png 6")
+    sys.exit(1)
+
+imagem_base = sys.argv[1]
+num_cenas = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+# Alterna T2I e I2I a cada cena (pior caso para o pipeline antigo)
+cenas = []
+for i in range(num_cenas):
+    cena = {"prompt": f"cinematic photo, African savanna, scene {i+1}, 4k", "seed": 1234 + i}
+    if i % 2 == 1:
+        cena["imagem_base"] = imagem_base
+    cenas.append(cena)
+
+print("="*60)
+print(f"BENCHMARK: {num_cenas} cenas alternando T2I/I2I")
+print("="*60)
+
+pipeline = VideoPipeline(config_path="config.json")
+pipeline.cache = None  # Mede a geração de verdade, sem cache de artefatos
+
+inicio = time.perf_counter()
+paths = pipeline._gerar_imagens(cenas, "saida/benchmark_cenas_mistas")
+tempo_total = time.perf_counter() - inicio
+
+carregamentos = pipeline.modelos.estatisticas['carregamentos']
+print()
+print(f"Cenas geradas: {len(paths or [])}/{num_cenas}")
+print(f"Carregamentos de modelo: {carregamentos}")
+print(f"Tempo total: {tempo_total:.1f}s ({tempo_total / num_cenas:.1f}s por cena)")
+
+sys.exit(0 if paths and carregamentos <= 1 else 1)
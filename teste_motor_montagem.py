@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark da montagem (Etapa 3): MoviePy x motor NumPy x filtergraph FFmpeg x trechos paralelos
+(os motores NumPy também com as cenas preparadas em .npy)
+Monta o mesmo vídeo base com cada backend e compara os tempos.
+Antes, confere os limites de crossfade numa linha do tempo em que o teste em
+segundos e o limite em quadros discordam (sem ffmpeg).
+"""
+import sys
+import glob
+import time
+import os
+import tempfile
+
+from PIL import Image
+
+from gerar_lote_v3 import VideoPipeline
+from motor_montagem import MotorMontagem, MontagemSegmentada
+
+# 21,35s, 7 cenas, 24 fps, transição de 0,5s: na cena 5 o quadro 366 fica em
+# t = 0.4999999999999982 (< transição em segundos), mas já passou do último
+# retângulo da cena 4 (quadro_do_instante arredonda para cima)
+DURACAO_REGRESSAO, CENAS_REGRESSAO = 21.35, 7
+
+
+def verificar_limites_transicao():
+    """Gera todos os quadros da linha do tempo de regressão; falha com IndexError se o crossfade passar do fim da cena."""
+    with tempfile.TemporaryDirectory() as pasta:
+        paths = []
+        for i in range(CENAS_REGRESSAO):
+            path = os.path.join(pasta, f"cena_{i}.png")
+            Image.new("RGB", (64, 112), (i * 30, 80, 160)).save(path)
+            paths.append(path)
+
+        motor = MotorMontagem(32, 56, fps=24, duracao_transicao=0.5)
+        total_quadros = motor.quadro_do_instante(DURACAO_REGRESSAO)
+        cenas = motor.planejar_cenas(paths, DURACAO_REGRESSAO, efeitos=[0] * CENAS_REGRESSAO)
+        gerados = sum(1 for _ in motor.gerar_quadros(cenas, total_quadros))
+        assert gerados == total_quadros, f"{gerados} quadros gerados, esperados {total_quadros}"
+
+        # Trechos paralelos: cada trecho só carrega as suas cenas (KeyError se misturar com outra)
+        segmentada = MontagemSegmentada(32, 56, fps=24, duracao_transicao=0.5)
+        pecas = segmentada.planejar_pecas(motor.planejar_cenas(paths, DURACAO_REGRESSAO, carregar=set()), total_quadros)
+        gerados = 0
+        for peca in pecas:
+            cenas = motor.planejar_cenas(paths, DURACAO_REGRESSAO, efeitos=[0] * CENAS_REGRESSAO, carregar=set(peca['cenas']))
+            gerados += sum(1 for _ in motor.gerar_quadros(cenas, peca['ultimo_quadro'], peca['primeiro_quadro']))
+        assert gerados == total_quadros, f"{gerados} quadros gerados em trechos, esperados {total_quadros}"
+    print(f"Limites de transição: OK ({total_quadros} quadros)")
+
+
+verificar_limites_transicao()
+
+if len(sys.argv) < 3:
+    print("Uso: python teste_motor_montagem.py <pasta_imagens> <narracao.wav>")
+    print("Exemplo: python teste_motor_montagem.py saida/historia_1_imagens saida/historia_1_audio.wav")
+    sys.exit(1)
+
+pasta_imagens = sys.argv[1]
+path_audio = sys.argv[2]
+paths_imagens = sorted(glob.glob(os.path.join(pasta_imagens, "cena_*.png")))
+if not paths_imagens:
+    print(f"Nenhuma cena_*.png encontrada em {pasta_imagens}")
+    sys.exit(1)
+
+pipeline = VideoPipeline(config_path="config.json")
+os.makedirs("saida", exist_ok=True)
+
+print("="*60)
+print(f"BENCHMARK DE MONTAGEM: {len(paths_imagens)} cenas")
+print("="*60)
+
+tempos = {}
+# (nome, backend, cenas preparadas em .npy)
+variantes = (
+    ("moviepy", "moviepy", False),
+    ("numpy", "numpy", False),
+    ("numpy+npy", "numpy", True),
+    ("ffmpeg", "ffmpeg", False),
+    ("segmentos", "segmentos", False),
+    ("segmentos+npy", "segmentos", True)
+)
+for nome, backend, preparadas in variantes:
+    pipeline.config['video']['backend_montagem'] = backend
+    pipeline.config['video']['cenas_preparadas'] = preparadas
+    arquivo_saida = f"saida/benchmark_montagem_{nome.replace('+', '_')}.mp4"
+    inicio = time.perf_counter()
+    sucesso = pipeline._montar_video(paths_imagens, path_audio, arquivo_saida)
+    tempos[nome] = time.perf_counter() - inicio
+    print(f"{nome:>13}: {'OK' if sucesso else 'FALHOU'} em {tempos[nome]:.1f}s -> {arquivo_saida}")
+
+print()
+for nome, _, _ in variantes[1:]:
+    print(f"Aceleração ({nome}): {tempos['moviepy'] / tempos[nome]:.1f}x")